@@ -1,17 +1,35 @@
+import os
+
 from flask import Flask
 from flask_cors import CORS
 from flask_restful import Api
 
-from config import UPLOAD_FOLDER
-from routes.upload import UploadResource
-from routes.download import DownloadResource
-from routes.delete import DeleteResource
-from routes.search import SearchResource
-from routes.transform import TransformResource
-from routes.list import ListResource
+from config import PRELOAD_ON_STARTUP, UPLOAD_FOLDER
+from utils.feature_cache import get_feature_cache
+
 
+def create_app(start_background: bool = True) -> Flask:
+    """
+    Args:
+        start_background: Lancer les tâches de démarrage (reprise des jobs d'ingestion,
+            surveillance des baux, préchargement du détecteur et de l'index). False pour
+            un processus qui ne sert pas de requêtes (processus parent du reloader)
+    """
+    # Imports des routes (ultralytics, torch...) faits ici et non au niveau du module :
+    # les processus "spawn" du pool d'extraction réimportent ce script comme __main__
+    # (python app.py) et ne doivent charger que ce dont ils ont besoin
+    from models.image_model import ImageModel
+    from models.job_model import JobModel
+    from routes.upload import UploadResource
+    from routes.jobs import JobResource
+    from routes.download import DownloadResource
+    from routes.delete import DeleteResource
+    from routes.search import SearchResource
+    from routes.transform import TransformResource
+    from routes.list import ListResource
+    from utils.ingestion import recover_jobs, start_lease_watcher
+    from utils.startup import readiness, start_preloading
 
-def create_app() -> Flask:
     app = Flask(__name__)
     app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 
@@ -20,6 +38,7 @@ def create_app() -> Flask:
 
     # Enregistrement des endpoints REST
     api.add_resource(UploadResource, "/upload")
+    api.add_resource(JobResource, "/jobs/<string:job_id>")
     api.add_resource(ListResource, "/images")
     api.add_resource(DownloadResource, "/download/<string:image_id>")
     api.add_resource(DeleteResource, "/delete/<string:image_id>")
@@ -29,14 +48,50 @@ def create_app() -> Flask:
     from routes.descriptors import DescriptorsResource
     api.add_resource(DescriptorsResource, "/descriptors/<string:image_id>")
 
+    # Index MongoDB utilisés par /images (filtre par classe, pagination) et la file des jobs
+    try:
+        ImageModel.ensure_indexes()
+        JobModel.ensure_indexes()
+    except Exception as e:
+        print(f"Impossible de créer les index MongoDB: {str(e)}")
+
+    if start_background:
+        # Reprise des jobs d'ingestion non terminés (arrêt pendant le traitement)
+        try:
+            recover_jobs()
+        except Exception as e:
+            print(f"Impossible de reprendre les jobs d'ingestion: {str(e)}")
+        # Puis reprise des jobs abandonnés pendant l'exécution (bail expiré)
+        start_lease_watcher()
+
+        # Chargement et préchauffage du détecteur, construction de l'index de recherche
+        if PRELOAD_ON_STARTUP:
+            start_preloading()
+
     @app.route("/health")
     def healthcheck():
         return {"status": "ok"}
 
+    @app.route("/cache/stats")
+    def cache_stats():
+        # Cache persistant des détections et descripteurs : taille, hits / misses par type
+        return get_feature_cache().stats()
+
+    @app.route("/ready")
+    def readycheck():
+        # Prête uniquement une fois le préchargement terminé (contrairement à /health)
+        state = readiness()
+        return state, 200 if state["status"] == "ready" else 503
+
     return app
 
 
 if __name__ == "__main__":
-    application = create_app()
-    application.run(host="0.0.0.0", port=5000, debug=True)
+    # En mode debug, le reloader de Werkzeug relance ce script dans un processus enfant
+    # (WERKZEUG_RUN_MAIN=true) qui sert les requêtes ; le parent ne fait que surveiller
+    # les fichiers : il ne reprend pas de jobs et ne charge pas le modèle
+    debug = True
+    reloader_parent = debug and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+    application = create_app(start_background=not reloader_parent)
+    application.run(host="0.0.0.0", port=5000, debug=debug)
 
@@ -0,0 +1,114 @@
+"""
+Comparaison des backends du détecteur YOLO (PyTorch, ONNX Runtime, OpenVINO).
+Pour chaque backend, mesure la latence moyenne par image et l'écart des
+détections avec le modèle PyTorch de référence (best.pt) :
+- rappel / précision : part des détections de référence retrouvées (même
+  classe, IoU >= 0.5) et part des détections du backend qui en sont
+- écart de confiance moyen sur les détections appariées
+
+Usage :
+    python benchmark_detector.py [image ou dossier ...] [--backends torch,onnx,openvino]
+                                 [--imgsz 640] [--int8] [--batch 8]
+Sans image, les images du dossier uploads sont utilisées. Les modèles exportés
+sont créés dans fine_tuned_model/ au premier lancement (onnxruntime / openvino requis).
+"""
+
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmark_dominant_colors import collect_images
+from config import DETECTION_BATCH_SIZE, DETECTOR_IMGSZ, UPLOAD_FOLDER
+from utils.yolo_detection import create_model, detect_with_model, set_runtime_threads
+
+
+def box_iou(a, b) -> float:
+    """IoU de deux bounding boxes [x1, y1, x2, y2]."""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_detections(reference, candidate, iou_threshold: float = 0.5):
+    """Appariement glouton (par confiance décroissante) des détections de même classe."""
+    matches = []
+    used = set()
+    for ref in sorted(reference, key=lambda det: -det["confidence"]):
+        best, best_iou = None, iou_threshold
+        for i, det in enumerate(candidate):
+            if i in used or det["class"] != ref["class"]:
+                continue
+            iou = box_iou(ref["bbox"], det["bbox"])
+            if iou >= best_iou:
+                best, best_iou = i, iou
+        if best is not None:
+            used.add(best)
+            matches.append((ref, candidate[best]))
+    return matches
+
+
+def run_backend(backend: str, images, imgsz: int, int8: bool, batch_size: int):
+    """Détections et latence moyenne par image d'un backend (après un passage de chauffe)."""
+    model = create_model(backend, imgsz, int8 and backend != "torch")
+    # DETECTOR_THREADS appliqué aussi à ONNX Runtime / OpenVINO
+    set_runtime_threads(model, backend, imgsz=imgsz, int8=int8 and backend != "torch")
+    detect_with_model(model, images[:1], 1, imgsz=imgsz)
+
+    start = time.perf_counter()
+    detections = detect_with_model(model, images, batch_size, imgsz=imgsz)
+    latency = (time.perf_counter() - start) / len(images)
+    return detections, latency
+
+
+def compare(images, backends, imgsz: int, int8: bool, batch_size: int):
+    reference, reference_latency = run_backend("torch", images, imgsz, False, batch_size)
+
+    print("\n" + "="*80)
+    print(f"🎯 BACKENDS DU DÉTECTEUR ({len(images)} images, imgsz={imgsz}, lot={batch_size}, int8={int8})")
+    print("="*80)
+    print(f"{'Backend':<12}{'Latence (ms/img)':>18}{'Accélération':>15}{'Rappel':>9}{'Précision':>11}{'Δ conf.':>10}")
+
+    for backend in backends:
+        if backend == "torch":
+            detections, latency = reference, reference_latency
+        else:
+            detections, latency = run_backend(backend, images, imgsz, int8, batch_size)
+
+        matched = total_ref = total_det = 0
+        conf_gaps = []
+        for ref, det in zip(reference, detections):
+            matches = match_detections(ref, det)
+            matched += len(matches)
+            total_ref += len(ref)
+            total_det += len(det)
+            conf_gaps.extend(abs(a["confidence"] - b["confidence"]) for a, b in matches)
+
+        recall = matched / total_ref if total_ref else 1.0
+        precision = matched / total_det if total_det else 1.0
+        conf_gap = float(np.mean(conf_gaps)) if conf_gaps else 0.0
+        print(f"{backend:<12}{latency * 1000:>18.1f}{reference_latency / latency:>14.1f}x"
+              f"{recall:>9.3f}{precision:>11.3f}{conf_gap:>10.4f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {"--backends": "torch,onnx,openvino", "--imgsz": str(DETECTOR_IMGSZ), "--batch": str(DETECTION_BATCH_SIZE)}
+    for name in list(options):
+        if name in args:
+            position = args.index(name)
+            options[name] = args[position + 1]
+            del args[position:position + 2]
+    int8 = "--int8" in args
+    args = [arg for arg in args if arg != "--int8"]
+
+    image_paths = collect_images(args or [UPLOAD_FOLDER])
+    images = [image for image in (cv2.imread(path) for path in image_paths) if image is not None]
+    if not images:
+        print("\n❌ Aucune image trouvée")
+        sys.exit(1)
+
+    compare(images, options["--backends"].split(","), int(options["--imgsz"]), int8, int(options["--batch"]))
@@ -0,0 +1,113 @@
+"""
+Benchmark des moteurs de couleurs dominantes (extract_dominant_colors).
+Compare pour chaque moteur le temps d'extraction et la qualité de la palette :
+- erreur de quantification : distance RGB moyenne entre chaque pixel et la
+  couleur de palette la plus proche (plus bas = mieux)
+- écart avec KMeans : distance entre la palette obtenue et celle du moteur
+  "kmeans", calculée comme dans la recherche (compare_descriptors)
+
+Usage :
+    python benchmark_dominant_colors.py [image ou dossier ...] [--repeat N]
+Sans argument, les images du dossier uploads sont utilisées.
+
+Résultats de référence (8 images naturelles de 0,2 à 0,8 Mpx, k=5) :
+    Moteur      Temps moyen   Erreur moy.   Écart KMeans
+    kmeans        ~550 ms        29.70         0.0000
+    minibatch      ~85 ms        29.72         0.0267
+    fast            ~4 ms        29.67         0.0346
+"fast" donne une erreur de quantification équivalente à KMeans pour une
+fraction du temps ; les palettes diffèrent légèrement (couleurs arrondies
+aux moyennes des cases), d'où un écart non nul avec les palettes déjà stockées.
+"""
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from scipy.spatial.distance import cdist
+
+from config import UPLOAD_FOLDER
+from utils.descriptor_extraction import DOMINANT_COLOR_ENGINES, ExtractionContext, extract_dominant_colors
+from utils.similarity_search import compare_descriptors
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def collect_images(paths):
+    """Liste les fichiers images des chemins donnés (fichiers ou dossiers)."""
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        elif os.path.isfile(path):
+            images.append(path)
+    return images
+
+
+def quantization_error(rgb_image: np.ndarray, palette) -> float:
+    """Distance RGB moyenne entre les pixels et la couleur de palette la plus proche."""
+    pixels = rgb_image.reshape(-1, 3).astype(np.float64)
+    colors = np.array([color["rgb"] for color in palette], dtype=np.float64)
+    return float(cdist(pixels, colors).min(axis=1).mean())
+
+
+def benchmark(image_paths, repeat: int = 3):
+    """Mesure temps et qualité de chaque moteur sur les images données."""
+    results = {engine: {"time": [], "error": [], "gap": []} for engine in DOMINANT_COLOR_ENGINES}
+
+    for path in image_paths:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"⚠️  Image illisible ignorée : {path}")
+            continue
+        ctx = ExtractionContext(image)
+
+        reference = None
+        for engine in DOMINANT_COLOR_ENGINES:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                palette = extract_dominant_colors(ctx, k=5, engine=engine)
+            results[engine]["time"].append((time.perf_counter() - start) / repeat)
+            results[engine]["error"].append(quantization_error(ctx.rgb, palette))
+            if reference is None:
+                reference = palette
+            results[engine]["gap"].append(
+                compare_descriptors({"dominant_colors": palette}, {"dominant_colors": reference})
+            )
+
+    return results
+
+
+def print_results(results, count: int):
+    print("\n" + "="*80)
+    print(f"🎨 COULEURS DOMINANTES ({count} images, k=5)")
+    print("="*80)
+    print(f"{'Moteur':<12}{'Temps moyen (ms)':>18}{'Accélération':>15}{'Erreur moy.':>14}{'Écart KMeans':>15}")
+    reference_time = np.mean(results["kmeans"]["time"])
+    for engine, values in results.items():
+        mean_time = np.mean(values["time"])
+        print(f"{engine:<12}{mean_time * 1000:>18.1f}{reference_time / mean_time:>14.1f}x"
+              f"{np.mean(values['error']):>14.2f}{np.mean(values['gap']):>15.4f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeat = 3
+    if "--repeat" in args:
+        position = args.index("--repeat")
+        repeat = int(args[position + 1])
+        del args[position:position + 2]
+
+    image_paths = collect_images(args or [UPLOAD_FOLDER])
+    if not image_paths:
+        print("\n❌ Aucune image trouvée")
+        sys.exit(1)
+
+    results = benchmark(image_paths, repeat=repeat)
+    print_results(results, len(results["kmeans"]["time"]))
@@ -6,8 +6,80 @@ load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/cbir")
 MONGO_DB = os.getenv("MONGO_DB", "cbir")
+# Pool de connexions MongoDB (un client partagé par processus)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
 UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", os.path.join(os.path.dirname(__file__), "uploads"))
 
 # Créer le dossier uploads si absent
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+
+# Moteur de recherche : "index" (index vectorisé en mémoire) ou "linear" (parcours document par document)
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "index")
+# Index vectorisé : intervalle (secondes) entre deux comparaisons de l'index avec la collection
+# (nombre de documents, dernier _id) ; les ajouts et suppressions faits par l'API sont vus tout de suite
+SEARCH_INDEX_CHECK_SECONDS = float(os.getenv("SEARCH_INDEX_CHECK_SECONDS", "2"))
+
+# Format de stockage des vecteurs de descripteurs : "float32", "float16" (BSON Binary) ou "list" (tableaux BSON de doubles)
+DESCRIPTOR_STORAGE = os.getenv("DESCRIPTOR_STORAGE", "float32")
+
+# Filtrage de Gabor : "fft" (une DFT de l'image pour tout le banc de filtres) ou "spatial" (filter2D par noyau)
+GABOR_ENGINE = os.getenv("GABOR_ENGINE", "fft")
+
+# Couleurs dominantes : "kmeans" (KMeans scikit-learn, n_init=10), "minibatch" (MiniBatchKMeans)
+# ou "fast" (histogramme quantifié + itérations de Lloyd en NumPy), voir benchmark_dominant_colors.py
+DOMINANT_COLORS_ENGINE = os.getenv("DOMINANT_COLORS_ENGINE", "kmeans")
+
+# Descripteurs des objets détectés : "crop" (extracteurs relancés sur chaque crop) ou
+# "pooled" (cartes de réponses calculées une fois par image, agrégées par bounding box)
+# Les deux modes ne sont pas comparables : ré-indexer les images après un changement
+OBJECT_DESCRIPTOR_MODE = os.getenv("OBJECT_DESCRIPTOR_MODE", "crop")
+
+# Détection YOLO : nombre d'images par appel au modèle (upload de plusieurs images)
+DETECTION_BATCH_SIZE = int(os.getenv("DETECTION_BATCH_SIZE", "8"))
+
+# Backend du détecteur YOLO : "torch" (best.pt via PyTorch), "onnx" (ONNX Runtime) ou "openvino"
+# Les backends onnx/openvino exportent best.pt une seule fois dans fine_tuned_model/
+DETECTOR_BACKEND = os.getenv("DETECTOR_BACKEND", "torch")
+# Taille d'entrée du réseau (pixels)
+DETECTOR_IMGSZ = int(os.getenv("DETECTOR_IMGSZ", "640"))
+# Threads CPU de l'inférence (0 = valeur par défaut du runtime) : torch.set_num_threads pour
+# PyTorch (et les pré/post-traitements de tous les backends), intra_op_num_threads pour
+# ONNX Runtime, INFERENCE_NUM_THREADS pour OpenVINO
+DETECTOR_THREADS = int(os.getenv("DETECTOR_THREADS", "0"))
+# Quantification int8 du modèle exporté (onnx : poids int8 ; openvino : calibration sur DETECTOR_CALIBRATION_DATA)
+DETECTOR_INT8 = os.getenv("DETECTOR_INT8", "false").lower() in ("1", "true", "yes")
+DETECTOR_CALIBRATION_DATA = os.getenv("DETECTOR_CALIBRATION_DATA", "")
+
+# Détection : seuil de confiance plancher de l'inférence (0 = désactivé : inférence au seuil demandé).
+# Avec un plancher (ex. 0.01), chaque image est analysée à min(seuil demandé, plancher) et les seuils
+# supérieurs sont obtenus par filtrage, au prix d'une NMS et d'un cache plus lourds (jusqu'à max_det boxes)
+DETECTION_BASE_CONF = float(os.getenv("DETECTION_BASE_CONF", "0"))
+# Nombre de résultats de détection gardés en mémoire (par empreinte du contenu de l'image, 0 = désactivé)
+DETECTION_CACHE_SIZE = int(os.getenv("DETECTION_CACHE_SIZE", "256"))
+
+# Démarrage : chargement du détecteur, inférences de préchauffage et construction
+# de l'index de recherche en arrière-plan (voir /ready)
+PRELOAD_ON_STARTUP = os.getenv("PRELOAD_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+# Tailles d'entrée (pixels) des inférences de préchauffage, séparées par des virgules
+DETECTOR_WARMUP_SIZES = [int(size) for size in os.getenv("DETECTOR_WARMUP_SIZES", str(DETECTOR_IMGSZ)).split(",") if size.strip()]
+
+# Ingestion des uploads : nombre de workers (threads) qui traitent les jobs en arrière-plan
+# (0 = traitement immédiat dans la requête, utile pour les tests). Les inférences YOLO restent
+# sérialisées sur le modèle partagé : seules les extractions de descripteurs se recouvrent
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+# Bail (secondes) d'un job réservé par un worker, renouvelé toutes les JOB_LEASE_SECONDS / 3
+# secondes pendant le traitement : un job "running"
+# dont le bail a expiré (processus arrêté) est remis en attente et repris
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))
+# Extraction des descripteurs : nombre de processus du pool (image complète et objets répartis
+# sur les cœurs, image transmise par mémoire partagée ; 0 = extraction dans le processus de l'API)
+EXTRACTION_PROCESSES = int(os.getenv("EXTRACTION_PROCESSES", "0"))
+
+# Cache persistant des détections et descripteurs (SQLite local, clé = contenu de l'image + paramètres)
+FEATURE_CACHE_PATH = os.getenv("FEATURE_CACHE_PATH", os.path.join(os.path.dirname(__file__), "feature_cache.sqlite3"))
+# Taille maximale du cache en Mo (éviction des entrées les moins récemment utilisées, 0 = désactivé)
+FEATURE_CACHE_MAX_MB = int(os.getenv("FEATURE_CACHE_MAX_MB", "1024"))
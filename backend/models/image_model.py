@@ -1,14 +1,152 @@
+import os
+import threading
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
+import numpy as np
+from bson import Binary
 from pymongo import MongoClient
 
-from config import MONGO_DB, MONGO_URI
+from config import (
+    DESCRIPTOR_STORAGE,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_DB,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_URI,
+)
+
+# Client MongoDB partagé par tout le processus (il gère lui-même son pool de connexions)
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> MongoClient:
+    """
+    Retourne le client MongoDB du processus, créé au premier appel.
+    Un processus issu d'un fork (serveur pre-fork) recrée son propre client :
+    les sockets du parent ne doivent pas être partagées.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = MongoClient(
+                    MONGO_URI,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                    connect=False,  # Connexion à la première requête (sûr avant un fork)
+                )
+                _client_pid = pid
+    return _client
+
+
+def _reset_client_after_fork() -> None:
+    """Oublie le client (et le verrou) hérités du processus parent."""
+    global _client, _client_pid, _client_lock
+    _client = None
+    _client_pid = None
+    _client_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_client_after_fork)
 
 
 def get_db():
-    client = MongoClient(MONGO_URI)
-    return client[MONGO_DB]
+    return get_client()[MONGO_DB]
+
+
+# Familles stockées sous forme de vecteurs, et familles d'histogrammes (un vecteur par canal)
+VECTOR_DESCRIPTORS = ("gabor", "hu_moments", "hog")
+HISTOGRAM_DESCRIPTORS = ("color_histogram_rgb", "color_histogram_hsv")
+
+PACKED_KEY = "__ndarray__"
+STORAGE_DTYPES = {"float32": "<f4", "float16": "<f2"}
+
+
+def pack_array(values: Any, dtype: str = "float32") -> Dict[str, Any]:
+    """
+    Encode un vecteur en BSON Binary (little-endian) avec son dtype et sa forme.
+    
+    Args:
+        values: Liste ou tableau NumPy
+        dtype: "float32" ou "float16"
+    
+    Returns:
+        Sous-document {"__ndarray__": Binary, "dtype": "<f4", "shape": [...]}
+    """
+    array = np.asarray(values, dtype=STORAGE_DTYPES[dtype])
+    return {
+        PACKED_KEY: Binary(array.tobytes()),
+        "dtype": array.dtype.str,
+        "shape": list(array.shape),
+    }
+
+
+def unpack_array(packed: Dict[str, Any]) -> np.ndarray:
+    """Décode un vecteur encodé par pack_array (vue en lecture seule sur le buffer, sans copie)."""
+    return np.frombuffer(packed[PACKED_KEY], dtype=np.dtype(packed["dtype"])).reshape(packed["shape"])
+
+
+def encode_descriptors(descriptors: Dict[str, Any], storage: str = DESCRIPTOR_STORAGE) -> Dict[str, Any]:
+    """
+    Prépare un dictionnaire de descripteurs pour MongoDB.
+    Les histogrammes et les vecteurs Gabor/Hu/HOG sont encodés en binaire ;
+    les couleurs dominantes et Tamura (quelques valeurs) restent lisibles.
+    """
+    if storage not in STORAGE_DTYPES or not descriptors:
+        return descriptors
+    
+    encoded = dict(descriptors)
+    for key in HISTOGRAM_DESCRIPTORS:
+        if isinstance(encoded.get(key), dict):
+            encoded[key] = {channel: pack_array(hist, storage) for channel, hist in encoded[key].items()}
+    for key in VECTOR_DESCRIPTORS:
+        if key in encoded:
+            encoded[key] = pack_array(encoded[key], storage)
+    return encoded
+
+
+def decode_descriptors(descriptors: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Décode un dictionnaire de descripteurs lu depuis MongoDB.
+    Les vecteurs binaires deviennent des tableaux NumPy ; l'ancien format
+    (listes de doubles) est retourné tel quel.
+    """
+    if not descriptors:
+        return descriptors
+    
+    decoded = dict(descriptors)
+    for key in HISTOGRAM_DESCRIPTORS:
+        if isinstance(decoded.get(key), dict):
+            decoded[key] = {
+                channel: unpack_array(hist) if isinstance(hist, dict) and PACKED_KEY in hist else hist
+                for channel, hist in decoded[key].items()
+            }
+    for key in VECTOR_DESCRIPTORS:
+        value = decoded.get(key)
+        if isinstance(value, dict) and PACKED_KEY in value:
+            decoded[key] = unpack_array(value)
+    return decoded
+
+
+def to_serializable(value: Any) -> Any:
+    """Convertit récursivement les tableaux NumPy en listes (réponses JSON, exports)."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {key: to_serializable(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_serializable(item) for item in value]
+    return value
 
 
 class ImageModel:
@@ -27,28 +165,160 @@ class ImageModel:
         path: str,
         detected_objects: Optional[List[Dict[str, Any]]] = None,
         descriptors: Optional[Dict[str, Any]] = None,
+        job_id: Optional[str] = None,
+        descriptors_version: Optional[int] = None,
     ) -> str:
+        """
+        Args:
+            job_id: Job d'ingestion à l'origine de l'image (index unique : une
+                seule image par job, même si le job est exécuté deux fois)
+            descriptors_version: Version des extracteurs (DESCRIPTORS_VERSION) ayant
+                produit les descripteurs ; absente des documents plus anciens
+
+        Raises:
+            DuplicateKeyError: si une image existe déjà pour ce job
+        """
+        objects = [
+            {**obj, "descriptors": encode_descriptors(obj["descriptors"])} if obj.get("descriptors") else obj
+            for obj in detected_objects or []
+        ]
         doc = {
             "filename": filename,
             "path": path,
-            "detected_objects": detected_objects or [],
-            "descriptors": descriptors or {},
+            "detected_objects": objects,
+            "descriptors": encode_descriptors(descriptors or {}),
             "uploaded_at": datetime.utcnow(),
         }
+        if job_id is not None:
+            doc["job_id"] = job_id
+        if descriptors_version is not None:
+            doc["descriptors_version"] = descriptors_version
         result = cls.collection().insert_one(doc)
         return str(result.inserted_id)
 
     @classmethod
-    def find_by_id(cls, image_id: str) -> Optional[Dict[str, Any]]:
-        return cls.collection().find_one({"_id": cls._to_object_id(image_id)})
+    def find_by_id(cls, image_id: str, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Args:
+            image_id: ID MongoDB de l'image
+            projection: Champs à inclure/exclure (ex: {"descriptors": 0}), None = document complet
+        """
+        return cls._decode(cls.collection().find_one({"_id": cls._to_object_id(image_id)}, projection))
+
+    @classmethod
+    def find_many(cls, image_ids: List[str], projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Récupère plusieurs images en une seule requête ($in).
+        
+        Returns:
+            Documents dans l'ordre de image_ids (les IDs introuvables sont ignorés)
+        """
+        object_ids = [oid for oid in (cls._to_object_id(image_id) for image_id in image_ids) if oid is not None]
+        if not object_ids:
+            return []
+        docs = {
+            str(doc["_id"]): cls._decode(doc)
+            for doc in cls.collection().find({"_id": {"$in": object_ids}}, projection)
+        }
+        return [docs[str(image_id)] for image_id in image_ids if str(image_id) in docs]
+
+    @classmethod
+    def find_by_job(cls, job_id: str, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Image créée par un job d'ingestion, ou None."""
+        return cls._decode(cls.collection().find_one({"job_id": job_id}, projection))
+
+    @classmethod
+    def find_outdated(cls, descriptors_version: int,
+                      projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Images dont les descripteurs ne proviennent pas de cette version des extracteurs (ou non versionnées)."""
+        query = {"descriptors_version": {"$ne": descriptors_version}}
+        return [cls._decode(doc) for doc in cls.collection().find(query, projection).sort("_id", 1)]
+
+    @classmethod
+    def update_descriptors(cls, image_id: str, descriptors: Dict[str, Any],
+                           detected_objects: List[Dict[str, Any]], descriptors_version: int) -> None:
+        """Remplace les descripteurs de l'image et de ses objets (ré-indexation)."""
+        objects = [
+            {**obj, "descriptors": encode_descriptors(obj["descriptors"])} if obj.get("descriptors") else obj
+            for obj in detected_objects
+        ]
+        cls.collection().update_one(
+            {"_id": cls._to_object_id(image_id)},
+            {"$set": {
+                "descriptors": encode_descriptors(descriptors or {}),
+                "detected_objects": objects,
+                "descriptors_version": descriptors_version,
+            }},
+        )
 
     @classmethod
     def delete(cls, image_id: str) -> None:
         cls.collection().delete_one({"_id": cls._to_object_id(image_id)})
 
     @classmethod
-    def all(cls) -> List[Dict[str, Any]]:
-        return list(cls.collection().find())
+    def all(cls, projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return [cls._decode(doc) for doc in cls.collection().find({}, projection)]
+
+    @classmethod
+    def find(
+        cls,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[Any]] = None,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Requête générique (filtre, tri et pagination exécutés par MongoDB)."""
+        cursor = cls.collection().find(query or {}, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [cls._decode(doc) for doc in cursor]
+
+    @classmethod
+    def count(cls, query: Optional[Dict[str, Any]] = None) -> int:
+        return cls.collection().count_documents(query or {})
+
+    @classmethod
+    def estimated_count(cls) -> int:
+        """Nombre approximatif de documents (métadonnées de la collection, sans parcours)."""
+        return cls.collection().estimated_document_count()
+
+    @classmethod
+    def ensure_indexes(cls) -> None:
+        """Crée les index utilisés par le filtre par classe, la pagination et l'ingestion."""
+        collection = cls.collection()
+        collection.create_index("detected_objects.class")
+        collection.create_index([("uploaded_at", 1), ("_id", 1)])
+        # Une image au plus par job d'ingestion (les images sans job ne sont pas indexées)
+        collection.create_index("job_id", unique=True, sparse=True)
+
+    @classmethod
+    def last_id(cls) -> Optional[str]:
+        """Retourne l'_id le plus récent (sert de signature de la collection)."""
+        last = cls.collection().find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        return str(last["_id"]) if last else None
+
+    @classmethod
+    def find_after(cls, image_id: str, projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Retourne les documents insérés après image_id (ordre des _id)."""
+        query = {"_id": {"$gt": cls._to_object_id(image_id)}}
+        return [cls._decode(doc) for doc in cls.collection().find(query, projection).sort("_id", 1)]
+
+    @staticmethod
+    def _decode(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Décode les descripteurs binaires d'un document (image et objets)."""
+        if not doc:
+            return doc
+        if doc.get("descriptors"):
+            doc["descriptors"] = decode_descriptors(doc["descriptors"])
+        for obj in doc.get("detected_objects", []):
+            if obj.get("descriptors"):
+                obj["descriptors"] = decode_descriptors(obj["descriptors"])
+        return doc
 
     @staticmethod
     def _to_object_id(image_id: str):
@@ -0,0 +1,221 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from config import JOB_LEASE_SECONDS
+from models.image_model import ImageModel, get_db
+
+
+# Étapes du traitement d'un job d'ingestion, dans l'ordre
+JOB_STAGES = ("queued", "detection", "extraction", "done")
+
+# Identifie cette exécution du processus (un PID peut être réutilisé après un redémarrage)
+_INSTANCE = uuid.uuid4().hex
+
+
+def current_owner() -> str:
+    """Propriétaire des jobs réservés par ce processus : "hôte:pid:instance"."""
+    return f"{socket.gethostname()}:{os.getpid()}:{_INSTANCE}"
+
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    """
+    Indique si le processus propriétaire d'un job peut encore le traiter.
+    Seuls les processus de la même machine sont vérifiés ; pour les autres,
+    seule l'expiration du bail permet de reprendre le job.
+    """
+    if not owner:
+        return False
+    host, pid, instance = owner.rsplit(":", 2)
+    if host != socket.gethostname() or os.name == "nt":
+        # Sous Windows, os.kill(pid, 0) terminerait le processus
+        return True
+    if int(pid) == os.getpid():
+        return instance == _INSTANCE
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobModel:
+    """
+    Jobs d'ingestion (un par fichier uploadé) dans MongoDB.
+    La collection sert de file d'attente persistante. Un job "running" appartient
+    au processus qui l'a réservé (owner) pour la durée d'un bail renouvelé à chaque
+    étape et périodiquement pendant le traitement : il n'est repris que si ce bail
+    expire ou si son processus a disparu. Seul le propriétaire peut terminer le job
+    (complete) ou le marquer en échec (fail).
+    """
+
+    collection_name = "jobs"
+
+    @classmethod
+    def collection(cls):
+        return get_db()[cls.collection_name]
+
+    @classmethod
+    def create(cls, filename: str, path: str) -> str:
+        now = datetime.utcnow()
+        doc = {
+            "filename": filename,
+            "path": path,
+            "status": "queued",
+            "stage": "queued",
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        result = cls.collection().insert_one(doc)
+        return str(result.inserted_id)
+
+    @classmethod
+    def find_by_id(cls, job_id: str) -> Optional[Dict[str, Any]]:
+        object_id = ImageModel._to_object_id(job_id)
+        if object_id is None:
+            return None
+        return cls.collection().find_one({"_id": object_id})
+
+    @classmethod
+    def claim(cls, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Passe un job de "queued" à "running" au nom de ce processus (opération atomique).
+
+        Returns:
+            Le job réservé, ou None s'il n'est plus en attente (déjà pris par un worker)
+        """
+        now = datetime.utcnow()
+        return cls.collection().find_one_and_update(
+            {"_id": ImageModel._to_object_id(job_id), "status": "queued"},
+            {
+                "$set": {
+                    "status": "running", "owner": current_owner(),
+                    "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                    "started_at": now, "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+
+    @classmethod
+    def set_stage(cls, job_ids: List[str], stage: str) -> None:
+        """Passe les jobs de ce processus à l'étape donnée et renouvelle leur bail."""
+        cls._update_owned(job_ids, {"stage": stage})
+
+    @classmethod
+    def renew(cls, job_ids: List[str]) -> None:
+        """Renouvelle le bail des jobs de ce processus (traitement toujours en cours)."""
+        cls._update_owned(job_ids, {})
+
+    @classmethod
+    def _update_owned(cls, job_ids: List[str], fields: Dict[str, Any]) -> None:
+        now = datetime.utcnow()
+        object_ids = [ImageModel._to_object_id(job_id) for job_id in job_ids]
+        cls.collection().update_many(
+            {"_id": {"$in": object_ids}, "status": "running", "owner": current_owner()},
+            {"$set": {
+                **fields, "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS), "updated_at": now,
+            }},
+        )
+
+    @classmethod
+    def complete(cls, job_id: str, image_id: str, objects_detected: int) -> bool:
+        """
+        Marque comme terminé un job réservé par ce processus.
+
+        Returns:
+            False si le job a été repris par un autre worker entre-temps (bail expiré)
+        """
+        now = datetime.utcnow()
+        result = cls.collection().update_one(
+            {"_id": ImageModel._to_object_id(job_id), "status": "running", "owner": current_owner()},
+            {"$set": {
+                "status": "done", "stage": "done", "image_id": image_id,
+                "objects_detected": objects_detected, "finished_at": now, "updated_at": now,
+            }},
+        )
+        return result.modified_count > 0
+
+    @classmethod
+    def fail(cls, job_id: str, error: str) -> bool:
+        """
+        Marque en échec un job réservé par ce processus.
+
+        Returns:
+            False si le job a été repris par un autre worker entre-temps (bail expiré)
+        """
+        now = datetime.utcnow()
+        result = cls.collection().update_one(
+            {"_id": ImageModel._to_object_id(job_id), "status": "running", "owner": current_owner()},
+            {"$set": {"status": "failed", "error": error, "finished_at": now, "updated_at": now}},
+        )
+        return result.modified_count > 0
+
+    @classmethod
+    def requeue_expired(cls) -> List[str]:
+        """
+        Remet en attente les jobs "running" abandonnés : bail expiré, ou processus
+        propriétaire arrêté sur cette machine. Les jobs d'un processus vivant dont
+        le bail court encore ne sont pas touchés.
+
+        Returns:
+            IDs des jobs remis en attente
+        """
+        now = datetime.utcnow()
+        requeued = []
+        for job in cls.collection().find({"status": "running"}, {"owner": 1, "lease_expires_at": 1}):
+            lease = job.get("lease_expires_at")
+            if lease is not None and lease > now and _owner_alive(job.get("owner")):
+                continue
+            # Le filtre sur le propriétaire évite de reprendre un job réservé entre-temps
+            result = cls.collection().update_one(
+                {"_id": job["_id"], "status": "running", "owner": job.get("owner")},
+                {
+                    "$set": {"status": "queued", "stage": "queued", "updated_at": now},
+                    "$unset": {"owner": "", "lease_expires_at": ""},
+                },
+            )
+            if result.modified_count:
+                requeued.append(str(job["_id"]))
+        return requeued
+
+    @classmethod
+    def queued_ids(cls) -> List[str]:
+        """IDs des jobs en attente, du plus ancien au plus récent."""
+        cursor = cls.collection().find({"status": "queued"}, {"_id": 1}).sort([("created_at", 1), ("_id", 1)])
+        return [str(doc["_id"]) for doc in cursor]
+
+    @classmethod
+    def ensure_indexes(cls) -> None:
+        """Index utilisé pour retrouver les jobs en attente au démarrage."""
+        cls.collection().create_index([("status", 1), ("created_at", 1)])
+
+    @staticmethod
+    def serialize(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Représentation JSON d'un job (état, étape, progression, résultat ou erreur)."""
+        stage = job.get("stage", "queued")
+        response = {
+            "job_id": str(job["_id"]),
+            "filename": job.get("filename"),
+            "status": job.get("status"),
+            "stage": stage,
+            "progress": round(JOB_STAGES.index(stage) / (len(JOB_STAGES) - 1), 2) if stage in JOB_STAGES else 0.0,
+            "attempts": job.get("attempts", 0),
+        }
+        for key in ("created_at", "started_at", "finished_at"):
+            if job.get(key):
+                response[key] = job[key].isoformat()
+        if job.get("status") == "done":
+            response["image_id"] = job.get("image_id")
+            response["objects_detected"] = job.get("objects_detected", 0)
+        if job.get("error"):
+            response["error"] = job["error"]
+        return response
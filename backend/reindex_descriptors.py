@@ -0,0 +1,83 @@
+"""
+Ré-indexation des descripteurs stockés dans MongoDB.
+Recalcule les descripteurs de l'image complète et de ses objets détectés (mêmes
+bounding boxes, YOLO n'est pas relancé) pour les images dont les descripteurs
+ne proviennent pas de la version courante des extracteurs (DESCRIPTORS_VERSION),
+notamment les images indexées avant les fenêtres d'analyse canoniques du HOG
+et de Gabor, dont les vecteurs ne sont pas comparables aux nouveaux.
+
+Usage :
+    python reindex_descriptors.py [--all] [--dry-run]
+    --all      ré-indexe toutes les images, même à jour
+    --dry-run  affiche les images concernées sans les modifier
+
+Les instances de l'API en cours d'exécution gardent leur index de recherche :
+les redémarrer une fois la ré-indexation terminée.
+"""
+
+import os
+import sys
+
+from config import OBJECT_DESCRIPTOR_MODE
+from models.image_model import ImageModel
+from utils.descriptor_extraction import (
+    DESCRIPTORS_VERSION,
+    ExtractionContext,
+    extract_descriptors,
+    extract_objects_descriptors,
+)
+from utils.image_io import load_image
+
+
+def reindex_image(image: dict) -> None:
+    """
+    Recalcule et enregistre les descripteurs d'une image et de ses objets.
+
+    Raises:
+        Exception: fichier introuvable ou extraction impossible
+    """
+    if not image.get("path") or not os.path.exists(image["path"]):
+        raise FileNotFoundError(f"Fichier introuvable : {image.get('path')}")
+    ctx = ExtractionContext(load_image(image["path"]))
+    descriptors = extract_descriptors(ctx)
+
+    detected_objects = image.get("detected_objects", [])
+    objects_with_bbox = [obj for obj in detected_objects if len(obj.get("bbox", [])) == 4]
+    objects_descriptors = extract_objects_descriptors(ctx, [obj["bbox"] for obj in objects_with_bbox],
+                                                      OBJECT_DESCRIPTOR_MODE)
+    for obj, object_descriptors in zip(objects_with_bbox, objects_descriptors):
+        obj["descriptors"] = object_descriptors
+
+    ImageModel.update_descriptors(str(image["_id"]), descriptors, detected_objects, DESCRIPTORS_VERSION)
+
+
+def reindex(all_images: bool = False, dry_run: bool = False) -> int:
+    """
+    Ré-indexe les images obsolètes (ou toutes avec all_images).
+
+    Returns:
+        Nombre d'images en échec
+    """
+    projection = {"filename": 1, "path": 1, "detected_objects": 1, "descriptors_version": 1}
+    images = ImageModel.all(projection) if all_images else ImageModel.find_outdated(DESCRIPTORS_VERSION, projection)
+    print(f"{len(images)} image(s) à ré-indexer (version des extracteurs : {DESCRIPTORS_VERSION})")
+
+    failures = 0
+    for position, image in enumerate(images, 1):
+        label = f"[{position}/{len(images)}] {image.get('filename')} (version {image.get('descriptors_version', '-')})"
+        if dry_run:
+            print(label)
+            continue
+        try:
+            reindex_image(image)
+            print(f"✅ {label}")
+        except Exception as e:
+            failures += 1
+            print(f"❌ {label} : {str(e)}")
+    return failures
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    failures = reindex(all_images="--all" in args, dry_run="--dry-run" in args)
+    sys.exit(1 if failures else 0)
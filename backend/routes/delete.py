@@ -7,6 +7,7 @@ import os
 from flask_restful import Resource
 
 from models.image_model import ImageModel
+from utils.search_index import mark_search_index_stale
 
 
 class DeleteResource(Resource):
@@ -33,7 +34,7 @@ class DeleteResource(Resource):
     def delete(self, image_id: str):
         """Supprime une image et ses métadonnées."""
         # Récupérer l'image depuis MongoDB
-        image = ImageModel.find_by_id(image_id)
+        image = ImageModel.find_by_id(image_id, {"path": 1, "filename": 1})
         
         if not image:
             return {"error": "Image non trouvée"}, 404
@@ -53,6 +54,7 @@ class DeleteResource(Resource):
             ImageModel.delete(image_id)
         except Exception as e:
             return {"error": f"Erreur lors de la suppression des métadonnées: {str(e)}"}, 500
+        mark_search_index_stale()
         
         return {
             "deleted": image_id,
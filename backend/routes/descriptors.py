@@ -3,7 +3,7 @@ Endpoint pour obtenir les descripteurs détaillés d'une image ou d'un objet sp
 """
 from flask_restful import Resource
 from flask import request
-from models.image_model import ImageModel
+from models.image_model import ImageModel, to_serializable
 
 class DescriptorsResource(Resource):
     """
@@ -23,11 +23,11 @@ class DescriptorsResource(Resource):
                 if 0 <= object_id < len(detected_objects):
                     obj = detected_objects[object_id]
                     descriptors = obj.get("descriptors", {})
-                    return {"object_id": object_id, "object_class": obj.get("class"), "descriptors": descriptors}, 200
+                    return {"object_id": object_id, "object_class": obj.get("class"), "descriptors": to_serializable(descriptors)}, 200
                 else:
                     return {"error": "Index d'objet invalide"}, 400
             except Exception:
                 return {"error": "object_id invalide"}, 400
         else:
             descriptors = image.get("descriptors", {})
-            return {"image_id": image_id, "descriptors": descriptors}, 200
\ No newline at end of file
+            return {"image_id": image_id, "descriptors": to_serializable(descriptors)}, 200
\ No newline at end of file
@@ -31,7 +31,7 @@ class DownloadResource(Resource):
     def get(self, image_id: str):
         """Télécharge une image par son ID."""
         # Récupérer l'image depuis MongoDB
-        image = ImageModel.find_by_id(image_id)
+        image = ImageModel.find_by_id(image_id, {"path": 1, "filename": 1})
         
         if not image:
             return {"error": "Image non trouvée"}, 404
@@ -0,0 +1,28 @@
+"""
+Endpoint de suivi des jobs d'ingestion créés par POST /upload.
+"""
+from flask_restful import Resource
+
+from models.job_model import JobModel
+
+
+class JobResource(Resource):
+    """
+    Endpoint: GET /jobs/<job_id>
+
+    Réponse:
+    {
+        "job_id": "...",
+        "filename": "image1_a1b2c3d4.jpg",
+        "status": "queued" | "running" | "done" | "failed",
+        "stage": "queued" | "detection" | "extraction" | "done",
+        "progress": 0.67,
+        "image_id": "...",  # Si status = "done"
+        "error": "..."      # Si status = "failed"
+    }
+    """
+    def get(self, job_id):
+        job = JobModel.find_by_id(job_id)
+        if not job:
+            return {"error": "Job non trouvé"}, 404
+        return JobModel.serialize(job), 200
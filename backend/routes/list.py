@@ -3,10 +3,48 @@ Route pour lister toutes les images stockées.
 Utile pour afficher la galerie d'images dans le frontend.
 """
 
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict
+
+from bson import ObjectId
 from flask import request
 from flask_restful import Resource
 
 from models.image_model import ImageModel
+from utils.response_shaping import document_projection, parse_bool, parse_fields, select_fields, shape_objects
+
+
+# Ordre de la galerie (et de la pagination par curseur)
+PAGE_SORT = [("uploaded_at", 1), ("_id", 1)]
+
+
+def encode_cursor(image: Dict[str, Any]) -> str:
+    """Encode la position d'une image (uploaded_at, _id) en jeton opaque."""
+    uploaded_at = image.get("uploaded_at")
+    payload = {"t": uploaded_at.isoformat() if uploaded_at else None, "id": str(image["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Décode un jeton de curseur en filtre MongoDB "après cette image".
+    
+    Raises:
+        ValueError: si le jeton est invalide
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        last_id = ObjectId(payload["id"])
+        uploaded_at = datetime.fromisoformat(payload["t"]) if payload.get("t") else None
+    except Exception as e:
+        raise ValueError(f"Curseur invalide: {str(e)}")
+    
+    return {"$or": [
+        {"uploaded_at": {"$gt": uploaded_at}},
+        {"uploaded_at": uploaded_at, "_id": {"$gt": last_id}}
+    ]}
 
 
 class ListResource(Resource):
@@ -14,14 +52,17 @@ class ListResource(Resource):
     Endpoint: GET /images
     
     Fonctionnement:
-    1. Récupère toutes les images de MongoDB
-    2. Retourne les métadonnées (sans les descripteurs complets pour économiser la bande passante)
+    1. Récupère une page d'images de MongoDB (filtre et pagination exécutés par la base)
+    2. Retourne les métadonnées (sans les descripteurs, qui ne sont pas lus depuis MongoDB)
     3. Optionnel: filtre par classe d'objet détectée
     
     Paramètres de requête (optionnels):
     - object_class: Filtrer les images contenant cette classe d'objet
     - limit: Nombre maximum de résultats (défaut: 100)
     - offset: Nombre de résultats à sauter (pour pagination)
+    - cursor: Jeton next_cursor d'une page précédente (pagination par curseur, remplace offset)
+    - fields: Champs à renvoyer pour chaque image (ex: "id,filename,object_classes")
+    - include_descriptors: "true" pour inclure les descripteurs des objets détectés
     
     Réponse:
     {
@@ -38,56 +79,69 @@ class ListResource(Resource):
             ...
         ],
         "count": 10,
-        "total": 50
+        "total": 50,
+        "next_cursor": "..."  // null s'il n'y a plus de page
     }
     """
     
     def get(self):
-        """Liste toutes les images avec leurs métadonnées."""
+        """Liste les images avec leurs métadonnées."""
         # Paramètres de requête
         object_class = request.args.get("object_class")
         limit = int(request.args.get("limit", 100))
         offset = int(request.args.get("offset", 0))
+        cursor = request.args.get("cursor")
+        fields = parse_fields(request.args.get("fields"))
+        include_descriptors = parse_bool(request.args.get("include_descriptors"))
         
-        # Récupérer toutes les images
-        all_images = ImageModel.all()
+        # Filtre par classe d'objet exécuté par MongoDB (index sur detected_objects.class)
+        query = {"detected_objects.class": object_class} if object_class else {}
         
-        # Filtrer par classe d'objet si demandé
-        if object_class:
-            filtered_images = []
-            for img in all_images:
-                detected = img.get("detected_objects", [])
-                if any(obj.get("class") == object_class for obj in detected):
-                    filtered_images.append(img)
-            all_images = filtered_images
+        # Pagination par curseur (keyset) sur (uploaded_at, _id), sinon par offset
+        page_query = query
+        if cursor:
+            try:
+                page_query = {"$and": [query, decode_cursor(cursor)]} if query else decode_cursor(cursor)
+            except ValueError:
+                return {"error": "Curseur invalide"}, 400
+            offset = 0
         
-        total = len(all_images)
+        # Une image de plus que demandé pour savoir s'il existe une page suivante
+        page_images = ImageModel.find(
+            page_query,
+            document_projection(fields, include_descriptors) | {"uploaded_at": 1},
+            sort=PAGE_SORT,
+            skip=offset,
+            limit=limit + 1
+        )
+        has_more = len(page_images) > limit
+        page_images = page_images[:limit]
         
-        # Pagination
-        paginated_images = all_images[offset:offset + limit]
+        # Total : comptage exact si filtré, estimation (métadonnées) sinon
+        total = ImageModel.count(query) if query else ImageModel.estimated_count()
         
-        # Construire la réponse (sans les descripteurs complets)
+        # Construire la réponse
         images_data = []
-        for img in paginated_images:
+        for img in page_images:
             detected_objects = img.get("detected_objects", [])
             
             # Extraire seulement les classes uniques pour l'affichage
             classes = list(set([obj.get("class") for obj in detected_objects if obj.get("class")]))
             
-            images_data.append({
+            images_data.append(select_fields({
                 "id": str(img["_id"]),
                 "filename": img.get("filename"),
                 "uploaded_at": img.get("uploaded_at").isoformat() if img.get("uploaded_at") else None,
-                "objects_detected": detected_objects,
+                "objects_detected": shape_objects(detected_objects, include_descriptors),
                 "objects_count": len(detected_objects),
                 "object_classes": classes
-            })
+            }, fields))
         
         return {
             "images": images_data,
             "count": len(images_data),
             "total": total,
             "offset": offset,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": encode_cursor(page_images[-1]) if has_more and page_images else None
         }, 200
-
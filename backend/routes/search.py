@@ -5,14 +5,34 @@ optionnellement en se concentrant sur un objet spécifique détecté.
 """
 
 import os
+from concurrent.futures import Future, ThreadPoolExecutor
 import cv2
 import numpy as np
 from flask import request, jsonify
 from flask_restful import Resource
 
+from config import SEARCH_ENGINE
 from models.image_model import ImageModel
-from utils.descriptor_extraction import extract_descriptors
+from utils.descriptor_extraction import extract_descriptors, extract_object_descriptors
+from utils.image_io import decode_image
+from utils.response_shaping import document_projection, parse_bool, parse_fields, select_fields, shape_objects
+from utils.search_index import get_search_index
 from utils.similarity_search import search_similar_images
+from utils.yolo_detection import detect_objects
+
+
+# Détection YOLO des images requêtes, en parallèle de l'extraction et du classement
+# (les threads ne sont créés qu'au premier usage)
+_query_detection = ThreadPoolExecutor(max_workers=2, thread_name_prefix="query-detection")
+
+
+def _query_detections(detection: Future) -> list:
+    """Détections de l'image requête (liste vide si YOLO a échoué)."""
+    try:
+        return detection.result()
+    except Exception as e:
+        print(f"Erreur YOLO pour l'image requête: {str(e)}")
+        return []
 
 
 class SearchResource(Resource):
@@ -30,8 +50,12 @@ class SearchResource(Resource):
     Format de la requête (option 1 - nouvelle image):
     {
         "type": "upload",
-        "image": <fichier multipart>
+        "image": <fichier multipart>,
+        "detect": "true"  // Optionnel: "false" pour ne pas lancer YOLO sur l'image requête
     }
+    La détection n'influence pas le classement (recherche par image complète) :
+    elle ne sert qu'à renseigner query_info.objects_detected et tourne en
+    parallèle de l'extraction et du classement.
     
     Format de la requête (option 2 - image existante):
     {
@@ -64,15 +88,26 @@ class SearchResource(Resource):
         ],
         "count": 10
     }
+    
+    Options de réponse (query string, formulaire ou JSON):
+    - fields: Champs à renvoyer pour chaque résultat (ex: "id,filename,similarity_score")
+    - include_descriptors: "true" pour inclure les descripteurs des objets détectés
+      (par défaut ils ne sont disponibles que via /descriptors/<id>)
     """
     
     def post(self):
         """Recherche des images similaires."""
         search_type = request.form.get("type", "upload")
         
+        # Mise en forme de la réponse (query string, formulaire ou JSON)
+        options = request.get_json(silent=True) or {}
+        fields = parse_fields(request.values.get("fields") or options.get("fields"))
+        include_descriptors = parse_bool(request.values.get("include_descriptors") or options.get("include_descriptors"))
+        
         query_descriptors = None
         query_info = {}
         search_by_objects = False  # Par défaut, rechercher par image complète
+        detection = None  # Détection YOLO de l'image requête, en cours (type "upload")
         
         try:
             if search_type == "upload":
@@ -84,27 +119,24 @@ class SearchResource(Resource):
                 if file.filename == '':
                     return {"error": "Fichier vide"}, 400
                 
-                # Sauvegarder temporairement
-                import tempfile
-                temp_path = os.path.join(tempfile.gettempdir(), file.filename)
-                file.save(temp_path)
-                
+                # Décoder l'image en mémoire (aucun fichier temporaire)
                 try:
-                    # Détecter les objets et extraire les descripteurs
-                    from utils.yolo_detection import detect_objects
-                    detected = detect_objects(temp_path)
-                    query_descriptors = extract_descriptors(temp_path)
-                    
-                    query_info = {
-                        "type": "upload",
-                        "filename": file.filename,
-                        "objects_detected": detected
-                    }
-                    search_by_objects = False  # Rechercher par image complète
-                finally:
-                    # Nettoyer le fichier temporaire
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
+                    query_image = decode_image(file.read())
+                except ValueError:
+                    return {"error": "Impossible de charger l'image"}, 400
+                
+                # Détecter les objets (en arrière-plan, seulement pour l'affichage)
+                # et extraire les descripteurs ; l'image de requête n'étant pas indexée,
+                # le cache persistant est lu mais pas alimenté
+                if parse_bool(request.values.get("detect") or options.get("detect"), default=True):
+                    detection = _query_detection.submit(detect_objects, query_image, store=False)
+                query_descriptors = extract_descriptors(query_image, store=False)
+                
+                query_info = {
+                    "type": "upload",
+                    "filename": file.filename
+                }
+                search_by_objects = False  # Rechercher par image complète
             
             elif search_type == "existing":
                 # Image existante en base
@@ -133,21 +165,8 @@ class SearchResource(Resource):
                             bbox = obj.get("bbox", [])
                             img = cv2.imread(image["path"])
                             if img is not None and len(bbox) == 4:
-                                x1, y1, x2, y2 = [int(coord) for coord in bbox]
-                                x1, y1 = max(0, x1), max(0, y1)
-                                x2, y2 = min(img.shape[1], x2), min(img.shape[0], y2)
-                                
-                                cropped = img[y1:y2, x1:x2]
-                                
-                                import tempfile
-                                temp_path = os.path.join(tempfile.gettempdir(), f"crop_{image_id}.jpg")
-                                cv2.imwrite(temp_path, cropped)
-                                
-                                try:
-                                    query_descriptors = extract_descriptors(temp_path)
-                                finally:
-                                    if os.path.exists(temp_path):
-                                        os.remove(temp_path)
+                                # Même extraction qu'à l'upload (mode crop ou pooled)
+                                query_descriptors = extract_object_descriptors(img, bbox)
                             else:
                                 return {"error": "Impossible d'extraire les descripteurs de l'objet"}, 500
                         
@@ -167,7 +186,7 @@ class SearchResource(Resource):
                     query_info = {
                         "type": "existing",
                         "image_id": image_id,
-                        "objects_detected": image.get("detected_objects", [])
+                        "objects_detected": shape_objects(image.get("detected_objects", []), include_descriptors)
                     }
                     search_by_objects = False  # Rechercher par image complète
             
@@ -177,28 +196,50 @@ class SearchResource(Resource):
             if not query_descriptors:
                 return {"error": "Impossible d'extraire les descripteurs"}, 500
             
-            # Récupérer toutes les images de la base
-            all_images = ImageModel.all()
-            
-            # Filtrer par classe d'objet si demandé
             object_class_filter = request.form.get("object_class") or (request.json.get("object_class") if request.is_json else None)
-            if object_class_filter:
-                filtered_images = []
-                for img in all_images:
-                    detected = img.get("detected_objects", [])
-                    if any(obj.get("class") == object_class_filter for obj in detected):
-                        filtered_images.append(img)
-                all_images = filtered_images
-            
-            # Rechercher les images similaires
             top_k = int(request.form.get("top_k", 10) or (request.json.get("top_k", 10) if request.is_json else 10))
             
-            similar_images = search_similar_images(
-                query_descriptors, 
-                all_images, 
-                top_k=top_k,
-                search_by_objects=search_by_objects
-            )
+            # Documents déjà chargés pendant le classement (moteur linéaire)
+            candidates = {}
+            
+            if SEARCH_ENGINE == "index":
+                # Index vectorisé résident (filtre de classe appliqué dans l'index)
+                index = get_search_index()
+                engine = index.objects if search_by_objects else index.images
+                similar_images = engine.search(
+                    query_descriptors,
+                    top_k=top_k,
+                    object_class=object_class_filter
+                )
+            else:
+                # Récupérer toutes les images de la base
+                all_images = ImageModel.all()
+                
+                # Filtrer par classe d'objet si demandé
+                if object_class_filter:
+                    filtered_images = []
+                    for img in all_images:
+                        detected = img.get("detected_objects", [])
+                        if any(obj.get("class") == object_class_filter for obj in detected):
+                            filtered_images.append(img)
+                    all_images = filtered_images
+                
+                # Rechercher les images similaires
+                similar_images = search_similar_images(
+                    query_descriptors, 
+                    all_images, 
+                    top_k=top_k,
+                    search_by_objects=search_by_objects
+                )
+                candidates = {str(img["_id"]): img for img in all_images}
+            
+            # Charger les documents des résultats en une seule requête (ordre du classement conservé)
+            result_ids = [str(item[0]) for item in similar_images]
+            missing_ids = [image_id for image_id in result_ids if image_id not in candidates]
+            if missing_ids:
+                projection = document_projection(fields, include_descriptors)
+                for doc in ImageModel.find_many(missing_ids, projection):
+                    candidates[str(doc["_id"])] = doc
             
             # Construire la réponse
             results = []
@@ -210,7 +251,7 @@ class SearchResource(Resource):
                     image_id, similarity_score = result_item
                     object_info = None
                 
-                image = ImageModel.find_by_id(image_id)
+                image = candidates.get(str(image_id))
                 if image:
                     detected_objects = image.get("detected_objects", [])
                     classes = list(set([obj.get("class") for obj in detected_objects if obj.get("class")]))
@@ -220,7 +261,7 @@ class SearchResource(Resource):
                         "image_id": str(image_id),  # Garder aussi image_id pour compatibilité
                         "filename": image.get("filename"),
                         "similarity_score": round(similarity_score, 4),
-                        "detected_objects": detected_objects,
+                        "detected_objects": shape_objects(detected_objects, include_descriptors),
                         "objects_count": len(detected_objects),
                         "object_classes": classes,
                         "uploaded_at": image.get("uploaded_at").isoformat() if image.get("uploaded_at") else None
@@ -230,7 +271,10 @@ class SearchResource(Resource):
                     if object_info:
                         result_data["matched_object"] = object_info
                     
-                    results.append(result_data)
+                    results.append(select_fields(result_data, fields))
+            
+            if detection is not None:
+                query_info["objects_detected"] = _query_detections(detection)
             
             return {
                 "query_info": query_info,
@@ -12,8 +12,10 @@ from flask import request, jsonify, current_app
 from flask_restful import Resource
 
 from models.image_model import ImageModel
+from utils.descriptor_extraction import DESCRIPTORS_VERSION
 from utils.yolo_detection import detect_objects
-from utils.descriptor_extraction import extract_descriptors
+from utils.extraction_pool import ImageExtraction
+from utils.search_index import mark_search_index_stale
 
 
 class TransformResource(Resource):
@@ -97,18 +99,22 @@ class TransformResource(Resource):
         # Sauvegarder l'image transformée
         cv2.imwrite(new_path, transformed_img)
         
-        # Détecter les objets et extraire les descripteurs
-        detected_objects = []
-        try:
-            detected_objects = detect_objects(new_path)
-        except Exception as e:
-            print(f"Erreur YOLO pour {new_filename}: {str(e)}")
-        
-        descriptors = {}
-        try:
-            descriptors = extract_descriptors(new_path)
-        except Exception as e:
-            return {"error": f"Erreur extraction descripteurs: {str(e)}"}, 500
+        # Détecter les objets et extraire les descripteurs (image en mémoire, sans relecture) :
+        # l'extraction tourne en arrière-plan pendant la détection, dont elle ne dépend pas
+        with ImageExtraction(transformed_img) as extraction:
+            extraction.start_descriptors()
+            
+            detected_objects = []
+            try:
+                detected_objects = detect_objects(transformed_img)
+            except Exception as e:
+                print(f"Erreur YOLO pour {new_filename}: {str(e)}")
+            
+            descriptors = {}
+            try:
+                descriptors = extraction.descriptors()
+            except Exception as e:
+                return {"error": f"Erreur extraction descripteurs: {str(e)}"}, 500
         
         # Stocker la nouvelle image dans MongoDB
         new_image_id = ImageModel.create(
@@ -116,7 +122,9 @@ class TransformResource(Resource):
             path=new_path,
             detected_objects=detected_objects,
             descriptors=descriptors,
+            descriptors_version=DESCRIPTORS_VERSION,
         )
+        mark_search_index_stale()
         
         return {
             "transformed_image_id": new_image_id,
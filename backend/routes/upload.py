@@ -1,20 +1,20 @@
 """
 Route pour l'upload d'images.
-Permet d'uploader une ou plusieurs images, détecte les objets avec YOLO,
-extrait les descripteurs visuels et stocke tout dans MongoDB.
+Permet d'uploader une ou plusieurs images : les fichiers sont sauvegardés puis
+un job d'ingestion est créé par image. La détection YOLO, l'extraction des
+descripteurs et le stockage dans MongoDB sont faits en arrière-plan
+(voir utils/ingestion.py et GET /jobs/<job_id>).
 """
 
 import os
 import uuid
-from flask import request, current_app, jsonify
+from flask import request, current_app
 from flask_restful import Resource
 from werkzeug.utils import secure_filename
 
-import cv2
-
-from models.image_model import ImageModel
-from utils.yolo_detection import detect_objects
-from utils.descriptor_extraction import extract_descriptors, extract_object_descriptors
+from models.job_model import JobModel
+from utils.image_io import check_image_file
+from utils.ingestion import submit_jobs
 
 
 # Extensions autorisées
@@ -32,12 +32,14 @@ class UploadResource(Resource):
     
     Fonctionnement:
     1. Reçoit une ou plusieurs images via multipart/form-data
-    2. Valide les extensions de fichiers
-    3. Sauvegarde les fichiers dans le dossier uploads/
-    4. Pour chaque image:
-       - Détecte les objets avec YOLOv8n
+    2. Valide les extensions de fichiers et vérifie que chaque image se décode
+    3. Sauvegarde les fichiers dans uploads/ et crée un job d'ingestion par image
+    4. Répond immédiatement (202) avec les IDs des jobs
+    5. En arrière-plan, un pool de INGESTION_WORKERS workers traite les jobs :
+       - Détecte les objets avec YOLOv8n, par lots de DETECTION_BATCH_SIZE images
        - Extrait tous les descripteurs visuels (couleur, texture, forme)
        - Stocke les métadonnées dans MongoDB
+    L'avancement de chaque job est consultable via GET /jobs/<job_id>.
     
     Format de la requête:
     - Content-Type: multipart/form-data
@@ -45,10 +47,11 @@ class UploadResource(Resource):
     
     Réponse:
     {
-        "uploaded": [
-            {"id": "image_id_1", "filename": "image1.jpg"},
-            {"id": "image_id_2", "filename": "image2.jpg"}
+        "jobs": [
+            {"job_id": "job_id_1", "filename": "image1_a1b2c3d4.jpg", "status": "queued"},
+            {"job_id": "job_id_2", "filename": "image2_e5f6a7b8.jpg", "status": "queued"}
         ],
+        "count": 2,
         "errors": []  # Si des erreurs se produisent
     }
     """
@@ -62,9 +65,43 @@ class UploadResource(Resource):
         if not files or files[0].filename == '':
             return {"error": "Aucun fichier sélectionné"}, 400
         
-        uploaded = []
         errors = []
+        jobs = []
+        for item in self._save_files(files, errors):
+            try:
+                job_id = JobModel.create(filename=item["filename"], path=item["path"])
+            except Exception as e:
+                errors.append({"filename": item["filename"], "error": str(e)})
+                if os.path.exists(item["path"]):
+                    os.remove(item["path"])
+                continue
+            jobs.append({"job_id": job_id, "filename": item["filename"]})
+        
+        # Traitement en arrière-plan (détection par lots, extraction, stockage)
+        submit_jobs([job["job_id"] for job in jobs])
+        for job in jobs:
+            stored = JobModel.find_by_id(job["job_id"])
+            job["status"] = stored["status"] if stored else "queued"
         
+        response = {
+            "jobs": jobs,
+            "count": len(jobs)
+        }
+        
+        if errors:
+            response["errors"] = errors
+        
+        status_code = 202 if jobs else 400
+        return response, status_code
+    
+    def _save_files(self, files, errors: list) -> list:
+        """
+        Valide (l'image doit se décoder) et sauvegarde les fichiers.
+        
+        Returns:
+            Liste de {"filename", "path"} pour les fichiers valides
+        """
+        pending = []
         for file in files:
             if not file or not file.filename:
                 continue
@@ -77,79 +114,33 @@ class UploadResource(Resource):
                 })
                 continue
             
+            save_path = None
             try:
                 # Générer un nom de fichier unique pour éviter les collisions
                 original_filename = secure_filename(file.filename)
                 name, ext = os.path.splitext(original_filename)
                 unique_filename = f"{name}_{uuid.uuid4().hex[:8]}{ext}"
                 
-                # Sauvegarder le fichier
+                # Sauvegarder le fichier original
                 save_path = os.path.join(
                     current_app.config["UPLOAD_FOLDER"], 
                     unique_filename
                 )
                 file.save(save_path)
                 
-                # Détecter les objets avec YOLO
-                detected_objects = []
+                # Refuser tout de suite les fichiers qui ne sont pas des images
+                # (en-tête seulement : le worker décode l'image une seule fois)
                 try:
-                    detected_objects = detect_objects(save_path)
-                except Exception as e:
-                    # Si YOLO échoue, continuer quand même
-                    print(f"Erreur YOLO pour {unique_filename}: {str(e)}")
-                
-                # Charger l'image pour extraire les descripteurs
-                image = cv2.imread(save_path)
-                if image is None:
+                    check_image_file(save_path)
+                except ValueError:
+                    os.remove(save_path)
                     errors.append({
                         "filename": unique_filename,
                         "error": "Impossible de charger l'image"
                     })
-                    if os.path.exists(save_path):
-                        os.remove(save_path)
                     continue
                 
-                # Extraire les descripteurs visuels de l'image complète
-                descriptors = {}
-                try:
-                    descriptors = extract_descriptors(save_path)
-                except Exception as e:
-                    errors.append({
-                        "filename": unique_filename,
-                        "error": f"Erreur extraction descripteurs image: {str(e)}"
-                    })
-                    # Supprimer le fichier si l'extraction échoue
-                    if os.path.exists(save_path):
-                        os.remove(save_path)
-                    continue
-                
-                # Extraire les descripteurs pour chaque objet détecté
-                for obj in detected_objects:
-                    try:
-                        bbox = obj.get("bbox", [])
-                        if len(bbox) == 4:
-                            # Extraire les descripteurs de cet objet spécifique
-                            object_descriptors = extract_object_descriptors(image, bbox)
-                            # Ajouter les descripteurs à l'objet
-                            obj["descriptors"] = object_descriptors
-                    except Exception as e:
-                        # Si l'extraction échoue pour un objet, continuer avec les autres
-                        print(f"Erreur extraction descripteurs pour objet {obj.get('class', 'unknown')}: {str(e)}")
-                        obj["descriptors"] = {}
-                
-                # Stocker dans MongoDB
-                image_id = ImageModel.create(
-                    filename=unique_filename,
-                    path=save_path,
-                    detected_objects=detected_objects,
-                    descriptors=descriptors,
-                )
-                
-                uploaded.append({
-                    "id": image_id,
-                    "filename": unique_filename,
-                    "objects_detected": len(detected_objects)
-                })
+                pending.append({"filename": unique_filename, "path": save_path})
                 
             except Exception as e:
                 errors.append({
@@ -157,16 +148,7 @@ class UploadResource(Resource):
                     "error": str(e)
                 })
                 # Nettoyer le fichier en cas d'erreur
-                if 'save_path' in locals() and os.path.exists(save_path):
+                if save_path and os.path.exists(save_path):
                     os.remove(save_path)
         
-        response = {
-            "uploaded": uploaded,
-            "count": len(uploaded)
-        }
-        
-        if errors:
-            response["errors"] = errors
-        
-        status_code = 201 if uploaded else 400
-        return response, status_code
+        return pending
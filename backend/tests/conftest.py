@@ -0,0 +1,36 @@
+"""
+Configuration commune des tests : rend les modules du backend importables
+(utils, models, config) quel que soit le répertoire de lancement de pytest,
+fournit une base MongoDB en mémoire (mongomock) à la place du serveur et isole
+le cache persistant des descripteurs dans un dossier temporaire.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    """Base mongomock utilisée par ImageModel et JobModel le temps d'un test."""
+    mongomock = pytest.importorskip("mongomock")
+    import models.image_model
+    import models.job_model
+
+    db = mongomock.MongoClient()["cbir_test"]
+    monkeypatch.setattr(models.image_model, "get_db", lambda: db)
+    monkeypatch.setattr(models.job_model, "get_db", lambda: db)
+    return db
+
+
+@pytest.fixture(autouse=True)
+def feature_cache(tmp_path, monkeypatch):
+    """Cache persistant du test (ne lit ni n'écrit le cache de l'application)."""
+    import utils.feature_cache
+
+    cache = utils.feature_cache.FeatureCache(str(tmp_path / "feature_cache.sqlite3"))
+    monkeypatch.setattr(utils.feature_cache, "_cache", cache)
+    return cache
@@ -0,0 +1,97 @@
+"""
+Parité entre les deux moteurs de Gabor : "fft" (une DFT de l'image pour tout
+le banc) et "spatial" (filter2D noyau par noyau, implémentation de référence).
+"""
+
+import numpy as np
+import pytest
+
+from utils.descriptor_extraction import (
+    GABOR_ENGINES,
+    GABOR_KSIZE,
+    GABOR_WINDOW,
+    ExtractionContext,
+    _pooled_gabor_descriptors,
+    extract_gabor_descriptors,
+)
+
+
+# Réponses en float32 sur des niveaux de gris dans [0, 1]
+ATOL = 1e-4
+
+
+def make_image(rng: np.random.Generator, height: int, width: int) -> np.ndarray:
+    """Image BGR texturée (dégradé, rayures et bruit) pour exciter tout le banc."""
+    y, x = np.mgrid[0:height, 0:width]
+    base = 127 + 60 * np.sin(x / 3.0) + 40 * np.cos((x + y) / 5.0)
+    channels = [base + rng.normal(0, 20, (height, width)) for _ in range(3)]
+    return np.clip(np.stack(channels, axis=2), 0, 255).astype(np.uint8)
+
+
+@pytest.fixture
+def rng() -> np.random.Generator:
+    return np.random.default_rng(42)
+
+
+@pytest.mark.parametrize("shape", [(64, 64), (63, 65), (97, 128), (128, 97), (31, 30), (256, 255)])
+def test_responses_match(rng, shape):
+    gray = make_image(rng, *shape)[:, :, 0].astype(np.float32) / 255.0
+    fft = list(GABOR_ENGINES["fft"](gray, GABOR_KSIZE, 8, 4))
+    spatial = list(GABOR_ENGINES["spatial"](gray, GABOR_KSIZE, 8, 4))
+    assert len(fft) == len(spatial) == 32
+    for a, b in zip(fft, spatial):
+        assert a.shape == b.shape == shape
+        assert np.allclose(a, b, atol=ATOL)
+
+
+@pytest.mark.parametrize("window_size", [None, GABOR_WINDOW])
+@pytest.mark.parametrize("shape", [(120, 160), (121, 161), (200, 77)])
+def test_descriptors_match(rng, shape, window_size):
+    image = make_image(rng, *shape)
+    fft = extract_gabor_descriptors(image, window_size=window_size, engine="fft")
+    spatial = extract_gabor_descriptors(image, window_size=window_size, engine="spatial")
+    assert len(fft) == len(spatial) == 64
+    assert np.allclose(fft, spatial, atol=ATOL)
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (2, 3), (5, 7), (10, 9), (11, 4), (20, 21), (21, 20)])
+def test_small_crops_match(rng, shape):
+    # Crops plus petits que le noyau (GABOR_KSIZE) : les bords étendus dominent
+    image = make_image(rng, 40, 40)
+    ctx = ExtractionContext(image)
+    crop = ctx.crop(3, 5, 3 + shape[1], 5 + shape[0])
+    fft = extract_gabor_descriptors(crop, engine="fft")
+    spatial = extract_gabor_descriptors(crop, engine="spatial")
+    assert np.allclose(fft, spatial, atol=ATOL)
+
+
+@pytest.mark.parametrize("shape", [(240, 320), (241, 319), (700, 450)])
+def test_pooled_match(rng, shape):
+    # (700, 450) dépasse POOLED_GABOR_MAX_SIDE : réponses calculées sur l'image réduite
+    image = make_image(rng, *shape)
+    height, width = shape
+    regions = [
+        (0, 0, width, height),
+        (0, 0, width // 2, height // 2),
+        (width // 3, height // 4, width - 1, height - 3),
+        (5, 7, 6, 8),
+        (width - 9, height - 4, width, height),
+    ]
+    ctx = ExtractionContext(image)
+    fft = _pooled_gabor_descriptors(ctx, regions, engine="fft")
+    spatial = _pooled_gabor_descriptors(ctx, regions, engine="spatial")
+    assert fft.shape == spatial.shape == (len(regions), 64)
+    assert np.allclose(fft, spatial, atol=ATOL)
+
+
+def test_pooled_full_region_matches_extraction(rng):
+    # Image sous POOLED_GABOR_MAX_SIDE : la région complète donne les descripteurs de l'image
+    image = make_image(rng, 150, 180)
+    ctx = ExtractionContext(image)
+    pooled = _pooled_gabor_descriptors(ctx, [(0, 0, 180, 150)], engine="fft")[0]
+    assert np.allclose(pooled, extract_gabor_descriptors(image, engine="spatial"), atol=ATOL)
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        extract_gabor_descriptors(np.zeros((8, 8), dtype=np.uint8), engine="gpu")
@@ -0,0 +1,106 @@
+"""
+Non-régression du partage des conversions (ExtractionContext) : sur des images
+fixes, extract_descriptors et extract_objects_descriptors (mode "crop") donnent
+exactement les mêmes descripteurs que les extracteurs de référence, qui
+reconvertissent l'image à chaque appel (tests/reference_extractors.py).
+
+Exceptions, introduites volontairement après le passage au contexte partagé :
+- rugosité et contraste de Tamura calculés par image intégrale et histogramme
+  (écart de l'ordre de 1e-7, comparés avec une tolérance) ;
+- rugosité de Tamura d'un objet : les fenêtres du bord du crop lisent les
+  pixels voisins dans l'image complète au lieu de les refléter, elle n'est
+  donc pas comparée à la référence (voir test_tamura.py).
+Le Gabor est comparé avec le moteur "spatial" de la référence (parité du
+moteur "fft" : test_descriptors.py).
+"""
+
+import functools
+
+import cv2
+import numpy as np
+import pytest
+
+import reference_extractors as reference
+import utils.descriptor_extraction as descriptor_extraction
+from utils.descriptor_extraction import ExtractionContext, extract_descriptors, extract_objects_descriptors
+
+
+def make_image(seed: int, height: int, width: int) -> np.ndarray:
+    """Image BGR déterministe : dégradés, formes pleines et bruit."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    image = np.stack([x * 255 // max(1, width - 1), y * 255 // max(1, height - 1),
+                      (x + y) * 127 // max(1, width + height - 2)], axis=2).astype(np.uint8)
+    for _ in range(6):
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        if rng.random() < 0.5:
+            cv2.circle(image, center, int(rng.integers(3, max(4, min(height, width) // 3))), color, -1)
+        else:
+            cv2.rectangle(image, center, (center[0] + int(rng.integers(5, 60)), center[1] + int(rng.integers(5, 60))),
+                          color, -1)
+    noise = rng.normal(0, 12, image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+# (graine, hauteur, largeur) : tailles impaires et une image de plus de 100 000 pixels
+# (couleurs dominantes calculées sur une version réduite)
+IMAGES = [(1, 97, 131), (2, 240, 320), (3, 400, 300)]
+
+BBOXES = [
+    [10.7, 5.2, 80.9, 60.1],
+    [0, 0, 40, 30],         # coin de l'image
+    [-20, 50, 5000, 90],    # dépasse de l'image (ramenée dans ses limites)
+    [30, 30, 34, 37],       # très petit objet
+]
+
+
+@pytest.fixture(autouse=True)
+def spatial_gabor(monkeypatch):
+    """Gabor "spatial" (celui de la référence) dans _extract_all."""
+    monkeypatch.setattr(descriptor_extraction, "extract_gabor_descriptors",
+                        functools.partial(descriptor_extraction.extract_gabor_descriptors, engine="spatial"))
+    monkeypatch.setattr(descriptor_extraction, "DOMINANT_COLORS_ENGINE", "kmeans")
+
+
+def assert_identical(actual: dict, expected: dict, crop: bool = False) -> None:
+    assert actual.keys() == expected.keys()
+    for family in expected:
+        if family == "tamura":
+            continue
+        assert actual[family] == expected[family], family
+
+    assert actual["tamura"].keys() == expected["tamura"].keys()
+    assert actual["tamura"]["directionality"] == expected["tamura"]["directionality"]
+    assert actual["tamura"]["contrast"] == pytest.approx(expected["tamura"]["contrast"], rel=1e-9)
+    if not crop:
+        assert actual["tamura"]["roughness"] == pytest.approx(expected["tamura"]["roughness"], rel=1e-5)
+
+
+@pytest.mark.parametrize("seed, height, width", IMAGES)
+def test_image_descriptors_match_reference(seed, height, width):
+    image = make_image(seed, height, width)
+    assert_identical(extract_descriptors(image), reference.extract_descriptors(image))
+
+
+@pytest.mark.parametrize("seed, height, width", IMAGES[:2])
+def test_shared_context_matches_reference(seed, height, width):
+    # Image complète puis objets sur le même contexte (ordre de l'ingestion)
+    image = make_image(seed, height, width)
+    ctx = ExtractionContext(image)
+    assert_identical(extract_descriptors(ctx), reference.extract_descriptors(image))
+
+    objects = extract_objects_descriptors(ctx, BBOXES, "crop")
+    assert len(objects) == len(BBOXES)
+    for actual, bbox in zip(objects, BBOXES):
+        assert_identical(actual, reference.extract_object_descriptors(image, bbox), crop=True)
+
+
+def test_released_context_matches_reference():
+    # Conversions libérées entre l'image complète et les objets (extraction_pool)
+    image = make_image(4, 150, 200)
+    ctx = ExtractionContext(image)
+    extract_descriptors(ctx)
+    ctx.release()
+    for actual, bbox in zip(extract_objects_descriptors(ctx, BBOXES, "crop"), BBOXES):
+        assert_identical(actual, reference.extract_object_descriptors(image, bbox), crop=True)
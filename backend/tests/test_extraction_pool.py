@@ -0,0 +1,23 @@
+"""
+Processus du pool d'extraction : créés en mode "spawn", ils réimportent le
+script principal (app.py) et ne doivent pas charger le détecteur.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_app_does_not_load_the_detector():
+    # Import fait par chaque processus "spawn" quand l'API est lancée avec `python app.py`
+    code = (
+        "import json, sys; import app; "
+        "print(json.dumps([m for m in ('ultralytics', 'torch', 'utils.yolo_detection', 'routes.search') "
+        "if m in sys.modules]))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True,
+                            text=True, check=True).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == []
@@ -0,0 +1,119 @@
+"""
+Cache persistant des détections et des descripteurs (FeatureCache) : lecture
+et écriture, séparation des clés par paramètres, éviction LRU sous max_bytes,
+compteurs de hits / misses et entrées illisibles traitées comme des misses.
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from utils.feature_cache import EVICTION_TARGET, FeatureCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FeatureCache(str(tmp_path / "cache.sqlite3"), max_bytes=1024 * 1024)
+
+
+def test_put_then_get(cache):
+    value = {"hog": np.arange(10, dtype=np.float32), "boxes": [[1, 2, 3, 4]]}
+    assert cache.get("descriptors", "digest", {"version": 1}) is None
+
+    cache.put("descriptors", "digest", {"version": 1}, value)
+    cached = cache.get("descriptors", "digest", {"version": 1})
+    np.testing.assert_array_equal(cached["hog"], value["hog"])
+    assert cached["boxes"] == value["boxes"]
+
+
+def test_keys_are_separated_by_kind_digest_and_params(cache):
+    cache.put("descriptors", "digest", {"version": 1, "engine": "fft"}, "fft")
+    cache.put("descriptors", "digest", {"version": 1, "engine": "spatial"}, "spatial")
+    cache.put("detections", "digest", {"version": 1, "engine": "fft"}, "detections")
+
+    assert cache.get("descriptors", "digest", {"engine": "fft", "version": 1}) == "fft"
+    assert cache.get("descriptors", "digest", {"version": 1, "engine": "spatial"}) == "spatial"
+    assert cache.get("detections", "digest", {"version": 1, "engine": "fft"}) == "detections"
+    assert cache.get("descriptors", "digest", {"version": 2, "engine": "fft"}) is None
+    assert cache.get("descriptors", "other", {"version": 1, "engine": "fft"}) is None
+
+
+def test_eviction_keeps_the_cache_under_max_bytes(tmp_path):
+    value = b"x" * 1000
+    size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    cache = FeatureCache(str(tmp_path / "cache.sqlite3"), max_bytes=size * 10)
+    connection = cache._connection()
+    for i in range(10):
+        cache.put("descriptors", str(i), {}, value)
+        # Dates d'utilisation distinctes : l'entrée 0 est la plus ancienne
+        connection.execute("UPDATE features SET last_used = ? WHERE key = ?",
+                           (float(i), cache.key("descriptors", str(i), {})))
+    assert cache.stats()["entries"] == 10
+
+    cache.put("descriptors", "new", {}, value)
+    stats = cache.stats()
+    assert stats["bytes"] <= size * 10 * EVICTION_TARGET
+    assert stats["bytes"] == stats["entries"] * size
+    # Les entrées les moins récemment utilisées sont évincées en premier
+    assert cache.get("descriptors", "0", {}) is None
+    assert cache.get("descriptors", "1", {}) is None
+    assert cache.get("descriptors", "9", {}) == value
+    assert cache.get("descriptors", "new", {}) == value
+
+
+def test_stats_count_hits_and_misses_by_kind(cache):
+    cache.put("detections", "a", {}, [])
+    cache.get("detections", "a", {})
+    cache.get("detections", "a", {})
+    cache.get("detections", "b", {})
+    cache.get("descriptors", "a", {})
+
+    kinds = cache.stats()["kinds"]
+    assert kinds["detections"] == {"hits": 2, "misses": 1, "hit_rate": round(2 / 3, 4)}
+    assert kinds["descriptors"] == {"hits": 0, "misses": 1, "hit_rate": 0.0}
+
+    cache.clear()
+    stats = cache.stats()
+    assert stats["entries"] == 0 and stats["bytes"] == 0 and stats["kinds"] == {}
+
+
+def test_fetch_computes_once_and_store_false_does_not_write(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [1, 2]
+
+    assert cache.fetch("detections", "query", {}, compute, store=False) == [1, 2]
+    assert cache.get("detections", "query", {}) is None
+    assert cache.fetch("detections", "image", {}, compute) == [1, 2]
+    assert cache.fetch("detections", "image", {}, compute) == [1, 2]
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("blob", [
+    pickle.dumps(np.arange(100), protocol=pickle.HIGHEST_PROTOCOL)[:-10],  # tronqué
+    b"cbuiltins\nno_such_attribute\n.",  # AttributeError (autre version d'une bibliothèque)
+    b"cno_such_module\nValue\n.",  # ModuleNotFoundError
+    b"",  # EOFError
+])
+def test_unreadable_entry_is_a_miss_and_is_deleted(cache, blob):
+    cache.put("descriptors", "digest", {}, "value")
+    cache._connection().execute("UPDATE features SET value = ?, size = ? WHERE key = ?",
+                                (blob, len(blob), cache.key("descriptors", "digest", {})))
+
+    assert cache.get("descriptors", "digest", {}) is None
+    stats = cache.stats()
+    assert stats["entries"] == 0 and stats["bytes"] == 0
+    assert stats["kinds"]["descriptors"] == {"hits": 0, "misses": 1, "hit_rate": 0.0}
+    # Recalculée puis stockée à nouveau
+    assert cache.fetch("descriptors", "digest", {}, lambda: "computed") == "computed"
+    assert cache.get("descriptors", "digest", {}) == "computed"
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = FeatureCache(str(tmp_path / "cache.sqlite3"), max_bytes=0)
+    cache.put("detections", "a", {}, [])
+    assert cache.get("detections", "a", {}) is None
+    assert cache.stats() == {"enabled": False, "max_bytes": 0}
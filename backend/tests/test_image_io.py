@@ -0,0 +1,36 @@
+"""
+Vérification des fichiers uploadés (check_image_file) : en-tête et structure
+contrôlés sans décoder les pixels.
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.image_io import check_image_file
+
+
+@pytest.mark.parametrize("ext", [".png", ".jpg", ".bmp", ".webp"])
+def test_valid_images_are_accepted(tmp_path, ext):
+    path = str(tmp_path / f"image{ext}")
+    cv2.imwrite(path, np.random.default_rng(0).integers(0, 256, (40, 60, 3), dtype=np.uint8))
+    check_image_file(path)
+
+
+def test_non_images_are_rejected(tmp_path):
+    path = tmp_path / "fake.jpg"
+    path.write_bytes(b"garbage")
+    with pytest.raises(ValueError):
+        check_image_file(str(path))
+
+
+def test_corrupted_png_is_rejected(tmp_path):
+    path = tmp_path / "corrupted.png"
+    cv2.imwrite(str(path), np.zeros((40, 60, 3), dtype=np.uint8))
+    data = bytearray(path.read_bytes())
+    # Données du chunk IDAT modifiées : signature intacte, CRC invalide
+    idat = data.index(b"IDAT")
+    data[idat + 6] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        check_image_file(str(path))
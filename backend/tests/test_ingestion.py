@@ -0,0 +1,90 @@
+"""
+Fin des jobs d'ingestion quand le bail a expiré pendant le traitement : seul
+le propriétaire courant termine le job, et une image dont le job a été marqué
+en échec (fichier supprimé) n'est pas gardée. Nécessite ultralytics (importé
+par utils.ingestion via la détection YOLO).
+"""
+
+import threading
+
+import pytest
+
+pytest.importorskip("ultralytics")
+
+import models.job_model
+import utils.ingestion
+from models.image_model import ImageModel
+from models.job_model import JobModel
+
+
+def claimed_job(tmp_path, name: str = "a.png"):
+    path = tmp_path / name
+    path.write_bytes(b"image")
+    return JobModel.claim(JobModel.create(name, str(path)))
+
+
+def take_over(monkeypatch, job):
+    """Bail expiré : le job est remis en attente puis réservé par une autre exécution."""
+    JobModel.collection().update_one({"_id": job["_id"]}, {"$set": {"status": "queued"}, "$unset": {"owner": ""}})
+    monkeypatch.setattr(models.job_model, "_INSTANCE", "other")
+    JobModel.claim(str(job["_id"]))
+
+
+def test_failure_after_storing_completes_the_job(tmp_path, mongo_db):
+    job = claimed_job(tmp_path)
+    image_id = ImageModel.create(filename=job["filename"], path=job["path"], descriptors={}, job_id=str(job["_id"]))
+
+    utils.ingestion._fail(job, "erreur")
+    stored = JobModel.find_by_id(str(job["_id"]))
+    assert stored["status"] == "done" and stored["image_id"] == image_id
+    assert (tmp_path / "a.png").exists()
+
+
+def test_stale_worker_drops_its_image_when_the_job_failed(tmp_path, mongo_db, monkeypatch):
+    job = claimed_job(tmp_path)
+    first_instance = models.job_model._INSTANCE
+
+    with monkeypatch.context() as m:
+        take_over(m, job)
+        utils.ingestion._fail(job, "erreur")
+    assert models.job_model._INSTANCE == first_instance
+    assert not (tmp_path / "a.png").exists()
+
+    # Le premier worker termine après coup : son image pointe vers un fichier supprimé
+    image_id = ImageModel.create(filename=job["filename"], path=job["path"], descriptors={}, job_id=str(job["_id"]))
+    utils.ingestion._complete(job, {"id": image_id, "filename": job["filename"], "objects_detected": 0})
+
+    assert JobModel.find_by_id(str(job["_id"]))["status"] == "failed"
+    assert ImageModel.find_by_job(str(job["_id"])) is None
+
+
+def test_failure_after_takeover_keeps_the_stored_image(tmp_path, mongo_db, monkeypatch):
+    job = claimed_job(tmp_path)
+    with monkeypatch.context() as m:
+        take_over(m, job)
+        # La nouvelle exécution stocke l'image et termine le job
+        image_id = ImageModel.create(filename=job["filename"], path=job["path"], descriptors={},
+                                     job_id=str(job["_id"]))
+        JobModel.complete(str(job["_id"]), image_id, 0)
+
+    # Le premier worker échoue ensuite : ni le job ni le fichier ne sont touchés
+    utils.ingestion._fail(job, "erreur")
+    stored = JobModel.find_by_id(str(job["_id"]))
+    assert stored["status"] == "done" and stored["image_id"] == image_id
+    assert (tmp_path / "a.png").exists()
+
+
+def test_heartbeat_renews_leases_until_stopped(mongo_db, monkeypatch):
+    renewed = threading.Event()
+    calls = []
+
+    def renew(job_ids):
+        calls.append(job_ids)
+        renewed.set()
+
+    monkeypatch.setattr(utils.ingestion, "JOB_LEASE_SECONDS", 3)
+    monkeypatch.setattr(JobModel, "renew", renew)
+    stop = utils.ingestion._start_heartbeat(["job"])
+    assert renewed.wait(5)
+    stop.set()
+    assert calls[0] == ["job"]
@@ -0,0 +1,127 @@
+"""
+File d'attente des jobs d'ingestion (JobModel) sur une base mongomock :
+réservation, bail et reprise des jobs abandonnés, garde propriétaire de
+complete/fail et unicité de l'image d'un job.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import models.job_model
+from models.image_model import ImageModel
+from models.job_model import JobModel, current_owner
+
+
+def as_other_worker(monkeypatch) -> None:
+    """Les appels suivants sont faits au nom d'une autre exécution du processus."""
+    monkeypatch.setattr(models.job_model, "_INSTANCE", "other")
+
+
+def expire_lease(mongo_db, job_id: str) -> None:
+    mongo_db["jobs"].update_one({"_id": ImageModel._to_object_id(job_id)},
+                                {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+
+
+def test_claim_reserves_a_queued_job_once(mongo_db):
+    job_id = JobModel.create("a.png", "/tmp/a.png")
+
+    job = JobModel.claim(job_id)
+    assert job["status"] == "running"
+    assert job["owner"] == current_owner()
+    assert job["attempts"] == 1
+    assert job["lease_expires_at"] > datetime.utcnow()
+    # Déjà réservé : un second worker ne le prend pas
+    assert JobModel.claim(job_id) is None
+    assert JobModel.queued_ids() == []
+
+
+def test_requeue_expired_only_takes_abandoned_jobs(mongo_db):
+    valid_lease = datetime.utcnow() + timedelta(hours=1)
+    own, expired, dead, remote = (JobModel.create(f"{name}.png", f"/tmp/{name}.png")
+                                  for name in ("own", "expired", "dead", "remote"))
+    JobModel.claim(own)
+    for job_id, owner, lease in (
+        (expired, "remote-host:1:x", datetime.utcnow() - timedelta(seconds=1)),
+        # Même processus, autre exécution (PID réutilisé après un redémarrage)
+        (dead, current_owner().rsplit(":", 1)[0] + ":previous", valid_lease),
+        (remote, "remote-host:1:x", valid_lease),
+    ):
+        mongo_db["jobs"].update_one({"_id": ImageModel._to_object_id(job_id)}, {"$set": {
+            "status": "running", "owner": owner, "lease_expires_at": lease,
+        }})
+
+    assert sorted(JobModel.requeue_expired()) == sorted([expired, dead])
+    assert JobModel.find_by_id(own)["status"] == "running"
+    assert JobModel.find_by_id(remote)["status"] == "running"
+    requeued = JobModel.find_by_id(expired)
+    assert requeued["status"] == "queued" and "owner" not in requeued
+    # Remis en attente : à nouveau réservable
+    assert JobModel.claim(expired)["attempts"] == 1
+    assert JobModel.requeue_expired() == []
+
+
+def test_renew_and_set_stage_extend_own_leases(mongo_db):
+    job_id = JobModel.create("a.png", "/tmp/a.png")
+    JobModel.claim(job_id)
+    expire_lease(mongo_db, job_id)
+
+    JobModel.renew([job_id])
+    assert JobModel.find_by_id(job_id)["lease_expires_at"] > datetime.utcnow()
+    assert JobModel.requeue_expired() == []
+
+    JobModel.set_stage([job_id], "extraction")
+    assert JobModel.find_by_id(job_id)["stage"] == "extraction"
+
+
+def test_renew_ignores_jobs_of_other_owners(mongo_db, monkeypatch):
+    job_id = JobModel.create("a.png", "/tmp/a.png")
+    JobModel.claim(job_id)
+    expire_lease(mongo_db, job_id)
+
+    as_other_worker(monkeypatch)
+    JobModel.renew([job_id])
+    assert JobModel.find_by_id(job_id)["lease_expires_at"] < datetime.utcnow()
+
+
+def test_complete_and_fail_require_the_current_owner(mongo_db, monkeypatch):
+    job_id = JobModel.create("a.png", "/tmp/a.png")
+    JobModel.claim(job_id)
+    expire_lease(mongo_db, job_id)
+    first_owner = models.job_model._INSTANCE
+
+    # Bail expiré : le job est repris par un autre worker, qui le marque en échec
+    with monkeypatch.context() as m:
+        as_other_worker(m)
+        assert JobModel.requeue_expired() == [job_id]
+        assert JobModel.claim(job_id)["attempts"] == 2
+        assert JobModel.fail(job_id, "erreur") is True
+    assert models.job_model._INSTANCE == first_owner
+
+    # Le premier worker ne peut plus ni terminer ni marquer le job
+    assert JobModel.complete(job_id, "0" * 24, 3) is False
+    assert JobModel.fail(job_id, "autre erreur") is False
+    job = JobModel.find_by_id(job_id)
+    assert job["status"] == "failed" and job["error"] == "erreur"
+    assert "image_id" not in job
+
+
+def test_complete_is_not_repeated(mongo_db):
+    job_id = JobModel.create("a.png", "/tmp/a.png")
+    JobModel.claim(job_id)
+
+    assert JobModel.complete(job_id, "0" * 24, 2) is True
+    assert JobModel.complete(job_id, "1" * 24, 5) is False
+    assert JobModel.serialize(JobModel.find_by_id(job_id))["image_id"] == "0" * 24
+
+
+def test_one_image_per_job(mongo_db):
+    ImageModel.ensure_indexes()
+    ImageModel.create(filename="a.png", path="/tmp/a.png", descriptors={}, job_id="job")
+    with pytest.raises(DuplicateKeyError):
+        ImageModel.create(filename="a.png", path="/tmp/a.png", descriptors={}, job_id="job")
+    # Images sans job (index sparse) : pas de conflit
+    ImageModel.create(filename="b.png", path="/tmp/b.png", descriptors={})
+    ImageModel.create(filename="c.png", path="/tmp/c.png", descriptors={})
+    assert ImageModel.find_by_job("job", {"filename": 1})["filename"] == "a.png"
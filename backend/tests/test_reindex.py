@@ -0,0 +1,61 @@
+"""
+Ré-indexation des descripteurs (reindex_descriptors.py) : les images non
+versionnées ou d'une autre version des extracteurs sont recalculées, les
+images à jour ne sont pas touchées.
+"""
+
+import cv2
+import numpy as np
+
+from models.image_model import ImageModel
+from reindex_descriptors import reindex
+from utils.descriptor_extraction import DESCRIPTORS_VERSION, HOG_WINDOW
+
+
+HOG_LENGTH = ((HOG_WINDOW[0] // 8 - 1) * (HOG_WINDOW[1] // 8 - 1)) * 4 * 9
+
+
+def write_image(tmp_path, name: str) -> str:
+    path = str(tmp_path / name)
+    image = np.random.default_rng(len(name)).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    cv2.imwrite(path, image)
+    return path
+
+
+def test_reindex_outdated_images(tmp_path, mongo_db):
+    legacy_descriptors = {"hog": np.ones(20000).tolist(), "gabor": np.ones(64).tolist()}
+    legacy_id = ImageModel.create(
+        filename="legacy.png", path=write_image(tmp_path, "legacy.png"), descriptors=legacy_descriptors,
+        detected_objects=[
+            {"class": "car", "confidence": 0.9, "bbox": [10, 10, 90, 70], "descriptors": legacy_descriptors},
+            {"class": "dog", "confidence": 0.5, "bbox": []},
+        ],
+    )
+    current_id = ImageModel.create(filename="current.png", path=write_image(tmp_path, "current.png"),
+                                   descriptors={"hog": [0.5]}, descriptors_version=DESCRIPTORS_VERSION)
+    missing_id = ImageModel.create(filename="missing.png", path=str(tmp_path / "missing.png"),
+                                   descriptors=legacy_descriptors, descriptors_version=DESCRIPTORS_VERSION - 1)
+
+    assert [str(img["_id"]) for img in ImageModel.find_outdated(DESCRIPTORS_VERSION)] == [legacy_id, missing_id]
+    # Fichier manquant : compté en échec, document inchangé
+    assert reindex() == 1
+
+    legacy = ImageModel.find_by_id(legacy_id)
+    assert legacy["descriptors_version"] == DESCRIPTORS_VERSION
+    assert len(legacy["descriptors"]["hog"]) == HOG_LENGTH
+    car, dog = legacy["detected_objects"]
+    assert len(car["descriptors"]["hog"]) == HOG_LENGTH and car["class"] == "car"
+    assert "descriptors" not in dog
+
+    assert ImageModel.find_by_id(current_id)["descriptors"]["hog"] == [0.5]
+    assert ImageModel.find_by_id(missing_id)["descriptors_version"] == DESCRIPTORS_VERSION - 1
+    assert [str(img["_id"]) for img in ImageModel.find_outdated(DESCRIPTORS_VERSION)] == [missing_id]
+
+
+def test_reindex_dry_run_and_all(tmp_path, mongo_db):
+    image_id = ImageModel.create(filename="a.png", path=write_image(tmp_path, "a.png"),
+                                 descriptors={"hog": [0.5]}, descriptors_version=DESCRIPTORS_VERSION)
+    assert reindex(all_images=True, dry_run=True) == 0
+    assert ImageModel.find_by_id(image_id)["descriptors"]["hog"] == [0.5]
+    assert reindex(all_images=True) == 0
+    assert len(ImageModel.find_by_id(image_id)["descriptors"]["hog"]) == HOG_LENGTH
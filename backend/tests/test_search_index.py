@@ -0,0 +1,182 @@
+"""
+Index de recherche résident (ImageIndex, ObjectIndex, SearchIndex) : mêmes
+résultats que la recherche linéaire search_similar_images, y compris avec le
+filtre object_class et après une suite d'appels à extended() ; tenue à jour
+de l'index partagé par get_search_index.
+"""
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+import utils.search_index as search_index
+from models.image_model import ImageModel
+from test_similarity import make_descriptors
+from utils.search_index import ImageIndex, ObjectIndex, SearchIndex, get_search_index
+from utils.similarity_search import search_similar_images
+
+
+CLASSES = ("car", "dog", "person")
+
+
+def make_images(rng: np.random.Generator, count: int) -> list:
+    """Documents d'images (triés par _id) avec descripteurs et objets détectés."""
+    images = []
+    for _ in range(count):
+        objects = []
+        for _ in range(int(rng.integers(0, 4))):
+            obj = {"class": str(rng.choice(CLASSES)), "confidence": float(rng.random()), "bbox": [0, 0, 10, 10]}
+            # Certains objets n'ont pas de descripteurs (extraction échouée)
+            if rng.random() < 0.8:
+                obj["descriptors"] = make_descriptors(rng, hog_len=36)
+            objects.append(obj)
+        images.append({
+            "_id": ObjectId(),
+            "descriptors": make_descriptors(rng, hog_len=36) if rng.random() < 0.9 else {},
+            "detected_objects": objects,
+        })
+    return images
+
+
+def linear_search(query: dict, images: list, top_k: int, object_class=None, search_by_objects=False) -> list:
+    """Recherche de référence, filtre de classe appliqué comme dans routes/search.py."""
+    if object_class:
+        images = [img for img in images
+                  if any(obj.get("class") == object_class for obj in img.get("detected_objects", []))]
+    return search_similar_images(query, images, top_k=top_k, search_by_objects=search_by_objects)
+
+
+def assert_same_results(indexed: list, linear: list) -> None:
+    assert [str(image_id) for image_id, _, _ in indexed] == [image_id for image_id, _, _ in linear]
+    assert np.allclose([distance for _, distance, _ in indexed], [distance for _, distance, _ in linear],
+                       rtol=1e-5, atol=1e-6)
+    for (_, _, indexed_info), (_, _, linear_info) in zip(indexed, linear):
+        if linear_info is None:
+            assert indexed_info is None
+        else:
+            assert indexed_info["object_index"] == linear_info["object_index"]
+            assert indexed_info["object_class"] == linear_info["object_class"]
+            assert indexed_info["confidence"] == pytest.approx(linear_info["confidence"])
+
+
+@pytest.fixture
+def rng() -> np.random.Generator:
+    return np.random.default_rng(42)
+
+
+@pytest.mark.parametrize("object_class", [None, "car", "dog", "unknown"])
+@pytest.mark.parametrize("top_k", [1, 5, 100])
+def test_image_index_matches_linear_search(rng, object_class, top_k):
+    images = make_images(rng, 40)
+    query = make_descriptors(rng, hog_len=36)
+    assert_same_results(ImageIndex(images).search(query, top_k=top_k, object_class=object_class),
+                        linear_search(query, images, top_k, object_class))
+
+
+@pytest.mark.parametrize("object_class", [None, "person", "unknown"])
+@pytest.mark.parametrize("top_k", [1, 5, 100])
+def test_object_index_matches_linear_search(rng, object_class, top_k):
+    images = make_images(rng, 40)
+    query = make_descriptors(rng, hog_len=36)
+    assert_same_results(ObjectIndex(images).search(query, top_k=top_k, object_class=object_class),
+                        linear_search(query, images, top_k, object_class, search_by_objects=True))
+
+
+@pytest.mark.parametrize("object_class", [None, "dog"])
+def test_extended_chain_matches_full_build(rng, object_class):
+    images = make_images(rng, 60)
+    query = make_descriptors(rng, hog_len=36)
+    index = SearchIndex(images[:5])
+    # Ajouts successifs de tailles variées (dont vides), comme les recherches entre deux uploads
+    snapshots = []
+    for start, stop in ((5, 6), (6, 6), (6, 20), (20, 21), (21, 45), (45, 60)):
+        index = index.extended(images[start:stop])
+        snapshots.append((index, stop))
+    assert index.count == len(images) and index.last_id == str(images[-1]["_id"])
+
+    # Les index intermédiaires restent valides malgré les buffers partagés
+    for snapshot, stop in snapshots:
+        assert_same_results(snapshot.images.search(query, top_k=10, object_class=object_class),
+                            linear_search(query, images[:stop], 10, object_class))
+        assert_same_results(snapshot.objects.search(query, top_k=10, object_class=object_class),
+                            linear_search(query, images[:stop], 10, object_class, search_by_objects=True))
+
+
+def test_extended_branches_do_not_interfere(rng):
+    images = make_images(rng, 30)
+    query = make_descriptors(rng, hog_len=36)
+    base = SearchIndex(images[:10]).extended(images[10:15])
+    # Deux extensions du même index : la seconde ne doit pas écraser la première
+    first = base.extended(images[15:30])
+    other = make_images(rng, 10)
+    second = base.extended(other)
+    assert_same_results(first.images.search(query, top_k=30), linear_search(query, images, 30))
+    assert_same_results(second.images.search(query, top_k=30), linear_search(query, images[:15] + other, 30))
+    assert_same_results(second.objects.search(query, top_k=30),
+                        linear_search(query, images[:15] + other, 30, search_by_objects=True))
+
+
+def test_malformed_documents_are_skipped(rng):
+    images = make_images(rng, 10)
+    images[3]["descriptors"] = {"hog": "corrompu"}
+    images[4]["detected_objects"] = [{"class": "car", "descriptors": {"gabor": {"__ndarray__": b"x"}}}]
+    query = make_descriptors(rng, hog_len=36)
+    index = SearchIndex(images[:2]).extended(images[2:])
+    assert str(images[3]["_id"]) not in [image_id for image_id, _, _ in index.images.search(query, top_k=20)]
+    assert_same_results(index.images.search(query, top_k=20), linear_search(query, images, 20))
+    assert_same_results(index.objects.search(query, top_k=20, object_class="car"),
+                        linear_search(query, images, 20, "car", search_by_objects=True))
+
+
+@pytest.fixture
+def shared_index(mongo_db, monkeypatch):
+    """Index partagé vide, vérifié à chaque appel (SEARCH_INDEX_CHECK_SECONDS = 0)."""
+    monkeypatch.setattr(search_index, "SEARCH_INDEX_CHECK_SECONDS", 0)
+    search_index.invalidate_search_index()
+    yield
+    search_index.invalidate_search_index()
+
+
+def insert_images(rng: np.random.Generator, count: int) -> list:
+    return [ImageModel.create(filename="f.jpg", path="/tmp/f.jpg", descriptors=make_descriptors(rng, hog_len=36))
+            for _ in range(count)]
+
+
+def test_get_search_index_follows_collection(rng, shared_index):
+    insert_images(rng, 3)
+    index = get_search_index()
+    assert len(index.images) == 3
+
+    # Insertions : index étendu (pas reconstruit)
+    added = insert_images(rng, 2)
+    extended = get_search_index()
+    assert len(extended.images) == 5 and extended.last_id == added[-1]
+    assert extended.images.ids[:3].tolist() == index.images.ids.tolist()
+
+    # Suppression et insertion (même nombre de documents) : reconstruction
+    ImageModel.delete(added[0])
+    insert_images(rng, 1)
+    rebuilt = get_search_index()
+    assert len(rebuilt.images) == 5 and added[0] not in rebuilt.images.ids.tolist()
+
+    query = make_descriptors(rng, hog_len=36)
+    assert_same_results(rebuilt.images.search(query, top_k=5),
+                        search_similar_images(query, ImageModel.all(), top_k=5))
+
+
+def test_get_search_index_caches_freshness_check(rng, shared_index, monkeypatch):
+    monkeypatch.setattr(search_index, "SEARCH_INDEX_CHECK_SECONDS", 3600)
+    insert_images(rng, 2)
+    index = get_search_index()
+
+    calls = []
+    with monkeypatch.context() as patch:
+        patch.setattr(ImageModel, "count", classmethod(lambda cls, query=None: calls.append(1) or 0))
+        # Vérification récente : pas de requête MongoDB
+        assert get_search_index() is index and not calls
+
+    insert_images(rng, 1)
+    assert get_search_index() is index
+    # Ajout fait par ce processus : vu dès la recherche suivante
+    search_index.mark_search_index_stale()
+    assert len(get_search_index().images) == 3
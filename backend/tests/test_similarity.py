@@ -0,0 +1,188 @@
+"""
+Parité entre la comparaison vectorisée (compare_descriptors_batch / DescriptorMatrix)
+et la comparaison scalaire de référence (compare_descriptors).
+"""
+
+import copy
+
+import numpy as np
+import pytest
+
+from models.image_model import decode_descriptors, encode_descriptors
+from utils.similarity_search import (
+    DEFAULT_WEIGHTS,
+    DescriptorMatrix,
+    compare_descriptors,
+    compare_descriptors_batch,
+)
+
+
+FAMILIES = ("color_histogram_rgb", "color_histogram_hsv", "dominant_colors", "tamura", "gabor", "hu_moments", "hog")
+
+
+def _histogram(rng: np.random.Generator, bins: int) -> list:
+    values = rng.random(bins)
+    return (values / values.sum()).tolist()
+
+
+def make_descriptors(rng: np.random.Generator, drop=(), gabor_len: int = 64, hog_len: int = 144,
+                     hu_len: int = 7) -> dict:
+    """Descripteurs aléatoires au format de extract_descriptors (listes de floats)."""
+    descriptors = {
+        "color_histogram_rgb": {channel: _histogram(rng, 256) for channel in "rgb"},
+        "color_histogram_hsv": {"h": _histogram(rng, 180), "s": _histogram(rng, 256), "v": _histogram(rng, 256)},
+        "dominant_colors": [
+            {"rgb": rng.integers(0, 256, 3).tolist(), "proportion": 0.2}
+            for _ in range(int(rng.integers(1, 6)))
+        ],
+        "tamura": {
+            "roughness": float(rng.random() * 20),
+            "contrast": float(rng.random() * 50),
+            "directionality": float(rng.random()),
+        },
+        "gabor": rng.normal(size=gabor_len).tolist(),
+        "hu_moments": rng.normal(size=hu_len).tolist(),
+        "hog": rng.random(hog_len).tolist(),
+    }
+    for family in drop:
+        descriptors.pop(family)
+    return descriptors
+
+
+def scalar_distances(query: dict, candidates: list, weights=None) -> np.ndarray:
+    return np.array([compare_descriptors(query, candidate, weights) for candidate in candidates])
+
+
+def assert_parity(batch: np.ndarray, scalar: np.ndarray) -> None:
+    # Le lot calcule en float32, la référence en float64
+    assert batch.shape == scalar.shape
+    assert np.array_equal(np.isinf(batch), np.isinf(scalar))
+    assert np.allclose(batch, scalar, rtol=1e-4, atol=1e-6)
+
+
+@pytest.fixture
+def rng() -> np.random.Generator:
+    return np.random.default_rng(1234)
+
+
+def test_full_descriptors(rng):
+    query = make_descriptors(rng)
+    candidates = [make_descriptors(rng) for _ in range(40)]
+    assert_parity(compare_descriptors_batch(query, candidates), scalar_distances(query, candidates))
+
+
+def test_identical_descriptors_have_zero_distance(rng):
+    query = make_descriptors(rng)
+    assert np.allclose(compare_descriptors_batch(query, [query]), 0.0, atol=1e-6)
+
+
+@pytest.mark.parametrize("family", FAMILIES)
+def test_missing_family(rng, family):
+    query = make_descriptors(rng)
+    candidates = [make_descriptors(rng, drop=(family,) if i % 2 else ()) for i in range(10)]
+    assert_parity(compare_descriptors_batch(query, candidates), scalar_distances(query, candidates))
+
+    # Famille absente de la requête
+    query = make_descriptors(rng, drop=(family,))
+    assert_parity(compare_descriptors_batch(query, candidates), scalar_distances(query, candidates))
+
+
+def test_random_missing_families(rng):
+    query = make_descriptors(rng, drop=("hog",))
+    candidates = [
+        make_descriptors(rng, drop=[family for family in FAMILIES if rng.random() < 0.3])
+        for _ in range(60)
+    ]
+    assert_parity(compare_descriptors_batch(query, candidates), scalar_distances(query, candidates))
+
+
+def test_no_common_family_is_infinite(rng):
+    query = make_descriptors(rng, drop=FAMILIES[:4])
+    candidates = [make_descriptors(rng, drop=FAMILIES[4:]), make_descriptors(rng)]
+    batch = compare_descriptors_batch(query, candidates)
+    assert np.isinf(batch[0]) and np.isfinite(batch[1])
+    assert_parity(batch, scalar_distances(query, candidates))
+
+
+def test_mismatched_vector_lengths(rng):
+    # HOG d'avant la fenêtre canonique (longueur selon la résolution) : famille ignorée
+    query = make_descriptors(rng, hog_len=324, gabor_len=48)
+    candidates = [
+        make_descriptors(rng, hog_len=int(rng.choice([36, 144, 324, 576])),
+                         gabor_len=int(rng.choice([32, 48, 64])), hu_len=int(rng.choice([5, 7])))
+        for _ in range(30)
+    ]
+    assert_parity(compare_descriptors_batch(query, candidates), scalar_distances(query, candidates))
+
+
+def test_legacy_hog_length_is_not_compared(rng):
+    query = make_descriptors(rng, hog_len=8100)
+    legacy = make_descriptors(rng, hog_len=20000)
+    without_hog = {family: value for family, value in legacy.items() if family != "hog"}
+    expected = compare_descriptors(query, without_hog)
+    assert compare_descriptors(query, legacy) == pytest.approx(expected)
+    assert compare_descriptors_batch(query, [legacy, without_hog]) == pytest.approx([expected, expected], rel=1e-5)
+
+
+def test_packed_and_legacy_formats(rng):
+    query = make_descriptors(rng)
+    legacy = [make_descriptors(rng, drop=("tamura",) if i % 3 == 0 else ()) for i in range(20)]
+    packed = [decode_descriptors(encode_descriptors(candidate, "float32")) for candidate in legacy]
+    assert isinstance(packed[0]["gabor"], np.ndarray)
+    expected = scalar_distances(query, legacy)
+
+    assert_parity(compare_descriptors_batch(query, packed), expected)
+    # Mélange des deux formats dans la même collection, requête décodée
+    mixed = [packed[i] if i % 2 else legacy[i] for i in range(len(legacy))]
+    assert_parity(compare_descriptors_batch(decode_descriptors(encode_descriptors(query, "float32")), mixed),
+                  expected)
+
+
+def test_float16_storage_is_close(rng):
+    query = make_descriptors(rng)
+    candidates = [make_descriptors(rng) for _ in range(10)]
+    packed = [decode_descriptors(encode_descriptors(candidate, "float16")) for candidate in candidates]
+    assert np.allclose(compare_descriptors_batch(query, packed), scalar_distances(query, candidates), rtol=1e-2)
+
+
+def test_custom_weights(rng):
+    query = make_descriptors(rng)
+    candidates = [make_descriptors(rng, drop=("gabor",) if i % 4 == 0 else ()) for i in range(20)]
+    weights = dict(DEFAULT_WEIGHTS, color_histogram=0.0, gabor=1.0, hog=0.5, tamura=0.05)
+    assert_parity(compare_descriptors_batch(query, candidates, weights), scalar_distances(query, candidates, weights))
+
+
+def test_rows_subset(rng):
+    query = make_descriptors(rng)
+    candidates = [make_descriptors(rng) for _ in range(15)]
+    rows = np.array([0, 3, 4, 11, 14])
+    batch = compare_descriptors_batch(query, DescriptorMatrix(candidates), rows=rows)
+    assert_parity(batch, scalar_distances(query, [candidates[i] for i in rows]))
+
+
+def test_extended_matrix(rng):
+    query = make_descriptors(rng)
+    candidates = [
+        make_descriptors(rng, hog_len=int(rng.choice([144, 324])),
+                         drop=[family for family in FAMILIES if rng.random() < 0.2])
+        for _ in range(30)
+    ]
+    matrix = DescriptorMatrix(candidates[:5])
+    matrix.extend(DescriptorMatrix(candidates[5:6]))
+    # Une copie superficielle étendue ne modifie pas les lignes de l'originale
+    snapshot = copy.copy(matrix)
+    for start, end in ((6, 12), (12, 12), (12, 30)):
+        matrix.extend(DescriptorMatrix(candidates[start:end]))
+    assert matrix.size == len(candidates)
+    assert_parity(matrix.distances(query), scalar_distances(query, candidates))
+    assert_parity(snapshot.distances(query), scalar_distances(query, candidates[:6]))
+
+
+def test_malformed_rows_are_skipped(rng):
+    query = make_descriptors(rng)
+    candidates = [make_descriptors(rng), {"gabor": "not a vector"}, make_descriptors(rng)]
+    matrix = DescriptorMatrix(candidates)
+    assert matrix.valid.tolist() == [True, False, True]
+    batch = matrix.distances(query)
+    assert np.isinf(batch[1])
+    assert_parity(batch[[0, 2]], scalar_distances(query, [candidates[0], candidates[2]]))
@@ -0,0 +1,80 @@
+"""
+Rugosité et contraste de Tamura calculés par image intégrale et histogramme :
+parité avec les boucles de référence (filter2D par échelle, moments pixel à
+pixel, tests/reference_extractors.py), y compris sur de très petites images et
+quand l'image intégrale uint32 dépasse 2^32.
+"""
+
+import numpy as np
+import pytest
+
+import reference_extractors as reference
+from utils.descriptor_extraction import TAMURA_PAD, _calculate_contrast, _calculate_roughness, _integral_image
+
+
+def roughness(gray: np.ndarray) -> float:
+    h, w = gray.shape
+    return _calculate_roughness(_integral_image(gray, TAMURA_PAD), (0, 0, w, h))
+
+
+SHAPES = [(1, 1), (1, 7), (2, 2), (2, 9), (3, 3), (3, 4), (4, 4), (4, 11), (5, 5), (5, 9), (7, 3),
+          (10, 10), (11, 11), (16, 23), (64, 48), (127, 255)]
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+def test_roughness_matches_reference(shape):
+    gray = np.random.default_rng(sum(shape)).integers(0, 256, shape, dtype=np.uint8)
+    assert roughness(gray) == pytest.approx(reference._calculate_roughness(gray), rel=1e-6, abs=1e-6)
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+def test_contrast_matches_reference(shape):
+    gray = np.random.default_rng(sum(shape) + 1).integers(0, 256, shape, dtype=np.uint8)
+    assert _calculate_contrast(gray) == pytest.approx(reference._calculate_contrast(gray), rel=1e-9)
+
+
+@pytest.mark.parametrize("value", [0, 128, 255])
+def test_constant_image(value):
+    gray = np.full((9, 13), value, dtype=np.uint8)
+    assert roughness(gray) == reference._calculate_roughness(gray) == 0.0
+    assert _calculate_contrast(gray) == pytest.approx(reference._calculate_contrast(gray), abs=1e-9)
+
+
+def test_roughness_by_bands(monkeypatch):
+    # Calcul par bandes de quelques lignes : mêmes valeurs qu'en une seule bande
+    import utils.descriptor_extraction as descriptor_extraction
+
+    gray = np.random.default_rng(7).integers(0, 256, (53, 41), dtype=np.uint8)
+    expected = reference._calculate_roughness(gray)
+    for band_pixels in (41, 41 * 3, 41 * 10):
+        monkeypatch.setattr(descriptor_extraction, "TAMURA_BAND_PIXELS", band_pixels)
+        assert roughness(gray) == pytest.approx(expected, rel=1e-6)
+
+
+def test_roughness_is_exact_modulo_2_32():
+    # Une somme de fenêtre est une différence de quatre coins : ajouter à l'image
+    # intégrale des décalages par ligne et par colonne (qui font déborder les uint32)
+    # ne doit rien changer au résultat
+    gray = np.random.default_rng(3).integers(0, 256, (37, 45), dtype=np.uint8)
+    integral = _integral_image(gray, TAMURA_PAD)
+    rows = np.arange(integral.shape[0], dtype=np.uint64)[:, None] * np.uint64(2_654_435_761)
+    cols = np.arange(integral.shape[1], dtype=np.uint64)[None, :] * np.uint64(40_503)
+    shifted = (integral + rows + cols + np.uint64(2**32 - 12_345)) % np.uint64(2**32)
+    region = (0, 0, gray.shape[1], gray.shape[0])
+    assert _calculate_roughness(shifted.astype(np.uint32), region) == _calculate_roughness(integral, region)
+
+
+def test_roughness_of_image_whose_integral_overflows():
+    # 4160 x 4160 pixels à 255 : la somme totale (4,4e9) dépasse 2^32. Seul un motif
+    # loin des bords a une rugosité non nulle ; la référence est calculée sur un
+    # crop qui l'entoure d'une marge uniforme (mêmes différences de moyennes)
+    size, top, patch, margin = 4160, 4000, 64, 24
+    gray = np.full((size, size), 255, dtype=np.uint8)
+    gray[top:top + patch, top:top + patch] = np.random.default_rng(5).integers(0, 256, (patch, patch), dtype=np.uint8)
+    integral = _integral_image(gray, TAMURA_PAD)
+    assert int(gray.sum(dtype=np.uint64)) >= 2**32
+
+    crop = gray[top - margin:top + patch + margin, top - margin:top + patch + margin]
+    expected_total = reference._calculate_roughness(crop) * crop.size
+    actual_total = _calculate_roughness(integral, (0, 0, size, size)) * gray.size
+    assert actual_total == pytest.approx(expected_total, rel=1e-5)
@@ -8,29 +8,192 @@ Fonctions d'extraction de descripteurs visuels :
 - Histogramme des orientations (HOG)
 """
 
+from functools import lru_cache
+
 import cv2
 import numpy as np
-from typing import Any, Dict, List, Tuple
-from sklearn.cluster import KMeans
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from skimage import feature, filters
 from skimage.feature import local_binary_pattern
 from scipy import ndimage
 from scipy.spatial.distance import cdist
 
+from config import DOMINANT_COLORS_ENGINE, GABOR_ENGINE, OBJECT_DESCRIPTOR_MODE
+from utils.feature_cache import get_feature_cache
+from utils.image_io import ImageSource, content_hash, load_image
+
+
+# Fenêtres d'analyse canoniques (largeur, hauteur) : l'image (ou le crop) y est
+# redimensionnée avant le calcul, ce qui rend la longueur du HOG indépendante de
+# la résolution (15x15 blocs x 36 = 8100 valeurs) et les réponses de Gabor comparables
+HOG_WINDOW = (128, 128)
+GABOR_WINDOW = (256, 256)
+
+# Rugosité de Tamura : fenêtres de 2 à 5 pixels, lues dans une image intégrale des
+# niveaux de gris étendue de TAMURA_PAD pixels (BORDER_REFLECT_101, comme filter2D)
+TAMURA_MAX_SCALE = 5
+TAMURA_PAD = 3
+# Nombre de pixels traités par bande de lignes (borne la mémoire de travail)
+TAMURA_BAND_PIXELS = 1 << 20
+
+# Mode "pooled" des descripteurs d'objets : plus grand côté de l'image de travail
+# sur laquelle les réponses de Gabor sont calculées une fois pour tous les objets
+POOLED_GABOR_MAX_SIDE = 512
+# Bits par canal de la quantification des couleurs (couleurs dominantes "fast")
+COLOR_CODE_BITS = 4
+
+# Version des extracteurs, intégrée aux clés du cache persistant (utils/feature_cache.py)
+# et stockée avec chaque image (descriptors_version) : à incrémenter quand un extracteur
+# change de résultat, puis ré-indexer les images (reindex_descriptors.py)
+DESCRIPTORS_VERSION = 1
+
+
+class ExtractionContext:
+    """
+    Intermédiaires partagés par les extracteurs d'une même image.
+    Chaque conversion (niveaux de gris, RGB, HSV, cartes de gradients,
+    image intégrale, redimensionnement à une fenêtre d'analyse) est calculée
+    à la demande, une seule fois, puis réutilisée par tous les extracteurs.
+    Les gradients de Sobel (float64, un seul consommateur) ne sont pas conservés.
+    
+    Le contexte d'une région (crop(), ex. un objet détecté) lit les conversions
+    pixel à pixel et l'image intégrale dans celles de l'image parente.
+    """
+
+    def __init__(self, image: np.ndarray, parent: Optional["ExtractionContext"] = None,
+                 region: Optional[Tuple[int, int, int, int]] = None, pooled: bool = False):
+        self.image = image
+        self.parent = parent
+        # Région (x1, y1, x2, y2) de ce contexte dans l'image parente
+        self.region = region
+        # Région "pooled" : les cartes de voisinage (gradients, codes couleur) sont
+        # aussi lues dans l'image parente au lieu d'être recalculées sur le crop
+        self.pooled = pooled
+        self._cache: Dict[Any, np.ndarray] = {}
+
+    @classmethod
+    def of(cls, image: Union[np.ndarray, "ExtractionContext"]) -> "ExtractionContext":
+        """Retourne le contexte de l'image (ou le contexte lui-même)."""
+        return image if isinstance(image, cls) else cls(image)
+
+    def crop(self, x1: int, y1: int, x2: int, y2: int, pooled: bool = False) -> "ExtractionContext":
+        """Contexte de la région [y1:y2, x1:x2] de l'image."""
+        return ExtractionContext(self.image[y1:y2, x1:x2], parent=self, region=(x1, y1, x2, y2), pooled=pooled)
+
+    def _memo(self, key: Any, compute: Callable[[], Any], keep: bool = True) -> Any:
+        if key in self._cache:
+            return self._cache[key]
+        value = compute()
+        if keep:
+            self._cache[key] = value
+        return value
+
+    def release(self) -> None:
+        """
+        Libère les conversions mémorisées (sauf l'empreinte du contenu), qui seront
+        recalculées à la demande : une image en attente de détection ne garde pas
+        en mémoire les cartes de l'extraction de l'image complète.
+        """
+        self._cache = {key: value for key, value in self._cache.items() if key == "content_hash"}
+
+    def _from_parent(self, array: np.ndarray) -> np.ndarray:
+        """Vue sur la région de ce contexte d'une conversion de l'image parente."""
+        x1, y1, x2, y2 = self.region
+        return array[y1:y2, x1:x2]
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Image en niveaux de gris (uint8)."""
+        if len(self.image.shape) != 3:
+            return self.image
+        if self.parent is not None:
+            return self._from_parent(self.parent.gray)
+        return self._memo("gray", lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def rgb(self) -> np.ndarray:
+        if self.parent is not None:
+            return self._from_parent(self.parent.rgb)
+        return self._memo("rgb", lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB))
+
+    @property
+    def hsv(self) -> np.ndarray:
+        if self.parent is not None:
+            return self._from_parent(self.parent.hsv)
+        return self._memo("hsv", lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV))
+
+    def gray_integral(self, keep: bool = True) -> Tuple[np.ndarray, Tuple[int, int, int, int]]:
+        """
+        Image intégrale des niveaux de gris étendus de TAMURA_PAD pixels, et région
+        (x1, y1, x2, y2) de ce contexte dans l'image d'origine. Une région réutilise
+        l'image intégrale de l'image parente, qui est alors conservée.
+        
+        Args:
+            keep: Conserver l'image intégrale dans le contexte (False pour l'image
+                complète : seules ses régions la réutilisent)
+        """
+        if self.parent is not None:
+            integral, (px, py, _, _) = self.parent.gray_integral()
+            x1, y1, x2, y2 = self.region
+            return integral, (px + x1, py + y1, px + x2, py + y2)
+        h, w = self.gray.shape
+        return self._memo("gray_integral", lambda: _integral_image(self.gray, TAMURA_PAD), keep=keep), (0, 0, w, h)
+
+    @property
+    def gradient_maps(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Magnitude (float32) et classe de direction sur 16 secteurs (uint8) des gradients de Sobel."""
+        if self.pooled:
+            magnitude, sectors = self.parent.gradient_maps
+            return self._from_parent(magnitude), self._from_parent(sectors)
+        return self._memo("gradient_maps", lambda: _gradient_maps(*_sobel(self.gray)))
+
+    @property
+    def color_codes(self) -> np.ndarray:
+        """Code de la case de couleur quantifiée (COLOR_CODE_BITS bits par canal RGB) de chaque pixel."""
+        if self.pooled:
+            return self._from_parent(self.parent.color_codes)
+        return self._memo("color_codes", lambda: _color_codes(self.rgb, COLOR_CODE_BITS))
+
+    @property
+    def content_hash(self) -> str:
+        """Empreinte SHA-256 des pixels de l'image (clé du cache persistant)."""
+        return self._memo("content_hash", lambda: content_hash(self.image))
+
+    def gray_max_side(self, max_side: int) -> np.ndarray:
+        """Niveaux de gris réduits (INTER_AREA) pour que le plus grand côté ne dépasse pas max_side."""
+        h, w = self.gray.shape
+        if max(h, w) <= max_side:
+            return self.gray
+        scale = max_side / max(h, w)
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        return self._memo(("gray_max_side", max_side),
+                          lambda: cv2.resize(self.gray, size, interpolation=cv2.INTER_AREA))
+
+    def gray_window(self, window_size: Optional[Tuple[int, int]]) -> np.ndarray:
+        """Niveaux de gris redimensionnés à une fenêtre d'analyse (None = résolution native)."""
+        if window_size is None:
+            return self.gray
+        return self._memo(("gray_window", tuple(window_size)),
+                          lambda: _resize_to_window(self.gray, window_size))
+
 
-def extract_color_histogram_rgb(image: np.ndarray, bins: int = 256) -> Dict[str, List[float]]:
+ImageInput = Union[np.ndarray, ExtractionContext]
+
+
+def extract_color_histogram_rgb(image: ImageInput, bins: int = 256) -> Dict[str, List[float]]:
     """
     Calcule les histogrammes de couleurs RGB.
     
     Args:
-        image: Image en format BGR (OpenCV)
+        image: Image en format BGR (OpenCV) ou son ExtractionContext
         bins: Nombre de bins pour l'histogramme
     
     Returns:
         Dictionnaire avec les histogrammes R, G, B
     """
-    # Convertir BGR vers RGB
-    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    # Convertir BGR vers RGB (conversion partagée via le contexte)
+    rgb_image = ExtractionContext.of(image).rgb
     
     hist_r = cv2.calcHist([rgb_image], [0], None, [bins], [0, 256]).flatten()
     hist_g = cv2.calcHist([rgb_image], [1], None, [bins], [0, 256]).flatten()
@@ -48,18 +211,18 @@ def extract_color_histogram_rgb(image: np.ndarray, bins: int = 256) -> Dict[str,
     }
 
 
-def extract_color_histogram_hsv(image: np.ndarray, bins: int = 180) -> Dict[str, List[float]]:
+def extract_color_histogram_hsv(image: ImageInput, bins: int = 180) -> Dict[str, List[float]]:
     """
     Calcule les histogrammes de couleurs HSV.
     
     Args:
-        image: Image en format BGR (OpenCV)
+        image: Image en format BGR (OpenCV) ou son ExtractionContext
         bins: Nombre de bins pour l'histogramme
     
     Returns:
         Dictionnaire avec les histogrammes H, S, V
     """
-    hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    hsv_image = ExtractionContext.of(image).hsv
     
     hist_h = cv2.calcHist([hsv_image], [0], None, [bins], [0, 180]).flatten()
     hist_s = cv2.calcHist([hsv_image], [1], None, [256], [0, 256]).flatten()
@@ -77,19 +240,102 @@ def extract_color_histogram_hsv(image: np.ndarray, bins: int = 180) -> Dict[str,
     }
 
 
-def extract_dominant_colors(image: np.ndarray, k: int = 5) -> List[Dict[str, Any]]:
+def _kmeans_sklearn(pixels: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """K-means complet de scikit-learn (10 initialisations)."""
+    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+    kmeans.fit(pixels)
+    return kmeans.cluster_centers_, kmeans.labels_
+
+
+def _kmeans_minibatch(pixels: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """MiniBatchKMeans à graine fixe : mises à jour sur des lots de pixels."""
+    kmeans = MiniBatchKMeans(n_clusters=k, random_state=42, n_init=3, batch_size=2048)
+    kmeans.fit(pixels)
+    return kmeans.cluster_centers_, kmeans.labels_
+
+
+def _color_codes(rgb: np.ndarray, bits: int) -> np.ndarray:
+    """Code de case (bits par canal) de chaque pixel RGB : (r << 2*bits) | (g << bits) | b."""
+    quantized = (rgb >> (8 - bits)).astype(np.uint16)
+    return (quantized[..., 0] << (2 * bits)) | (quantized[..., 1] << bits) | quantized[..., 2]
+
+
+def _kmeans_fast(pixels: np.ndarray, k: int, bits: int = COLOR_CODE_BITS, max_iter: int = 10,
+                 codes: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    K-means approché sur l'histogramme quantifié des couleurs : les pixels sont
+    regroupés en cases de 2^bits niveaux par canal (4096 cases pour bits=4),
+    les centres sont initialisés par les cases les plus peuplées et les plus
+    éloignées (k-means++ déterministe pondéré), puis quelques itérations de
+    Lloyd sont faites sur les moyennes des cases pondérées par leurs effectifs.
+    Les codes de cases peuvent être fournis (calculés une fois pour l'image parente).
+    """
+    if codes is None:
+        codes = _color_codes(pixels, bits)
+    
+    # Effectif et couleur moyenne de chaque case occupée
+    num_bins = 1 << (3 * bits)
+    counts = np.bincount(codes, minlength=num_bins)
+    occupied = np.flatnonzero(counts)
+    weights = counts[occupied].astype(np.float64)
+    points = np.stack([
+        np.bincount(codes, weights=pixels[:, c], minlength=num_bins)[occupied] for c in range(3)
+    ], axis=1) / weights[:, None]
+    
+    # Initialisation : case la plus peuplée, puis celles qui maximisent effectif x distance²
+    k = min(k, len(points))
+    centers = [points[np.argmax(weights)]]
+    nearest = ((points - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        centers.append(points[np.argmax(weights * nearest)])
+        nearest = np.minimum(nearest, ((points - centers[-1]) ** 2).sum(axis=1))
+    centers = np.array(centers)
+    
+    # Itérations de Lloyd pondérées sur les cases
+    for _ in range(max_iter):
+        assignment = cdist(points, centers, "sqeuclidean").argmin(axis=1)
+        totals = np.bincount(assignment, weights=weights, minlength=k)
+        new_centers = np.stack([
+            np.bincount(assignment, weights=weights * points[:, c], minlength=k) for c in range(3)
+        ], axis=1)
+        filled = totals > 0
+        new_centers[filled] /= totals[filled, None]
+        new_centers[~filled] = centers[~filled]
+        if np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+    
+    # Chaque pixel prend le centre de sa case
+    bin_centers = np.zeros(num_bins, dtype=np.int64)
+    bin_centers[occupied] = cdist(points, centers, "sqeuclidean").argmin(axis=1)
+    return centers, bin_centers[codes]
+
+
+DOMINANT_COLOR_ENGINES = {
+    "kmeans": _kmeans_sklearn,
+    "minibatch": _kmeans_minibatch,
+    "fast": _kmeans_fast,
+}
+
+
+def extract_dominant_colors(image: ImageInput, k: int = 5, engine: str = DOMINANT_COLORS_ENGINE) -> List[Dict[str, Any]]:
     """
     Extrait les couleurs dominantes en utilisant K-means.
     
     Args:
-        image: Image en format BGR (OpenCV)
+        image: Image en format BGR (OpenCV) ou son ExtractionContext
         k: Nombre de couleurs dominantes à extraire
+        engine: "kmeans" (KMeans scikit-learn, n_init=10), "minibatch" (MiniBatchKMeans)
+            ou "fast" (histogramme quantifié + itérations de Lloyd en NumPy)
     
     Returns:
         Liste de dictionnaires avec les couleurs dominantes (RGB) et leurs proportions
     """
+    if engine not in DOMINANT_COLOR_ENGINES:
+        raise ValueError(f"Moteur de couleurs dominantes inconnu : {engine}")
+    
     # Convertir BGR vers RGB et redimensionner pour accélérer
-    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    rgb_image = ExtractionContext.of(image).rgb
     h, w = rgb_image.shape[:2]
     
     # Redimensionner si l'image est trop grande
@@ -102,12 +348,13 @@ def extract_dominant_colors(image: np.ndarray, k: int = 5) -> List[Dict[str, Any
     pixels = rgb_image.reshape(-1, 3)
     
     # Appliquer K-means
-    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-    kmeans.fit(pixels)
-    
-    # Obtenir les couleurs dominantes et leurs proportions
-    labels = kmeans.labels_
-    colors = kmeans.cluster_centers_.astype(int)
+    centers, labels = DOMINANT_COLOR_ENGINES[engine](pixels, k)
+    return _palette(centers, labels)
+
+
+def _palette(centers: np.ndarray, labels: np.ndarray) -> List[Dict[str, Any]]:
+    """Couleurs dominantes [{rgb, proportion}] triées par proportion décroissante."""
+    colors = centers.astype(int)
     
     # Calculer les proportions
     unique, counts = np.unique(labels, return_counts=True)
@@ -126,30 +373,30 @@ def extract_dominant_colors(image: np.ndarray, k: int = 5) -> List[Dict[str, Any
     return dominant_colors
 
 
-def extract_tamura_descriptors(image: np.ndarray) -> Dict[str, float]:
+def extract_tamura_descriptors(image: ImageInput) -> Dict[str, float]:
     """
     Extrait les descripteurs de Tamura : rugosité, contraste, orientation.
     
     Args:
-        image: Image en niveaux de gris
+        image: Image (niveaux de gris ou BGR) ou son ExtractionContext
     
     Returns:
         Dictionnaire avec rugosité, contraste, orientation
     """
-    if len(image.shape) == 3:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    else:
-        gray = image
+    ctx = ExtractionContext.of(image)
     
     # Rugosité (Roughness)
     # Basée sur la variance locale des tailles de fenêtre
-    roughness = _calculate_roughness(gray)
+    roughness = _calculate_roughness(*ctx.gray_integral(keep=False))
     
     # Contraste
-    contrast = _calculate_contrast(gray)
+    contrast = _calculate_contrast(ctx.gray)
     
     # Orientation (Directionality)
-    directionality = _calculate_directionality(gray)
+    if ctx.pooled:
+        directionality = _directionality_from_maps(*ctx.gradient_maps)
+    else:
+        directionality = _calculate_directionality(*_sobel(ctx.gray))
     
     return {
         "roughness": float(roughness),
@@ -158,42 +405,112 @@ def extract_tamura_descriptors(image: np.ndarray) -> Dict[str, float]:
     }
 
 
-def _calculate_roughness(gray: np.ndarray) -> float:
-    """Calcule la rugosité de Tamura."""
-    h, w = gray.shape
-    max_scale = min(5, min(h, w) // 2)
-    
-    best_sizes = np.zeros((h, w))
+def _integral_image(gray: np.ndarray, pad: int) -> np.ndarray:
+    """
+    Image intégrale (uint32) des niveaux de gris étendus de pad pixels par
+    BORDER_REFLECT_101 : integral[y, x] = somme de padded[:y, :x].
+    Les sommes dépassent 2^32 sur les grandes images mais une somme de fenêtre
+    (différence de quatre coins, inférieure à 2^32) reste exacte modulo 2^32.
+    """
+    padded = cv2.copyMakeBorder(gray, pad, pad, pad, pad, cv2.BORDER_REFLECT_101)
+    integral = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1), dtype=np.uint32)
+    # Ligne par ligne, en place : pas de copie temporaire de la taille de l'image intégrale
+    for y in range(padded.shape[0]):
+        row = integral[y + 1, 1:]
+        np.cumsum(padded[y], dtype=np.uint32, out=row)
+        np.add(row, integral[y, 1:], out=row)
+    return integral
+
+
+def _box_means(integral: np.ndarray, top: int, left: int, rows: int, cols: int, scale: int,
+               sums: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """
+    Moyennes des fenêtres scale x scale dont le coin haut-gauche parcourt
+    [top:top+rows, left:left+cols] (coordonnées de l'image intégrale).
+    sums (uint32) et out (float32) sont des tampons réutilisés.
+    """
+    sums = sums[:rows, :cols]
+    out = out[:rows, :cols]
+    bottom, right = top + scale, left + scale
+    np.subtract(integral[bottom:bottom + rows, right:right + cols], integral[top:top + rows, right:right + cols], out=sums)
+    np.subtract(sums, integral[bottom:bottom + rows, left:left + cols], out=sums)
+    np.add(sums, integral[top:top + rows, left:left + cols], out=sums)
+    np.multiply(sums, np.float32(1.0 / (scale * scale)), out=out, casting="unsafe")
+    return out
+
+
+def _calculate_roughness(integral: np.ndarray, region: Tuple[int, int, int, int],
+                         pad: int = TAMURA_PAD) -> float:
+    """
+    Calcule la rugosité de Tamura d'une région (x1, y1, x2, y2) à partir de
+    l'image intégrale des niveaux de gris étendus de pad pixels.
+    Pour chaque pixel on garde la plus grande différence entre moyennes de
+    fenêtres décalées de scale pixels (verticalement et horizontalement), pour
+    scale de 2 à TAMURA_MAX_SCALE. Les fenêtres des bords d'une région lisent
+    les pixels voisins dans l'image d'origine.
+    Le calcul se fait par bandes de lignes avec des tampons float32 réutilisés.
+    """
+    x1, y1, x2, y2 = region
+    h, w = y2 - y1, x2 - x1
+    max_scale = min(TAMURA_MAX_SCALE, min(h, w) // 2)
+    if max_scale < 2:
+        return 0.0
     
-    for scale in range(2, max_scale + 1):
-        # Calculer la moyenne locale pour différentes tailles de fenêtre
-        kernel = np.ones((scale, scale), np.float32) / (scale * scale)
-        local_mean = cv2.filter2D(gray.astype(np.float32), -1, kernel)
+    band = max(1, min(h, TAMURA_BAND_PIXELS // w))
+    sums = np.empty((band + max_scale, w), dtype=np.uint32)
+    means = np.empty((band + max_scale, w), dtype=np.float32)
+    diff = np.empty((band, w), dtype=np.float32)
+    best = np.empty((band, w), dtype=np.float32)
+    
+    total = 0.0
+    for start in range(0, h, band):
+        stop = min(h, start + band)
+        rows = stop - start
+        best_band = best[:rows]
+        best_band.fill(0)
         
-        # Calculer la différence entre les moyennes de fenêtres adjacentes
-        diff_h = np.abs(local_mean[scale:, :] - local_mean[:-scale, :])
-        diff_v = np.abs(local_mean[:, scale:] - local_mean[:, :-scale])
-        
-        # Pour chaque pixel, prendre le maximum des différences
-        diff_max = np.zeros((h, w))
-        diff_max[scale:, :] = np.maximum(diff_max[scale:, :], diff_h)
-        diff_max[:, scale:] = np.maximum(diff_max[:, scale:], diff_v)
+        for scale in range(2, max_scale + 1):
+            # Moyennes locales (ancre de filter2D : scale // 2) des lignes [first, stop)
+            anchor = scale // 2
+            first = max(0, start - scale)
+            local_mean = _box_means(integral, pad + y1 + first - anchor, pad + x1 - anchor,
+                                    stop - first, w, scale, sums, means)
+            
+            # Différence avec la fenêtre située scale lignes plus haut
+            offset = start - first
+            skip = max(0, scale - start)
+            if skip < rows:
+                current = local_mean[offset + skip:offset + rows]
+                diff_h = diff[:rows - skip]
+                np.subtract(current, local_mean[offset + skip - scale:offset + rows - scale], out=diff_h)
+                np.abs(diff_h, out=diff_h)
+                np.maximum(best_band[skip:], diff_h, out=best_band[skip:])
+            
+            # Différence avec la fenêtre située scale colonnes à gauche
+            current = local_mean[offset:offset + rows]
+            diff_v = diff[:rows, :w - scale]
+            np.subtract(current[:, scale:], current[:, :-scale], out=diff_v)
+            np.abs(diff_v, out=diff_v)
+            np.maximum(best_band[:, scale:], diff_v, out=best_band[:, scale:])
         
-        # Mettre à jour la meilleure taille si la différence est plus grande
-        mask = diff_max > best_sizes
-        best_sizes[mask] = diff_max[mask]
+        total += float(best_band.sum(dtype=np.float64))
     
-    return np.mean(best_sizes)
+    return total / (h * w)
 
 
 def _calculate_contrast(gray: np.ndarray) -> float:
-    """Calcule le contraste de Tamura."""
+    """Calcule le contraste de Tamura à partir de l'histogramme des niveaux de gris."""
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel().astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    count = hist.sum()
+    
     # Contraste basé sur l'écart-type et le kurtosis
-    std = np.std(gray)
-    mean = np.mean(gray)
+    mean = (hist * levels).sum() / count
+    centered = levels - mean
+    std = np.sqrt((hist * centered ** 2).sum() / count)
     
     # Kurtosis (aplatissement)
-    kurtosis = np.mean(((gray - mean) / (std + 1e-7)) ** 4)
+    kurtosis = (hist * (centered / (std + 1e-7)) ** 4).sum() / count
     
     # Formule de contraste de Tamura
     alpha4 = kurtosis
@@ -202,12 +519,13 @@ def _calculate_contrast(gray: np.ndarray) -> float:
     return contrast
 
 
-def _calculate_directionality(gray: np.ndarray) -> float:
-    """Calcule la directionnalité de Tamura."""
-    # Calculer les gradients
-    gx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-    gy = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-    
+def _sobel(gray: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Gradients de Sobel (gx, gy) en float64 sur les niveaux de gris."""
+    return cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3), cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
+
+
+def _calculate_directionality(gx: np.ndarray, gy: np.ndarray) -> float:
+    """Calcule la directionnalité de Tamura à partir des gradients de Sobel."""
     # Magnitude et direction
     magnitude = np.sqrt(gx**2 + gy**2)
     direction = np.arctan2(gy, gx + 1e-7) * 180 / np.pi
@@ -221,6 +539,35 @@ def _calculate_directionality(gray: np.ndarray) -> float:
     
     # Histogramme des directions (16 bins)
     hist, _ = np.histogram(direction[mask], bins=16, range=(-180, 180))
+    return _directionality_from_histogram(hist)
+
+
+def _gradient_maps(gx: np.ndarray, gy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cartes des gradients pour la directionnalité par région : magnitude (float32)
+    et secteur de direction (16 secteurs de 22,5° sur [-180°, 180°], comme
+    l'histogramme de _calculate_directionality).
+    """
+    magnitude = cv2.magnitude(gx, gy).astype(np.float32)
+    direction = np.arctan2(gy, gx + 1e-7) * 180 / np.pi
+    sectors = np.clip(np.floor((direction + 180) / 22.5), 0, 15).astype(np.uint8)
+    return magnitude, sectors
+
+
+def _directionality_from_maps(magnitude: np.ndarray, sectors: np.ndarray) -> float:
+    """Directionnalité de Tamura d'une région à partir des cartes de _gradient_maps."""
+    # Seuil pour ignorer les gradients faibles
+    threshold = np.percentile(magnitude, 75)
+    mask = magnitude > threshold
+    
+    if not mask.any():
+        return 0.0
+    
+    return _directionality_from_histogram(np.bincount(sectors[mask], minlength=16))
+
+
+def _directionality_from_histogram(hist: np.ndarray) -> float:
+    """Directionnalité à partir de l'histogramme des directions (16 bins)."""
     hist = hist.astype(float)
     hist = hist / (hist.sum() + 1e-7)
     
@@ -236,67 +583,186 @@ def _calculate_directionality(gray: np.ndarray) -> float:
     return directionality
 
 
-def extract_gabor_descriptors(image: np.ndarray, num_orientations: int = 8, num_scales: int = 4) -> List[float]:
+def _resize_to_window(gray: np.ndarray, window_size: Tuple[int, int]) -> np.ndarray:
+    """Redimensionne une image en niveaux de gris à la fenêtre d'analyse (largeur, hauteur)."""
+    h, w = gray.shape[:2]
+    if (w, h) == tuple(window_size):
+        return gray
+    # INTER_AREA pour réduire (anti-aliasing), INTER_LINEAR pour agrandir
+    shrinking = w * h > window_size[0] * window_size[1]
+    interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR
+    return cv2.resize(gray, tuple(window_size), interpolation=interpolation)
+
+
+# Banc de filtres de Gabor : taille du noyau et fréquences (une par échelle)
+GABOR_KSIZE = 21
+GABOR_FREQUENCIES = (0.1, 0.2, 0.3, 0.4)
+
+
+@lru_cache(maxsize=8)
+def _gabor_bank(ksize: int, num_orientations: int, num_scales: int) -> Tuple[np.ndarray, ...]:
+    """
+    Banc de filtres de Gabor (échelle par échelle, puis orientation), construit
+    une seule fois par configuration. Les noyaux sont en lecture seule.
+    """
+    kernels = []
+    for freq in GABOR_FREQUENCIES[:num_scales]:
+        for orientation in range(num_orientations):
+            theta = orientation * np.pi / num_orientations
+            
+            # Créer le filtre de Gabor
+            kernel = cv2.getGaborKernel(
+                (ksize, ksize),
+                5.0,  # sigma
+                theta,
+                2 * np.pi * freq,  # lambda
+                0.5,  # gamma
+                0,  # psi
+                ktype=cv2.CV_32F
+            )
+            kernel.setflags(write=False)
+            kernels.append(kernel)
+    return tuple(kernels)
+
+
+@lru_cache(maxsize=8)
+def _gabor_bank_spectra(ksize: int, num_orientations: int, num_scales: int,
+                        dft_shape: Tuple[int, int]) -> Tuple[np.ndarray, ...]:
+    """
+    Spectres (format CCS d'OpenCV) des noyaux du banc, centrés à l'origine
+    et complétés à la taille de la DFT de l'image.
+    """
+    radius = ksize // 2
+    spectra = []
+    for kernel in _gabor_bank(ksize, num_orientations, num_scales):
+        padded = np.zeros(dft_shape, dtype=np.float32)
+        padded[:ksize, :ksize] = kernel
+        padded = np.roll(padded, (-radius, -radius), axis=(0, 1))
+        spectrum = cv2.dft(padded)
+        spectrum.setflags(write=False)
+        spectra.append(spectrum)
+    return tuple(spectra)
+
+
+def _gabor_responses_fft(gray: np.ndarray, ksize: int, num_orientations: int, num_scales: int):
+    """
+    Réponses du banc de Gabor par produit de spectres : une seule DFT de l'image,
+    puis une multiplication et une DFT inverse par noyau.
+    Les bords sont étendus comme filter2D (BORDER_REFLECT_101) ; les noyaux
+    (psi = 0) étant symétriques, convolution et corrélation coïncident.
+    """
+    radius = ksize // 2
+    h, w = gray.shape
+    padded = cv2.copyMakeBorder(gray, radius, radius, radius, radius, cv2.BORDER_REFLECT_101)
+    dft_shape = (cv2.getOptimalDFTSize(padded.shape[0]), cv2.getOptimalDFTSize(padded.shape[1]))
+    # Le complément de zéros n'atteint pas la zone utile (elle est à plus d'un rayon des bords)
+    padded = cv2.copyMakeBorder(padded, 0, dft_shape[0] - padded.shape[0], 0, dft_shape[1] - padded.shape[1],
+                                cv2.BORDER_CONSTANT, value=0)
+    image_spectrum = cv2.dft(padded)
+    
+    for kernel_spectrum in _gabor_bank_spectra(ksize, num_orientations, num_scales, dft_shape):
+        product = cv2.mulSpectrums(image_spectrum, kernel_spectrum, 0)
+        filtered = cv2.idft(product, flags=cv2.DFT_SCALE | cv2.DFT_REAL_OUTPUT)
+        yield filtered[radius:radius + h, radius:radius + w]
+
+
+def _gabor_responses_spatial(gray: np.ndarray, ksize: int, num_orientations: int, num_scales: int):
+    """Réponses du banc de Gabor par filtrage spatial (filter2D), noyau par noyau."""
+    for kernel in _gabor_bank(ksize, num_orientations, num_scales):
+        yield cv2.filter2D(gray, cv2.CV_32F, kernel)
+
+
+GABOR_ENGINES = {
+    "spatial": _gabor_responses_spatial,
+    "fft": _gabor_responses_fft,
+}
+
+
+def extract_gabor_descriptors(image: ImageInput, num_orientations: int = 8, num_scales: int = 4,
+                              window_size: Optional[Tuple[int, int]] = None,
+                              engine: str = GABOR_ENGINE) -> List[float]:
     """
     Extrait les descripteurs basés sur les filtres de Gabor.
     
     Args:
-        image: Image en niveaux de gris
+        image: Image (niveaux de gris ou BGR) ou son ExtractionContext
         num_orientations: Nombre d'orientations
         num_scales: Nombre d'échelles
+        window_size: Fenêtre d'analyse canonique (largeur, hauteur), None = résolution native
+        engine: "spatial" (filter2D par noyau) ou "fft" (une DFT de l'image pour tout le banc)
     
     Returns:
         Liste des descripteurs Gabor (moyennes des réponses filtrées)
     """
-    if len(image.shape) == 3:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    else:
-        gray = image
+    if engine not in GABOR_ENGINES:
+        raise ValueError(f"Moteur Gabor inconnu : {engine}")
+    
+    gray = ExtractionContext.of(image).gray_window(window_size)
     
     gray = gray.astype(np.float32) / 255.0
     
     descriptors = []
-    frequencies = [0.1, 0.2, 0.3, 0.4][:num_scales]
-    
-    for freq in frequencies:
-        for orientation in range(num_orientations):
-            theta = orientation * np.pi / num_orientations
-            
-            # Créer le filtre de Gabor
-            gabor_kernel = cv2.getGaborKernel(
-                (21, 21),
-                5.0,  # sigma
-                theta,
-                2 * np.pi * freq,  # lambda
-                0.5,  # gamma
-                0,  # psi
-                ktype=cv2.CV_32F
-            )
-            
-            # Appliquer le filtre
-            filtered = cv2.filter2D(gray, cv2.CV_32F, gabor_kernel)
-            
-            # Extraire la moyenne et l'écart-type comme descripteurs
-            descriptors.append(float(np.mean(filtered)))
-            descriptors.append(float(np.std(filtered)))
+    for filtered in GABOR_ENGINES[engine](gray, GABOR_KSIZE, num_orientations, num_scales):
+        # Extraire la moyenne et l'écart-type comme descripteurs
+        descriptors.append(float(np.mean(filtered)))
+        descriptors.append(float(np.std(filtered)))
     
     return descriptors
 
 
-def extract_hu_moments(image: np.ndarray) -> List[float]:
+def _pooled_gabor_descriptors(ctx: ExtractionContext, regions: List[Tuple[int, int, int, int]],
+                              num_orientations: int = 8, num_scales: int = 4,
+                              max_side: int = POOLED_GABOR_MAX_SIDE,
+                              engine: str = GABOR_ENGINE) -> np.ndarray:
+    """
+    Descripteurs Gabor de plusieurs régions d'une image, à partir des réponses
+    du banc calculées une seule fois sur l'image de travail (plus grand côté
+    max_side). Pour chaque noyau, la moyenne et l'écart-type de la réponse dans
+    chaque région sont lus dans les images intégrales de r et r².
+    
+    Returns:
+        Tableau (nombre de régions, 2 x nombre de noyaux), même ordre que extract_gabor_descriptors
+    """
+    if engine not in GABOR_ENGINES:
+        raise ValueError(f"Moteur Gabor inconnu : {engine}")
+    
+    gray = ctx.gray_max_side(max_side)
+    h, w = ctx.gray.shape
+    scale_y, scale_x = gray.shape[0] / h, gray.shape[1] / w
+    
+    # Régions dans l'image de travail (au moins un pixel)
+    boxes = np.array(regions, dtype=np.float64).reshape(-1, 4)
+    x1 = np.clip(np.floor(boxes[:, 0] * scale_x), 0, gray.shape[1] - 1).astype(np.int64)
+    y1 = np.clip(np.floor(boxes[:, 1] * scale_y), 0, gray.shape[0] - 1).astype(np.int64)
+    x2 = np.maximum(x1 + 1, np.minimum(np.ceil(boxes[:, 2] * scale_x), gray.shape[1])).astype(np.int64)
+    y2 = np.maximum(y1 + 1, np.minimum(np.ceil(boxes[:, 3] * scale_y), gray.shape[0])).astype(np.int64)
+    areas = ((x2 - x1) * (y2 - y1)).astype(np.float64)
+    
+    gray = gray.astype(np.float32) / 255.0
+    
+    columns = []
+    for filtered in GABOR_ENGINES[engine](gray, GABOR_KSIZE, num_orientations, num_scales):
+        sums, squares = cv2.integral2(filtered, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        total = sums[y2, x2] - sums[y1, x2] - sums[y2, x1] + sums[y1, x1]
+        total_sq = squares[y2, x2] - squares[y1, x2] - squares[y2, x1] + squares[y1, x1]
+        mean = total / areas
+        columns.append(mean)
+        columns.append(np.sqrt(np.maximum(total_sq / areas - mean ** 2, 0.0)))
+    
+    return np.stack(columns, axis=1)
+
+
+def extract_hu_moments(image: ImageInput) -> List[float]:
     """
     Extrait les moments de Hu (7 moments invariants).
     
     Args:
-        image: Image en niveaux de gris
+        image: Image (niveaux de gris ou BGR) ou son ExtractionContext
     
     Returns:
         Liste des 7 moments de Hu
     """
-    if len(image.shape) == 3:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    else:
-        gray = image
+    gray = ExtractionContext.of(image).gray
     
     # Calculer les moments
     moments = cv2.moments(gray)
@@ -310,24 +776,24 @@ def extract_hu_moments(image: np.ndarray) -> List[float]:
     return hu_moments.tolist()
 
 
-def extract_hog_descriptor(image: np.ndarray, orientations: int = 9, pixels_per_cell: Tuple[int, int] = (8, 8),
-                           cells_per_block: Tuple[int, int] = (2, 2)) -> List[float]:
+def extract_hog_descriptor(image: ImageInput, orientations: int = 9, pixels_per_cell: Tuple[int, int] = (8, 8),
+                           cells_per_block: Tuple[int, int] = (2, 2),
+                           window_size: Optional[Tuple[int, int]] = None) -> List[float]:
     """
     Extrait l'histogramme des orientations (HOG - Histogram of Oriented Gradients).
     
     Args:
-        image: Image en niveaux de gris
+        image: Image (niveaux de gris ou BGR) ou son ExtractionContext
         orientations: Nombre de bins d'orientation
         pixels_per_cell: Taille de la cellule en pixels
         cells_per_block: Nombre de cellules par bloc
+        window_size: Fenêtre d'analyse canonique (largeur, hauteur). Si None, le HOG est
+            calculé à la résolution native et sa longueur dépend de la taille de l'image
     
     Returns:
         Vecteur HOG aplati
     """
-    if len(image.shape) == 3:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    else:
-        gray = image
+    gray = ExtractionContext.of(image).gray_window(window_size)
     
     # Calculer le descripteur HOG
     hog_features = feature.hog(
@@ -343,98 +809,211 @@ def extract_hog_descriptor(image: np.ndarray, orientations: int = 9, pixels_per_
     return hog_features.tolist()
 
 
-def extract_descriptors(image_path: str) -> Dict[str, Any]:
-    """
-    Extrait tous les descripteurs visuels d'une image.
-    
-    Args:
-        image_path: Chemin vers l'image
-    
-    Returns:
-        Dictionnaire contenant tous les descripteurs extraits
-    """
-    # Charger l'image
-    image = cv2.imread(image_path)
-    if image is None:
-        raise ValueError(f"Impossible de charger l'image : {image_path}")
-    
-    # Extraire tous les descripteurs
-    descriptors = {
+def _extract_all(ctx: ExtractionContext) -> Dict[str, Any]:
+    """Calcule tous les descripteurs à partir du contexte partagé d'une image."""
+    return {
         # Histogrammes de couleurs
-        "color_histogram_rgb": extract_color_histogram_rgb(image),
-        "color_histogram_hsv": extract_color_histogram_hsv(image),
+        "color_histogram_rgb": extract_color_histogram_rgb(ctx),
+        "color_histogram_hsv": extract_color_histogram_hsv(ctx),
         
         # Couleurs dominantes
-        "dominant_colors": extract_dominant_colors(image, k=5),
+        "dominant_colors": extract_dominant_colors(ctx, k=5),
         
         # Descripteurs de Tamura
-        "tamura": extract_tamura_descriptors(image),
+        "tamura": extract_tamura_descriptors(ctx),
         
         # Filtres de Gabor
-        "gabor": extract_gabor_descriptors(image, num_orientations=8, num_scales=4),
+        "gabor": extract_gabor_descriptors(ctx, num_orientations=8, num_scales=4, window_size=GABOR_WINDOW),
         
         # Moments de Hu
-        "hu_moments": extract_hu_moments(image),
+        "hu_moments": extract_hu_moments(ctx),
         
         # Histogramme des orientations (HOG)
-        "hog": extract_hog_descriptor(image, orientations=9, pixels_per_cell=(8, 8), cells_per_block=(2, 2))
+        "hog": extract_hog_descriptor(ctx, orientations=9, pixels_per_cell=(8, 8), cells_per_block=(2, 2),
+                                      window_size=HOG_WINDOW)
     }
-    
-    return descriptors
 
 
-def extract_object_descriptors(image: np.ndarray, bbox: List[float]) -> Dict[str, Any]:
+def _cache_params(**extra: Any) -> Dict[str, Any]:
+    """Paramètres qui influencent les descripteurs (clé du cache persistant)."""
+    return {
+        "version": DESCRIPTORS_VERSION,
+        "gabor_engine": GABOR_ENGINE,
+        "dominant_colors_engine": DOMINANT_COLORS_ENGINE,
+        **extra
+    }
+
+
+def extract_descriptors(image_source: Union[ImageSource, ExtractionContext], store: bool = True) -> Dict[str, Any]:
     """
-    Extrait les descripteurs visuels d'un objet spécifique dans une image.
-    L'objet est défini par sa bounding box (bounding box).
+    Extrait tous les descripteurs visuels d'une image (servis par le cache
+    persistant si la même image a déjà été analysée avec les mêmes paramètres).
     
     Args:
-        image: Image complète en format BGR (OpenCV)
-        bbox: Bounding box [x1, y1, x2, y2] en coordonnées pixel
+        image_source: Chemin vers l'image, octets encodés, image BGR déjà décodée
+            ou son ExtractionContext
+        store: Stocker le résultat dans le cache persistant (False pour une image
+            de requête, qui ne sera pas indexée)
     
     Returns:
-        Dictionnaire contenant tous les descripteurs extraits pour l'objet
+        Dictionnaire contenant tous les descripteurs extraits
     """
+    if isinstance(image_source, ExtractionContext):
+        ctx = image_source
+    else:
+        # Charger l'image (sans relecture si elle est déjà décodée)
+        ctx = ExtractionContext(load_image(image_source))
+    
+    # Extraire tous les descripteurs (conversions partagées entre extracteurs)
+    cache = get_feature_cache()
+    if not cache.enabled:
+        return _extract_all(ctx)
+    return cache.fetch("descriptors", ctx.content_hash, _cache_params(), lambda: _extract_all(ctx), store=store)
+
+
+def _object_region(shape: Tuple[int, ...], bbox: List[float]) -> Tuple[int, int, int, int]:
+    """Région (x1, y1, x2, y2) d'une bounding box, ramenée dans les limites de l'image."""
     if len(bbox) != 4:
         raise ValueError("Bounding box doit contenir 4 valeurs [x1, y1, x2, y2]")
     
-    # Extraire la région de l'objet (crop)
     x1, y1, x2, y2 = [int(coord) for coord in bbox]
     
     # S'assurer que les coordonnées sont valides
-    h, w = image.shape[:2]
+    h, w = shape[:2]
     x1 = max(0, min(x1, w))
     y1 = max(0, min(y1, h))
     x2 = max(x1 + 1, min(x2, w))
     y2 = max(y1 + 1, min(y2, h))
     
-    # Cropper l'image pour obtenir seulement l'objet
-    object_image = image[y1:y2, x1:x2]
-    
     # Vérifier que le crop n'est pas vide
-    if object_image.size == 0:
+    if x1 >= w or y1 >= h:
         raise ValueError("Bounding box invalide : région vide")
     
-    # Extraire tous les descripteurs pour cet objet
-    descriptors = {
-        # Histogrammes de couleurs
-        "color_histogram_rgb": extract_color_histogram_rgb(object_image),
-        "color_histogram_hsv": extract_color_histogram_hsv(object_image),
-        
-        # Couleurs dominantes
-        "dominant_colors": extract_dominant_colors(object_image, k=5),
-        
-        # Descripteurs de Tamura
-        "tamura": extract_tamura_descriptors(object_image),
-        
-        # Filtres de Gabor
-        "gabor": extract_gabor_descriptors(object_image, num_orientations=8, num_scales=4),
-        
-        # Moments de Hu
-        "hu_moments": extract_hu_moments(object_image),
-        
-        # Histogramme des orientations (HOG)
-        "hog": extract_hog_descriptor(object_image, orientations=9, pixels_per_cell=(8, 8), cells_per_block=(2, 2))
-    }
+    return x1, y1, x2, y2
+
+
+def extract_object_descriptors(image: ImageInput, bbox: List[float],
+                               mode: str = OBJECT_DESCRIPTOR_MODE) -> Dict[str, Any]:
+    """
+    Extrait les descripteurs visuels d'un objet spécifique dans une image.
+    L'objet est défini par sa bounding box (bounding box).
     
+    Args:
+        image: Image complète en format BGR (OpenCV) ou son ExtractionContext
+        bbox: Bounding box [x1, y1, x2, y2] en coordonnées pixel
+        mode: "crop" (extracteurs relancés sur le crop) ou "pooled" (voir extract_objects_descriptors)
+    
+    Returns:
+        Dictionnaire contenant tous les descripteurs extraits pour l'objet
+    """
+    ctx = ExtractionContext.of(image)
+    region = _object_region(ctx.image.shape, bbox)
+    if mode not in ("crop", "pooled"):
+        raise ValueError(f"Mode de descripteurs d'objets inconnu : {mode}")
+    
+    cache = get_feature_cache()
+    params = _cache_params(mode=mode, region=list(region))
+    if cache.enabled:
+        cached = cache.get("object_descriptors", ctx.content_hash, params)
+        if cached is not None:
+            return cached
+    
+    if mode == "pooled":
+        gabor = _pooled_gabor_descriptors(ctx, [region])[0]
+        descriptors = _pooled_object_descriptors(ctx.crop(*region, pooled=True), gabor)
+    else:
+        # Contexte de l'objet : conversions et image intégrale lues dans celles de l'image complète
+        descriptors = _extract_all(ctx.crop(*region))
+    
+    if cache.enabled:
+        cache.put("object_descriptors", ctx.content_hash, params, descriptors)
     return descriptors
+
+
+def _pooled_object_descriptors(ctx: ExtractionContext, gabor: np.ndarray) -> Dict[str, Any]:
+    """
+    Descripteurs d'un objet en mode "pooled" : histogrammes et moments sur les vues
+    de l'image parente, couleurs dominantes depuis ses codes couleur quantifiés,
+    Tamura depuis son image intégrale et ses cartes de gradients, Gabor agrégé
+    depuis ses réponses. Seul le HOG est calculé sur le crop (fenêtre canonique).
+    """
+    rgb = ctx.rgb
+    return {
+        "color_histogram_rgb": extract_color_histogram_rgb(ctx),
+        "color_histogram_hsv": extract_color_histogram_hsv(ctx),
+        "dominant_colors": _palette(*_kmeans_fast(rgb.reshape(-1, 3), 5, codes=ctx.color_codes.ravel())),
+        "tamura": extract_tamura_descriptors(ctx),
+        "gabor": gabor.tolist(),
+        "hu_moments": extract_hu_moments(ctx),
+        "hog": extract_hog_descriptor(ctx, orientations=9, pixels_per_cell=(8, 8), cells_per_block=(2, 2),
+                                      window_size=HOG_WINDOW)
+    }
+
+
+def extract_objects_descriptors(image: ImageInput, bboxes: List[List[float]],
+                                mode: str = OBJECT_DESCRIPTOR_MODE) -> List[Dict[str, Any]]:
+    """
+    Extrait les descripteurs de tous les objets détectés d'une même image.
+    
+    En mode "crop", chaque objet est traité comme une image à part (extracteurs
+    relancés sur son crop). En mode "pooled", les cartes de réponses (Gabor,
+    gradients, codes couleur, image intégrale) sont calculées une seule fois
+    pour l'image et agrégées sur chaque bounding box : le coût par objet ne
+    dépend plus que de l'aire de sa région (et d'un HOG à taille fixe).
+    Les descripteurs des deux modes ne sont pas comparables entre eux.
+    
+    Args:
+        image: Image complète en format BGR (OpenCV) ou son ExtractionContext
+        bboxes: Bounding boxes [x1, y1, x2, y2] en coordonnées pixel
+        mode: "crop" ou "pooled"
+    
+    Returns:
+        Descripteurs de chaque objet, dans l'ordre des bounding boxes
+        ({} si l'extraction échoue pour un objet)
+    """
+    if mode not in ("crop", "pooled"):
+        raise ValueError(f"Mode de descripteurs d'objets inconnu : {mode}")
+    
+    ctx = ExtractionContext.of(image)
+    regions: List[Optional[Tuple[int, int, int, int]]] = []
+    for bbox in bboxes:
+        try:
+            regions.append(_object_region(ctx.image.shape, bbox))
+        except ValueError as e:
+            print(f"Erreur extraction descripteurs pour objet {bbox}: {str(e)}")
+            regions.append(None)
+    
+    # Objets déjà en cache (même image, même région, mêmes paramètres)
+    cache = get_feature_cache()
+    results: List[Optional[Dict[str, Any]]] = [None if region is not None else {} for region in regions]
+    if cache.enabled:
+        for i, region in enumerate(regions):
+            if region is not None:
+                results[i] = cache.get("object_descriptors", ctx.content_hash,
+                                       _cache_params(mode=mode, region=list(region)))
+    
+    pending = [i for i, result in enumerate(results) if result is None]
+    gabor = None
+    if mode == "pooled" and pending:
+        try:
+            gabor = iter(_pooled_gabor_descriptors(ctx, [regions[i] for i in pending]))
+        except Exception as e:
+            print(f"Erreur extraction Gabor des objets : {str(e)}")
+            return [result if result is not None else {} for result in results]
+    
+    for i in pending:
+        region = regions[i]
+        try:
+            if mode == "pooled":
+                results[i] = _pooled_object_descriptors(ctx.crop(*region, pooled=True), next(gabor))
+            else:
+                results[i] = _extract_all(ctx.crop(*region))
+        except Exception as e:
+            # Si l'extraction échoue pour un objet, continuer avec les autres
+            print(f"Erreur extraction descripteurs pour objet {list(region)}: {str(e)}")
+            results[i] = {}
+            continue
+        if cache.enabled:
+            cache.put("object_descriptors", ctx.content_hash, _cache_params(mode=mode, region=list(region)), results[i])
+    
+    return results
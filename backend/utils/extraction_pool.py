@@ -0,0 +1,284 @@
+"""
+Extraction des descripteurs en parallèle sur plusieurs cœurs.
+Avec EXTRACTION_PROCESSES > 0, les descripteurs de l'image complète et ceux des
+objets détectés (répartis en paquets) sont calculés dans un pool de processus.
+L'image décodée est copiée une seule fois dans un segment de mémoire partagée :
+les tâches ne transportent que son nom, sa forme et son type, pas les pixels.
+Avec EXTRACTION_PROCESSES=0, tout est calculé dans le processus appelant : les
+images complètes dans un petit pool de threads, puis leurs objets sur place.
+
+Dans les deux cas, les descripteurs de l'image complète démarrent sans attendre
+la détection YOLO (thread ou processus) : seuls ceux des objets en dépendent.
+
+Les processus du pool sont créés en mode "spawn" : chacun réimporte le script
+principal (app.py lancé avec `python app.py`) sous le nom __mp_main__. app.py
+n'importe donc les routes, et avec elles ultralytics et torch, que dans
+create_app : un processus du pool ne charge que les extracteurs de descripteurs.
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import EXTRACTION_PROCESSES, OBJECT_DESCRIPTOR_MODE
+from utils.descriptor_extraction import ExtractionContext, extract_descriptors, extract_objects_descriptors
+
+
+# Référence vers une image en mémoire partagée : (nom du segment, forme, type)
+SharedImageRef = Tuple[str, Tuple[int, ...], str]
+
+
+def _init_worker() -> None:
+    # Un cœur par processus : pas de sur-souscription par les threads d'OpenCV / OpenMP
+    import cv2
+    from threadpoolctl import threadpool_limits
+    cv2.setNumThreads(1)
+    threadpool_limits(1)
+
+
+def _run_task(ref: SharedImageRef, bboxes: Optional[List[List[float]]], mode: str):
+    """
+    Tâche exécutée dans un processus du pool : descripteurs de l'image complète
+    (bboxes=None) ou d'un paquet d'objets, sur l'image lue en mémoire partagée.
+    """
+    name, shape, dtype = ref
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        image = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        ctx = ExtractionContext(image)
+        if bboxes is None:
+            return extract_descriptors(ctx)
+        return extract_objects_descriptors(ctx, bboxes, mode)
+    finally:
+        # Les vues sur le segment doivent disparaître avant sa fermeture
+        image = ctx = None
+        shm.close()
+
+
+# Sans pool de processus : threads pour les descripteurs des images complètes, en
+# parallèle de l'inférence YOLO. Peu nombreux (partagés par tous les workers
+# d'ingestion) : OpenCV parallélise déjà chaque conversion, et chaque image en
+# cours d'extraction garde plusieurs copies pleine résolution en mémoire.
+FULL_IMAGE_THREADS = 2
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_threads: Optional[ThreadPoolExecutor] = None
+
+
+def _get_pool(processes: int) -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # "spawn" : pas de fork d'un processus qui a déjà des threads (workers, PyTorch)
+                _pool = ProcessPoolExecutor(
+                    max_workers=processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+    return _pool
+
+
+def _get_threads() -> ThreadPoolExecutor:
+    global _threads
+    if _threads is None:
+        with _pool_lock:
+            if _threads is None:
+                _threads = ThreadPoolExecutor(max_workers=FULL_IMAGE_THREADS, thread_name_prefix="extraction")
+    return _threads
+
+
+def _extract_full_image(ctx: ExtractionContext) -> Dict[str, Any]:
+    """
+    Descripteurs de l'image complète, puis libération des conversions du contexte :
+    les objets, extraits après la détection, recalculent celles dont ils ont besoin.
+    """
+    try:
+        return extract_descriptors(ctx)
+    finally:
+        ctx.release()
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Abandonne un pool cassé (processus tué) : le suivant sera recréé à la demande."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def _reset_pool_after_fork() -> None:
+    global _pool, _threads, _pool_lock
+    _pool = _threads = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+class _Deferred:
+    """Calcul fait sur place au premier appel de result() (même interface qu'un Future)."""
+
+    def __init__(self, compute):
+        self._compute = compute
+        self._done = False
+        self._value = self._error = None
+
+    def result(self) -> Any:
+        if not self._done:
+            try:
+                self._value = self._compute()
+            except Exception as e:
+                self._error = e
+            self._done = True
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class ImageExtraction:
+    """
+    Extraction des descripteurs d'une image et de ses objets.
+
+    Usage :
+        with ImageExtraction(image) as extraction:
+            extraction.start_descriptors()      # image complète, en arrière-plan
+            detections = ...                     # détection YOLO pendant ce temps
+            extraction.start_objects(bboxes)
+            descriptors = extraction.descriptors()
+            objects_descriptors = extraction.objects_descriptors()
+
+    Avec le pool de processus, les calculs démarrent dès start_*(). Sans pool,
+    l'image complète est traitée dans un thread (FULL_IMAGE_THREADS au plus en
+    parallèle) et les objets sur place, une fois les descripteurs de l'image obtenus.
+    """
+
+    def __init__(self, image: np.ndarray, processes: int = EXTRACTION_PROCESSES):
+        self.image = image
+        self._pool = _get_pool(processes) if processes > 0 else None
+        self._processes = processes
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._ctx: Optional[ExtractionContext] = None
+        self._descriptors = None
+        # Paquets d'objets : (nombre d'objets, Future ou _Deferred)
+        self._objects: List[Tuple[int, Any]] = []
+        # Tâches soumises (pool ou threads), attendues avant de libérer l'image
+        self._pending: List[Future] = []
+
+    def _shared_ref(self) -> SharedImageRef:
+        """Copie l'image dans un segment de mémoire partagée (une seule fois)."""
+        if self._shm is None:
+            image = np.ascontiguousarray(self.image)
+            self._shm = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+            np.ndarray(image.shape, dtype=image.dtype, buffer=self._shm.buf)[...] = image
+        return self._shm.name, self.image.shape, self.image.dtype.str
+
+    def _context(self) -> ExtractionContext:
+        if self._ctx is None:
+            self._ctx = ExtractionContext(self.image)
+        return self._ctx
+
+    def _release_shm(self) -> None:
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def _submit(self, bboxes: Optional[List[List[float]]], mode: str):
+        if self._pool is not None:
+            try:
+                future = self._pool.submit(_run_task, self._shared_ref(), bboxes, mode)
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    _discard_pool(self._pool)
+                # Aucune tâche ne lit le segment : il est libéré tout de suite
+                if not self._pending:
+                    self._release_shm()
+                raise
+            self._pending.append(future)
+            return future
+        # Sans pool : contexte partagé entre l'image et ses objets (empreinte du contenu)
+        if bboxes is None:
+            future = _get_threads().submit(_extract_full_image, self._context())
+            self._pending.append(future)
+            return future
+        return _Deferred(lambda: self._objects_after_image(bboxes, mode))
+
+    def _objects_after_image(self, bboxes: List[List[float]], mode: str) -> List[Dict[str, Any]]:
+        # Le contexte n'est pas partagé entre threads : attendre la fin de l'image complète
+        if self._descriptors is not None:
+            self._descriptors.exception()
+        return extract_objects_descriptors(self._context(), bboxes, mode)
+
+    def _result(self, future) -> Any:
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            _discard_pool(self._pool)
+            raise
+
+    def start_descriptors(self) -> None:
+        """Lance le calcul des descripteurs de l'image complète."""
+        self._descriptors = self._submit(None, OBJECT_DESCRIPTOR_MODE)
+
+    def start_objects(self, bboxes: List[List[float]], mode: str = OBJECT_DESCRIPTOR_MODE) -> None:
+        """
+        Lance le calcul des descripteurs des objets. En mode "crop", les objets sont
+        répartis en paquets sur les processus ; en mode "pooled", les cartes de
+        réponses étant calculées pour toute l'image, ils restent dans une seule tâche.
+        """
+        if not bboxes:
+            return
+        chunks = min(len(bboxes), self._processes) if self._pool is not None and mode == "crop" else 1
+        size = math.ceil(len(bboxes) / chunks)
+        self._objects = [
+            (len(bboxes[start:start + size]), self._submit(bboxes[start:start + size], mode))
+            for start in range(0, len(bboxes), size)
+        ]
+
+    def descriptors(self) -> Dict[str, Any]:
+        """
+        Descripteurs de l'image complète.
+
+        Raises:
+            Exception: erreur de l'extraction
+        """
+        if self._descriptors is None:
+            self.start_descriptors()
+        return self._result(self._descriptors)
+
+    def objects_descriptors(self) -> List[Dict[str, Any]]:
+        """Descripteurs des objets, dans l'ordre des bounding boxes ({} si l'extraction a échoué)."""
+        results = []
+        for count, future in self._objects:
+            try:
+                results.extend(self._result(future))
+            except Exception as e:
+                # Si un paquet échoue, continuer avec les autres
+                print(f"Erreur extraction descripteurs pour {count} objet(s): {str(e)}")
+                results.extend({} for _ in range(count))
+        return results
+
+    def close(self) -> None:
+        """Attend la fin des tâches lancées puis libère la mémoire partagée."""
+        for future in self._pending:
+            future.exception()
+        self._pending = []
+        self._release_shm()
+        self._ctx = None
+
+    def __enter__(self) -> "ImageExtraction":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,251 @@
+"""
+Cache persistant des détections et des descripteurs, adressé par contenu.
+Chaque entrée est identifiée par l'empreinte SHA-256 des pixels de l'image,
+le type de résultat ("detections", "descriptors", "object_descriptors") et les
+paramètres qui l'influencent (version des extracteurs, moteurs, modèle...).
+Un changement de paramètre donne donc une autre clé, sans invalidation explicite.
+
+Le cache est une base SQLite locale (mode WAL, partagée par les processus de
+l'API et du pool d'extraction), bornée à FEATURE_CACHE_MAX_MB : les entrées
+les moins récemment utilisées sont évincées. La taille totale est tenue à jour
+par des triggers (table meta), sans parcourir la table à chaque écriture ; la
+date d'utilisation n'est réécrite que si elle date de plus de LAST_USED_RESOLUTION
+secondes. Les compteurs de hits / misses par type sont cumulés en mémoire puis
+ajoutés à la base toutes les COUNTERS_FLUSH_SECONDS secondes (voir GET /cache/stats) :
+une lecture n'écrit donc en général rien.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from config import FEATURE_CACHE_MAX_MB, FEATURE_CACHE_PATH
+
+
+# Après une éviction, la taille du cache redescend à cette fraction de la limite
+EVICTION_TARGET = 0.9
+# Précision (secondes) de la date de dernière utilisation servant à l'éviction LRU
+LAST_USED_RESOLUTION = 60
+# Intervalle (secondes) d'écriture des compteurs de hits / misses cumulés en mémoire
+COUNTERS_FLUSH_SECONDS = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS features (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS features_last_used ON features (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    kind TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS features_size_insert AFTER INSERT ON features BEGIN
+    UPDATE meta SET value = value + NEW.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS features_size_update AFTER UPDATE OF size ON features BEGIN
+    UPDATE meta SET value = value + NEW.size - OLD.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS features_size_delete AFTER DELETE ON features BEGIN
+    UPDATE meta SET value = value - OLD.size WHERE name = 'bytes';
+END;
+"""
+
+
+class FeatureCache:
+    """
+    Cache clé -> résultat (sérialisé avec pickle) dans une base SQLite.
+    Les erreurs SQLite et les entrées illisibles (supprimées) sont journalisées
+    et traitées comme des misses : le cache ne fait jamais échouer une détection
+    ou une extraction.
+    """
+
+    def __init__(self, path: str = FEATURE_CACHE_PATH, max_bytes: int = FEATURE_CACHE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = bool(path) and max_bytes > 0
+        # Une connexion par thread (et par processus)
+        self._local = threading.local()
+        # Compteurs pas encore écrits : type -> [hits, misses]
+        self._counts: Dict[str, List[int]] = {}
+        self._counts_lock = threading.Lock()
+        self._counts_flushed = time.monotonic()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            if connection.execute("SELECT 1 FROM meta WHERE name = 'bytes'").fetchone() is None:
+                # Base créée avant la table meta : taille initiale calculée une seule fois
+                connection.execute(
+                    "INSERT OR IGNORE INTO meta (name, value) SELECT 'bytes', COALESCE(SUM(size), 0) FROM features"
+                )
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    @staticmethod
+    def key(kind: str, digest: str, params: Dict[str, Any]) -> str:
+        """Clé d'une entrée : empreinte du type, du contenu et des paramètres."""
+        return hashlib.sha256(json.dumps([kind, digest, params], sort_keys=True).encode()).hexdigest()
+
+    def _count(self, kind: str, hit: bool) -> None:
+        with self._counts_lock:
+            self._counts.setdefault(kind, [0, 0])[0 if hit else 1] += 1
+            due = time.monotonic() - self._counts_flushed >= COUNTERS_FLUSH_SECONDS
+        if due:
+            self.flush_counters()
+
+    def flush_counters(self) -> None:
+        """Ajoute à la base les compteurs de hits / misses cumulés en mémoire."""
+        with self._counts_lock:
+            counts, self._counts = self._counts, {}
+            self._counts_flushed = time.monotonic()
+        if not counts:
+            return
+        try:
+            connection = self._connection()
+            connection.executemany(
+                "INSERT INTO counters (kind, hits, misses) VALUES (?, ?, ?) "
+                "ON CONFLICT (kind) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+                [(kind, hits, misses) for kind, (hits, misses) in counts.items()]
+            )
+        except sqlite3.Error as e:
+            print(f"Erreur cache des descripteurs (compteurs): {str(e)}")
+
+    def get(self, kind: str, digest: str, params: Dict[str, Any]) -> Optional[Any]:
+        """Résultat en cache, ou None (miss)."""
+        if not self.enabled:
+            return None
+        key = self.key(kind, digest, params)
+        try:
+            connection = self._connection()
+            row = connection.execute("SELECT value, last_used FROM features WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count(kind, False)
+                return None
+            try:
+                value = pickle.loads(row[0])
+            except Exception as e:
+                # Entrée tronquée ou écrite par une autre version de numpy / ultralytics :
+                # supprimée, et comptée comme un miss
+                print(f"Entrée illisible dans le cache des descripteurs ({kind}): {str(e)}")
+                connection.execute("DELETE FROM features WHERE key = ?", (key,))
+                self._count(kind, False)
+                return None
+            now = time.time()
+            if now - row[1] > LAST_USED_RESOLUTION:
+                connection.execute("UPDATE features SET last_used = ? WHERE key = ?", (now, key))
+            self._count(kind, True)
+            return value
+        except sqlite3.Error as e:
+            print(f"Erreur cache des descripteurs ({kind}): {str(e)}")
+            return None
+
+    def put(self, kind: str, digest: str, params: Dict[str, Any], value: Any) -> None:
+        """Stocke un résultat puis évince les entrées les plus anciennes si la limite est dépassée."""
+        if not self.enabled:
+            return
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            connection = self._connection()
+            # Upsert (et non INSERT OR REPLACE, dont la suppression ne déclenche pas les triggers)
+            connection.execute(
+                "INSERT INTO features (key, kind, value, size, last_used) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET kind = excluded.kind, value = excluded.value, "
+                "size = excluded.size, last_used = excluded.last_used",
+                (self.key(kind, digest, params), kind, blob, len(blob), time.time())
+            )
+            self._evict(connection)
+        except sqlite3.Error as e:
+            print(f"Erreur cache des descripteurs ({kind}): {str(e)}")
+
+    def fetch(self, kind: str, digest: str, params: Dict[str, Any], compute: Callable[[], Any],
+              store: bool = True) -> Any:
+        """
+        Résultat en cache, ou calculé par compute() puis stocké.
+
+        Args:
+            store: Stocker un résultat calculé (False : lecture seule, ex. image de requête)
+        """
+        value = self.get(kind, digest, params)
+        if value is None:
+            value = compute()
+            if store:
+                self.put(kind, digest, params, value)
+        return value
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        total = connection.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        to_free = total - int(self.max_bytes * EVICTION_TARGET)
+        keys: List[str] = []
+        for key, size in connection.execute("SELECT key, size FROM features ORDER BY last_used"):
+            keys.append(key)
+            to_free -= size
+            if to_free <= 0:
+                break
+        connection.executemany("DELETE FROM features WHERE key = ?", [(key,) for key in keys])
+
+    def stats(self) -> Dict[str, Any]:
+        """Taille du cache et compteurs de hits / misses par type de résultat."""
+        stats: Dict[str, Any] = {"enabled": self.enabled, "max_bytes": self.max_bytes}
+        if not self.enabled:
+            return stats
+        self.flush_counters()
+        try:
+            connection = self._connection()
+            entries = connection.execute("SELECT COUNT(*) FROM features").fetchone()[0]
+            size = connection.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+            stats.update({"entries": entries, "bytes": size, "kinds": {}})
+            for kind, hits, misses in connection.execute("SELECT kind, hits, misses FROM counters ORDER BY kind"):
+                stats["kinds"][kind] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0
+                }
+        except sqlite3.Error as e:
+            stats["error"] = str(e)
+        return stats
+
+    def clear(self) -> None:
+        """Supprime toutes les entrées et remet les compteurs à zéro."""
+        if not self.enabled:
+            return
+        with self._counts_lock:
+            self._counts = {}
+        connection = self._connection()
+        connection.execute("DELETE FROM features")
+        connection.execute("DELETE FROM counters")
+
+
+_cache: Optional[FeatureCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_feature_cache() -> FeatureCache:
+    """Retourne le cache du processus (désactivé si FEATURE_CACHE_MAX_MB vaut 0)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FeatureCache()
+                # Compteurs encore en mémoire à l'arrêt du processus
+                atexit.register(_cache.flush_counters)
+    return _cache
@@ -0,0 +1,89 @@
+"""
+Chargement des images en mémoire.
+Les routes décodent chaque image une seule fois (depuis le flux de la requête)
+et passent le tableau décodé à la détection et à l'extraction de descripteurs.
+"""
+
+import hashlib
+import os
+from typing import Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+# Source d'image acceptée par detect_objects / extract_descriptors
+ImageSource = Union[str, bytes, np.ndarray]
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """
+    Décode une image encodée (JPEG, PNG...) en tableau BGR.
+
+    Raises:
+        ValueError: si les octets ne sont pas une image décodable
+    """
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR) if data else None
+    if image is None:
+        raise ValueError("Impossible de décoder l'image")
+    return image
+
+
+def check_image_file(path: str) -> None:
+    """
+    Vérifie, sans décoder les pixels, qu'un fichier est une image lisible :
+    format reconnu par OpenCV (signature du fichier) et structure valide
+    (Image.verify de Pillow, qui contrôle par exemple les chunks d'un PNG).
+    Le décodage complet n'est fait qu'une fois, par le worker d'ingestion.
+
+    Raises:
+        ValueError: si le fichier n'est pas une image lisible
+    """
+    if not cv2.haveImageReader(path):
+        raise ValueError("Format d'image non reconnu")
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception as e:
+        raise ValueError(f"Image invalide : {str(e)}")
+
+
+def load_image(source: ImageSource) -> np.ndarray:
+    """
+    Retourne l'image BGR correspondant à la source.
+
+    Args:
+        source: Chemin vers un fichier, octets encodés ou tableau déjà décodé
+
+    Raises:
+        FileNotFoundError: si le chemin n'existe pas
+        ValueError: si l'image ne peut pas être décodée
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return decode_image(bytes(source))
+
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Image non trouvée : {source}")
+    image = cv2.imread(source)
+    if image is None:
+        raise ValueError(f"Impossible de charger l'image : {source}")
+    return image
+
+
+def describe_source(source: ImageSource) -> str:
+    """Description courte d'une source d'image pour les logs."""
+    if isinstance(source, np.ndarray):
+        return f"image {source.shape[1]}x{source.shape[0]}"
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"image encodée ({len(source)} octets)"
+    return source
+
+
+def content_hash(image: np.ndarray) -> str:
+    """Empreinte SHA-256 du contenu d'une image décodée (pixels, forme et type)."""
+    digest = hashlib.sha256(f"{image.shape}|{image.dtype}".encode())
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
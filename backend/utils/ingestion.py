@@ -0,0 +1,326 @@
+"""
+Ingestion asynchrone des images uploadées.
+/upload sauvegarde les fichiers et crée un job par image (collection "jobs") ;
+un pool borné de INGESTION_WORKERS threads exécute ensuite la détection YOLO
+(par lots) et l'extraction des descripteurs (répartie sur EXTRACTION_PROCESSES
+processus, voir utils/extraction_pool.py), puis stocke l'image dans MongoDB.
+Les jobs étant persistés, ceux qui n'ont pas abouti sont repris : au démarrage,
+puis périodiquement pour les jobs dont le bail a expiré (voir JobModel).
+Chaque image porte l'ID de son job : un job exécuté deux fois n'en crée qu'une.
+Le bail des jobs est renouvelé pendant tout le traitement d'un lot (heartbeat).
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from config import DETECTION_BATCH_SIZE, INGESTION_WORKERS, JOB_LEASE_SECONDS
+from models.image_model import ImageModel
+from models.job_model import JobModel
+from utils.descriptor_extraction import DESCRIPTORS_VERSION
+from utils.extraction_pool import ImageExtraction
+from utils.image_io import load_image
+from utils.search_index import mark_search_index_stale
+from utils.yolo_detection import detect_objects_batch
+
+
+class IngestionError(Exception):
+    """Erreur d'indexation d'une image (message destiné au client)."""
+
+
+def object_bboxes(detected_objects: List[Dict[str, Any]]) -> List[List[float]]:
+    """Bounding boxes des objets détectés dont on extrait les descripteurs."""
+    return [obj["bbox"] for obj in detected_objects if len(obj.get("bbox", [])) == 4]
+
+
+def index_image(filename: str, path: str, extraction: ImageExtraction,
+                detected_objects: List[Dict[str, Any]], job_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Récupère les descripteurs d'une image sauvegardée et la stocke dans MongoDB.
+
+    Args:
+        filename: Nom unique du fichier dans uploads/
+        path: Chemin du fichier sauvegardé
+        extraction: Extraction de l'image, objets lancés (start_objects)
+        detected_objects: Détections YOLO de l'image
+        job_id: Job d'ingestion (si l'image du job existe déjà, elle est retournée)
+
+    Returns:
+        {"id", "filename", "objects_detected"}
+
+    Raises:
+        IngestionError: si l'extraction ou le stockage échoue
+    """
+    # Descripteurs visuels de l'image complète
+    try:
+        descriptors = extraction.descriptors()
+    except Exception as e:
+        raise IngestionError(f"Erreur extraction descripteurs image: {str(e)}")
+
+    # Descripteurs de chaque objet détecté ({} si l'extraction a échoué)
+    objects_with_bbox = [obj for obj in detected_objects if len(obj.get("bbox", [])) == 4]
+    for obj, object_descriptors in zip(objects_with_bbox, extraction.objects_descriptors()):
+        obj["descriptors"] = object_descriptors
+
+    try:
+        image_id = ImageModel.create(
+            filename=filename,
+            path=path,
+            detected_objects=detected_objects,
+            descriptors=descriptors,
+            job_id=job_id,
+            descriptors_version=DESCRIPTORS_VERSION,
+        )
+    except DuplicateKeyError:
+        # Job exécuté deux fois (bail expiré pendant le traitement) : image déjà stockée
+        existing = _existing_image(job_id)
+        if existing is None:
+            raise IngestionError("Image du job introuvable")
+        return existing
+    except Exception as e:
+        raise IngestionError(str(e))
+    mark_search_index_stale()
+
+    return {
+        "id": image_id,
+        "filename": filename,
+        "objects_detected": len(detected_objects)
+    }
+
+
+def _existing_image(job_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Résultat d'un job dont l'image a déjà été stockée, ou None."""
+    image = ImageModel.find_by_job(job_id, {"filename": 1, "detected_objects.class": 1}) if job_id else None
+    if image is None:
+        return None
+    return {
+        "id": str(image["_id"]),
+        "filename": image.get("filename"),
+        "objects_detected": len(image.get("detected_objects", []))
+    }
+
+
+def _fail(job: Dict[str, Any], error: str) -> None:
+    """Marque le job en échec et supprime le fichier sauvegardé (sauf si le job a été repris)."""
+    print(f"Erreur ingestion {job['filename']}: {error}")
+    # Job repris après expiration du bail : l'autre exécution a pu stocker l'image
+    existing = _existing_image(str(job["_id"]))
+    if existing is not None:
+        _complete(job, existing)
+        return
+    if JobModel.fail(str(job["_id"]), error) and os.path.exists(job["path"]):
+        os.remove(job["path"])
+
+
+def _complete(job: Dict[str, Any], result: Dict[str, Any]) -> None:
+    """
+    Marque le job comme terminé. S'il a été repris entre-temps puis marqué en
+    échec par un autre worker (fichier supprimé), l'image stockée est retirée.
+    """
+    job_id = str(job["_id"])
+    if JobModel.complete(job_id, result["id"], result["objects_detected"]):
+        return
+    current = JobModel.find_by_id(job_id)
+    if current is not None and current.get("status") == "failed":
+        ImageModel.delete(result["id"])
+        mark_search_index_stale()
+
+
+def _start_heartbeat(job_ids: List[str]) -> threading.Event:
+    """
+    Renouvelle le bail des jobs toutes les JOB_LEASE_SECONDS / 3 secondes, pour
+    qu'un lot plus long que le bail ne soit pas repris pendant son traitement.
+
+    Returns:
+        Événement à positionner pour arrêter le renouvellement
+    """
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(max(1, JOB_LEASE_SECONDS / 3)):
+            try:
+                JobModel.renew(job_ids)
+            except Exception as e:
+                print(f"Erreur de renouvellement du bail des jobs: {str(e)}")
+
+    threading.Thread(target=beat, name="ingestion-heartbeat", daemon=True).start()
+    return stop
+
+
+def process_jobs(job_ids: List[str]) -> None:
+    """
+    Traite un lot de jobs. Pour chaque image, les étapes forment un petit graphe :
+    décodage -> {détection YOLO (une inférence pour tout le lot), descripteurs de
+    l'image complète} en parallèle -> descripteurs des objets -> stockage.
+    Les jobs déjà pris par un autre worker (ou terminés) sont ignorés.
+    """
+    jobs, images = [], []
+    for job in (JobModel.claim(job_id) for job_id in job_ids):
+        if job is None:
+            continue
+        # Exécution précédente interrompue entre le stockage de l'image et la fin du job
+        existing = _existing_image(str(job["_id"]))
+        if existing is not None:
+            _complete(job, existing)
+            continue
+        try:
+            images.append(load_image(job["path"]))
+            jobs.append(job)
+        except Exception:
+            _fail(job, "Impossible de charger l'image")
+    if not jobs:
+        return
+
+    # Descripteurs des images complètes : lancés avant la détection, dont ils ne dépendent pas
+    JobModel.set_stage([str(job["_id"]) for job in jobs], "detection")
+    stop_heartbeat = _start_heartbeat([str(job["_id"]) for job in jobs])
+    extractions: List[Optional[ImageExtraction]] = []
+    try:
+        for job, image in zip(jobs, images):
+            extraction = None
+            try:
+                extraction = ImageExtraction(image)
+                extraction.start_descriptors()
+                extractions.append(extraction)
+            except Exception as e:
+                if extraction is not None:
+                    extraction.close()
+                _fail(job, str(e))
+                extractions.append(None)
+
+        # Détecter les objets avec YOLO (toutes les images du lot en un appel)
+        try:
+            batch_detections = detect_objects_batch(images)
+        except Exception as e:
+            # Si YOLO échoue, continuer quand même
+            print(f"Erreur YOLO pour {', '.join(job['filename'] for job in jobs)}: {str(e)}")
+            batch_detections = [[] for _ in jobs]
+
+        # Descripteurs des objets, une fois les bounding boxes connues (toutes les
+        # images du lot sont lancées avant d'en attendre une, pour occuper le pool)
+        JobModel.set_stage([str(job["_id"]) for job, extraction in zip(jobs, extractions) if extraction], "extraction")
+        for i, (job, extraction, detected_objects) in enumerate(zip(jobs, extractions, batch_detections)):
+            if extraction is None:
+                continue
+            try:
+                extraction.start_objects(object_bboxes(detected_objects))
+            except Exception as e:
+                # Ex. BrokenProcessPool : seul ce job échoue
+                extraction.close()
+                extractions[i] = None
+                _fail(job, str(e))
+
+        for job, extraction, detected_objects in zip(jobs, extractions, batch_detections):
+            if extraction is None:
+                continue
+            try:
+                result = index_image(job["filename"], job["path"], extraction, detected_objects, str(job["_id"]))
+                _complete(job, result)
+            except Exception as e:
+                _fail(job, str(e))
+            finally:
+                extraction.close()
+    finally:
+        # Mémoire partagée et contextes libérés même si le lot est interrompu
+        # (les jobs restés "running" sont repris à l'expiration de leur bail)
+        stop_heartbeat.set()
+        for extraction in extractions:
+            if extraction is not None:
+                extraction.close()
+
+
+def _run_jobs(job_ids: List[str]) -> None:
+    # Une exception non rattrapée serait perdue dans le Future du pool
+    try:
+        process_jobs(job_ids)
+    except Exception as e:
+        print(f"Erreur du worker d'ingestion: {str(e)}")
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=INGESTION_WORKERS, thread_name_prefix="ingestion")
+    return _executor
+
+
+def _reset_executor_after_fork() -> None:
+    """Les threads ne survivent pas à un fork : le processus enfant recrée les siens."""
+    global _executor, _executor_lock, _watcher
+    _executor = _watcher = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_executor_after_fork)
+
+
+def submit_jobs(job_ids: List[str]) -> None:
+    """
+    Confie les jobs au pool de workers, par lots de DETECTION_BATCH_SIZE.
+    Avec INGESTION_WORKERS=0, les jobs sont traités immédiatement dans le thread
+    appelant (utile pour les tests et le débogage).
+    """
+    batch_size = max(1, DETECTION_BATCH_SIZE)
+    for start in range(0, len(job_ids), batch_size):
+        batch = job_ids[start:start + batch_size]
+        if INGESTION_WORKERS <= 0:
+            _run_jobs(batch)
+        else:
+            _get_executor().submit(_run_jobs, batch)
+
+
+def recover_jobs() -> int:
+    """
+    Reprend les jobs non terminés au démarrage : les jobs abandonnés en cours
+    de traitement (bail expiré ou processus arrêté) sont remis en attente, puis
+    tous les jobs en attente sont soumis.
+
+    Returns:
+        Nombre de jobs soumis
+    """
+    JobModel.requeue_expired()
+    job_ids = JobModel.queued_ids()
+    if job_ids:
+        print(f"Reprise de {len(job_ids)} job(s) d'ingestion en attente")
+        submit_jobs(job_ids)
+    return len(job_ids)
+
+
+def _watch_leases(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            job_ids = JobModel.requeue_expired()
+            if job_ids:
+                print(f"Reprise de {len(job_ids)} job(s) d'ingestion abandonné(s)")
+                submit_jobs(job_ids)
+        except Exception as e:
+            print(f"Erreur de reprise des jobs d'ingestion: {str(e)}")
+
+
+_watcher: Optional[threading.Thread] = None
+
+
+def start_lease_watcher() -> None:
+    """
+    Reprend périodiquement (toutes les JOB_LEASE_SECONDS / 2 secondes) les jobs
+    dont le bail a expiré pendant que l'application tourne (une seule fois par processus).
+    """
+    global _watcher
+    with _executor_lock:
+        if _watcher is not None:
+            return
+        _watcher = threading.Thread(target=_watch_leases, args=(max(1, JOB_LEASE_SECONDS / 2),),
+                                    name="ingestion-leases", daemon=True)
+    _watcher.start()
@@ -0,0 +1,96 @@
+"""
+Mise en forme des réponses des routes /images et /search.
+Par défaut les réponses sont légères : les descripteurs (histogrammes, HOG...)
+ne sont ni lus depuis MongoDB ni renvoyés, ils restent accessibles via
+/descriptors/<id>. Les options de requête permettent d'ajuster :
+- include_descriptors=true : inclure les descripteurs des objets détectés
+- fields=id,filename,... : ne garder que certains champs de chaque image
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from models.image_model import to_serializable
+
+
+# Champs des objets détectés renvoyés par défaut (sans "descriptors")
+OBJECT_FIELDS = ("class", "confidence", "bbox")
+
+# Champs de la réponse -> champs du document MongoDB nécessaires pour les construire
+FIELD_SOURCES = {
+    "id": set(),
+    "image_id": set(),
+    "filename": {"filename"},
+    "uploaded_at": {"uploaded_at"},
+    "objects_detected": {"detected_objects"},
+    "detected_objects": {"detected_objects"},
+    "objects_count": {"detected_objects"},
+    "object_classes": {"detected_objects"},
+    "similarity_score": set(),
+    "matched_object": set(),
+}
+
+
+def parse_bool(value: Any, default: bool = False) -> bool:
+    """Interprète un paramètre de requête booléen ("true", "1", "yes"...)."""
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def parse_fields(value: Any) -> Optional[Set[str]]:
+    """
+    Interprète le paramètre fields (liste séparée par des virgules).
+
+    Returns:
+        Ensemble des champs demandés (toujours avec "id"), ou None pour tous les champs
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    fields = {field.strip() for field in value if field and field.strip()}
+    return (fields | {"id"}) if fields else None
+
+
+def document_projection(fields: Optional[Iterable[str]] = None,
+                        include_descriptors: bool = False) -> Dict[str, int]:
+    """
+    Construit la projection MongoDB correspondant aux champs de réponse demandés.
+    Les descripteurs de l'image ne sont jamais lus ; ceux des objets seulement
+    si include_descriptors est vrai.
+    """
+    if fields is None:
+        fields = FIELD_SOURCES.keys()
+
+    sources = set()
+    for field in fields:
+        sources |= FIELD_SOURCES.get(field, set())
+
+    projection = {source: 1 for source in sources if source != "detected_objects"}
+    if "detected_objects" in sources:
+        if include_descriptors:
+            projection["detected_objects"] = 1
+        else:
+            for key in OBJECT_FIELDS:
+                projection[f"detected_objects.{key}"] = 1
+    # Projection vide = document complet pour MongoDB : ne demander que l'_id
+    return projection or {"_id": 1}
+
+
+def shape_objects(detected_objects: List[Dict[str, Any]], include_descriptors: bool = False) -> List[Dict[str, Any]]:
+    """Prépare la liste des objets détectés pour la réponse JSON."""
+    if not include_descriptors:
+        detected_objects = [
+            {key: value for key, value in obj.items() if key != "descriptors"}
+            for obj in detected_objects
+        ]
+    return to_serializable(detected_objects)
+
+
+def select_fields(data: Dict[str, Any], fields: Optional[Set[str]]) -> Dict[str, Any]:
+    """Ne garde que les champs demandés d'un élément de réponse."""
+    if fields is None:
+        return data
+    return {key: value for key, value in data.items() if key in fields}
@@ -0,0 +1,306 @@
+"""
+Index de recherche en mémoire.
+Les descripteurs de toutes les images sont empilés famille par famille dans des
+matrices float32 contiguës (histogrammes RGB/HSV, couleurs dominantes, Tamura,
+Gabor, Hu, HOG). Une requête est alors comparée à toute la collection en
+quelques opérations NumPy via compare_descriptors_batch.
+"""
+
+import copy
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import SEARCH_INDEX_CHECK_SECONDS
+from utils.similarity_search import DescriptorMatrix, GrowableRows, append_rows, compare_descriptors_batch
+
+
+def top_k_indices(distances: np.ndarray, top_k: int) -> np.ndarray:
+    """Retourne les indices des top_k plus petites distances, triés par distance croissante."""
+    if top_k <= 0 or len(distances) == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < len(distances):
+        candidates = np.argpartition(distances, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(len(distances))
+    # Tri stable (distance puis position) pour garder l'ordre d'insertion en cas d'égalité
+    return candidates[np.lexsort((candidates, distances[candidates]))]
+
+
+class ImageIndex:
+    """Index des descripteurs d'images complètes."""
+
+    def __init__(self, images: List[Dict[str, Any]]):
+        images = [img for img in images if img.get("descriptors")]
+        self.ids = np.asarray([str(img["_id"]) for img in images], dtype=object)
+        self.matrix = DescriptorMatrix([img["descriptors"] for img in images],
+                                       labels=[f"image {img['_id']}" for img in images])
+        # Buffers à croissance géométrique des tableaux étendus par extended()
+        self._buffers: Dict[Any, GrowableRows] = {}
+
+        # Lignes par classe d'objet détectée (filtre object_class)
+        rows_by_class: Dict[str, List[int]] = {}
+        for row, img in enumerate(images):
+            classes = {obj.get("class") for obj in img.get("detected_objects", []) if obj.get("class")}
+            for object_class in classes:
+                rows_by_class.setdefault(object_class, []).append(row)
+        self.rows_by_class = {cls: np.asarray(rows, dtype=np.int64) for cls, rows in rows_by_class.items()}
+
+    def extended(self, images: List[Dict[str, Any]]) -> "ImageIndex":
+        """Retourne un nouvel index contenant en plus les images données."""
+        added = ImageIndex(images)
+        index = copy.copy(self)
+        index._buffers = buffers = dict(self._buffers)
+        index.ids = append_rows(buffers, "ids", self.ids, added.ids)
+        index.matrix = copy.copy(self.matrix)
+        index.matrix.extend(added.matrix)
+        offset = len(self.ids)
+        rows_by_class = dict(self.rows_by_class)
+        for object_class, rows in added.rows_by_class.items():
+            own = rows_by_class.get(object_class, np.empty(0, dtype=np.int64))
+            rows_by_class[object_class] = append_rows(buffers, ("class", object_class), own, rows + offset)
+        index.rows_by_class = rows_by_class
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query_descriptors: Dict[str, Any], top_k: int = 10,
+               object_class: Optional[str] = None,
+               weights: Optional[Dict[str, float]] = None) -> List[Tuple[str, float, None]]:
+        """
+        Recherche les images les plus proches de la requête.
+
+        Args:
+            query_descriptors: Descripteurs de l'image requête
+            top_k: Nombre de résultats à retourner
+            object_class: Ne garder que les images contenant cette classe d'objet
+            weights: Poids par famille de descripteurs
+
+        Returns:
+            Liste de tuples (image_id, distance, None), même format que search_similar_images
+        """
+        if object_class:
+            rows = self.rows_by_class.get(object_class, np.empty(0, dtype=np.int64))
+        else:
+            rows = np.arange(len(self.ids))
+        # Les images aux descripteurs mal formés sont ignorées
+        rows = rows[self.matrix.valid[rows]]
+        if not len(rows):
+            return []
+
+        distances = compare_descriptors_batch(query_descriptors, self.matrix, weights, rows=rows)
+        best = top_k_indices(distances, top_k)
+        return [(self.ids[rows[i]], float(distances[i]), None) for i in best]
+
+
+class ObjectIndex:
+    """
+    Index des descripteurs d'objets détectés : une ligne par objet, avec en
+    tableaux parallèles l'image parente, l'index de l'objet, sa classe et sa confiance.
+    Les lignes sont regroupées par image, ce qui permet un minimum segmenté par image.
+    """
+
+    def __init__(self, images: List[Dict[str, Any]]):
+        image_ids: List[str] = []
+        image_rows, object_indices, classes, confidences, descriptors_list = [], [], [], [], []
+        labels: List[str] = []
+        images_by_class: Dict[str, List[int]] = {}
+
+        for img in images:
+            objects = img.get("detected_objects", [])
+            indexed = [(i, obj) for i, obj in enumerate(objects) if obj.get("descriptors")]
+            if not indexed:
+                continue
+            position = len(image_ids)
+            image_ids.append(str(img["_id"]))
+            for object_class in {obj.get("class") for obj in objects if obj.get("class")}:
+                images_by_class.setdefault(object_class, []).append(position)
+            for obj_idx, obj in indexed:
+                image_rows.append(position)
+                object_indices.append(obj_idx)
+                classes.append(obj.get("class"))
+                confidence = obj.get("confidence")
+                confidences.append(np.nan if confidence is None else confidence)
+                descriptors_list.append(obj["descriptors"])
+                labels.append(f"objet {obj_idx} de l'image {img['_id']}")
+
+        self.image_rows = np.asarray(image_rows, dtype=np.int64)
+        self.object_indices = np.asarray(object_indices, dtype=np.int64)
+        self.classes = np.asarray(classes, dtype=object)
+        self.confidences = np.asarray(confidences, dtype=np.float64)
+        self.images_by_class = {cls: np.asarray(rows, dtype=np.int64) for cls, rows in images_by_class.items()}
+        self.image_ids = np.asarray(image_ids, dtype=object)
+        self.matrix = DescriptorMatrix(descriptors_list, labels=labels)
+        # Buffers à croissance géométrique des tableaux étendus par extended()
+        self._buffers: Dict[Any, GrowableRows] = {}
+
+    def extended(self, images: List[Dict[str, Any]]) -> "ObjectIndex":
+        """Retourne un nouvel index contenant en plus les objets des images données."""
+        added = ObjectIndex(images)
+        index = copy.copy(self)
+        index._buffers = buffers = dict(self._buffers)
+        offset = len(self.image_ids)
+        index.image_ids = append_rows(buffers, "image_ids", self.image_ids, added.image_ids)
+        index.image_rows = append_rows(buffers, "image_rows", self.image_rows, added.image_rows + offset)
+        index.object_indices = append_rows(buffers, "object_indices", self.object_indices, added.object_indices)
+        index.classes = append_rows(buffers, "classes", self.classes, added.classes)
+        index.confidences = append_rows(buffers, "confidences", self.confidences, added.confidences)
+        images_by_class = dict(self.images_by_class)
+        for object_class, rows in added.images_by_class.items():
+            own = images_by_class.get(object_class, np.empty(0, dtype=np.int64))
+            images_by_class[object_class] = append_rows(buffers, ("class", object_class), own, rows + offset)
+        index.images_by_class = images_by_class
+        index.matrix = copy.copy(self.matrix)
+        index.matrix.extend(added.matrix)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.image_rows)
+
+    def _object_info(self, row: int) -> Dict[str, Any]:
+        confidence = self.confidences[row]
+        return {
+            "object_index": int(self.object_indices[row]),
+            "object_class": self.classes[row],
+            "confidence": None if np.isnan(confidence) else float(confidence)
+        }
+
+    def search(self, query_descriptors: Dict[str, Any], top_k: int = 10,
+               object_class: Optional[str] = None,
+               weights: Optional[Dict[str, float]] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Recherche les images dont un objet est le plus proche de la requête.
+
+        Args:
+            query_descriptors: Descripteurs de l'objet requête
+            top_k: Nombre d'images à retourner
+            object_class: Ne garder que les images contenant cette classe d'objet
+            weights: Poids par famille de descripteurs
+
+        Returns:
+            Liste de tuples (image_id, distance, info_objet) où info_objet décrit
+            l'objet le plus proche de chaque image (même format que search_similar_images)
+        """
+        if object_class:
+            allowed = self.images_by_class.get(object_class, np.empty(0, dtype=np.int64))
+            rows = np.flatnonzero(np.isin(self.image_rows, allowed))
+        else:
+            rows = np.arange(len(self.image_rows))
+        if not len(rows):
+            return []
+
+        distances = compare_descriptors_batch(query_descriptors, self.matrix, weights, rows=rows)
+        parents = self.image_rows[rows]
+
+        # Minimum segmenté : les lignes d'une même image sont contiguës
+        starts = np.flatnonzero(np.r_[True, parents[1:] != parents[:-1]])
+        segment_min = np.minimum.reduceat(distances, starts)
+        lengths = np.diff(np.r_[starts, len(rows)])
+        # Premier objet atteignant le minimum de son image (comme la comparaison stricte de la boucle)
+        positions = np.where(distances == np.repeat(segment_min, lengths), np.arange(len(rows)), len(rows))
+        best_positions = np.minimum.reduceat(positions, starts)
+
+        # Les images dont aucun objet n'est comparable sont ignorées
+        finite = np.isfinite(segment_min)
+        segment_min, best_positions = segment_min[finite], best_positions[finite]
+
+        best = top_k_indices(segment_min, top_k)
+        return [
+            (self.image_ids[parents[best_positions[i]]], float(segment_min[i]),
+             self._object_info(rows[best_positions[i]]))
+            for i in best
+        ]
+
+
+class SearchIndex:
+    """
+    Index résident partagé par les requêtes de recherche.
+    Les nouvelles images sont ajoutées de façon incrémentale ; une suppression
+    entraîne une reconstruction complète.
+    """
+
+    def __init__(self, images: List[Dict[str, Any]]):
+        self.images = ImageIndex(images)
+        self.objects = ObjectIndex(images)
+        self.count = len(images)
+        self.last_id = str(images[-1]["_id"]) if images else None
+
+    def extended(self, images: List[Dict[str, Any]]) -> "SearchIndex":
+        """Retourne un nouvel index contenant en plus les images données (triées par _id)."""
+        index = copy.copy(self)
+        index.images = self.images.extended(images)
+        index.objects = self.objects.extended(images)
+        index.count = self.count + len(images)
+        if images:
+            index.last_id = str(images[-1]["_id"])
+        return index
+
+
+# Champs nécessaires à l'index (pas de chemin, nom de fichier, etc.)
+INDEX_PROJECTION = {"descriptors": 1, "detected_objects": 1}
+
+_index: Optional[SearchIndex] = None
+_index_lock = threading.Lock()
+# Date (time.monotonic) de la dernière comparaison de l'index avec la collection
+_index_checked_at = float("-inf")
+
+
+def get_search_index() -> SearchIndex:
+    """
+    Retourne l'index de recherche, construit au premier appel puis tenu à jour :
+    les images insérées depuis sont ajoutées, et l'index est reconstruit
+    si le nombre de documents ne correspond plus (suppression, insertion concurrente).
+    La collection n'est interrogée qu'une fois toutes les SEARCH_INDEX_CHECK_SECONDS
+    secondes (ou après mark_search_index_stale) : entre deux vérifications,
+    les recherches utilisent l'index courant sans aller-retour MongoDB ni verrou.
+    """
+    global _index, _index_checked_at
+    from models.image_model import ImageModel
+
+    index = _index
+    if index is not None and time.monotonic() - _index_checked_at < SEARCH_INDEX_CHECK_SECONDS:
+        return index
+
+    with _index_lock:
+        # Un autre thread a pu vérifier la collection pendant l'attente du verrou
+        if _index is not None and time.monotonic() - _index_checked_at < SEARCH_INDEX_CHECK_SECONDS:
+            return _index
+        checked_at = time.monotonic()
+        count = ImageModel.count()
+        if _index is not None and count != _index.count:
+            if _index.last_id:
+                added = ImageModel.find_after(_index.last_id, INDEX_PROJECTION)
+            else:
+                added = ImageModel.all(INDEX_PROJECTION)
+            if _index.count + len(added) == count:
+                _index = _index.extended(added)
+            else:
+                _index = None
+        elif _index is not None and ImageModel.last_id() != _index.last_id:
+            # Même nombre de documents mais contenu différent (suppression + insertion)
+            _index = None
+        if _index is None:
+            _index = SearchIndex(sorted(ImageModel.all(INDEX_PROJECTION), key=lambda img: img["_id"]))
+        _index_checked_at = checked_at
+        return _index
+
+
+def mark_search_index_stale() -> None:
+    """
+    Demande une vérification de la collection à la prochaine recherche
+    (image ajoutée ou supprimée par ce processus) ; l'index est alors
+    étendu ou reconstruit comme d'habitude.
+    """
+    global _index_checked_at
+    _index_checked_at = float("-inf")
+
+
+def invalidate_search_index() -> None:
+    """Force la reconstruction de l'index au prochain appel."""
+    global _index, _index_checked_at
+    with _index_lock:
+        _index = None
+        _index_checked_at = float("-inf")
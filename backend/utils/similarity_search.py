@@ -4,9 +4,19 @@ Utilise différentes métriques de distance pour comparer les descripteurs.
 """
 
 import numpy as np
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Union
 
 
+# Poids par défaut pour chaque type de descripteur
+DEFAULT_WEIGHTS = {
+    "color_histogram": 0.2,
+    "dominant_colors": 0.15,
+    "tamura": 0.15,
+    "gabor": 0.2,
+    "hu_moments": 0.15,
+    "hog": 0.15
+}
+
 def euclidean_distance(vec1: np.ndarray, vec2: np.ndarray) -> float:
     """Calcule la distance euclidienne entre deux vecteurs."""
     return float(np.linalg.norm(vec1 - vec2))
@@ -49,15 +59,7 @@ def compare_descriptors(desc1: Dict[str, Any], desc2: Dict[str, Any],
         Score de similarité global (0 = identique, plus élevé = plus différent)
     """
     if weights is None:
-        # Poids par défaut pour chaque type de descripteur
-        weights = {
-            "color_histogram": 0.2,
-            "dominant_colors": 0.15,
-            "tamura": 0.15,
-            "gabor": 0.2,
-            "hu_moments": 0.15,
-            "hog": 0.15
-        }
+        weights = DEFAULT_WEIGHTS
     
     total_distance = 0.0
     total_weight = 0.0
@@ -139,14 +141,8 @@ def compare_descriptors(desc1: Dict[str, Any], desc2: Dict[str, Any],
             gabor1 = np.array(desc1["gabor"]).flatten()  # Aplatir en 1D
             gabor2 = np.array(desc2["gabor"]).flatten()  # Aplatir en 1D
             
-            # Gérer les différences de taille
-            if len(gabor1) != len(gabor2):
-                # Utiliser la taille minimale (tronquer)
-                min_size = min(len(gabor1), len(gabor2))
-                gabor1 = gabor1[:min_size]
-                gabor2 = gabor2[:min_size]
-            
-            if len(gabor1) > 0 and len(gabor2) > 0:
+            # Vecteurs de tailles différentes (extracteurs différents) : non comparables
+            if len(gabor1) == len(gabor2) and len(gabor1) > 0:
                 dist = cosine_similarity(gabor1, gabor2)
                 total_distance += dist * weights["gabor"]
                 total_weight += weights["gabor"]
@@ -161,17 +157,13 @@ def compare_descriptors(desc1: Dict[str, Any], desc2: Dict[str, Any],
             hu2 = np.array(desc2["hu_moments"])
             
             # Les moments de Hu ont toujours 7 valeurs, mais vérifions quand même
-            if len(hu1) != len(hu2):
-                min_len = min(len(hu1), len(hu2))
-                hu1 = hu1[:min_len]
-                hu2 = hu2[:min_len]
-            
-            dist = euclidean_distance(hu1, hu2)
-            # Normaliser
-            dist = dist / 10.0
-            
-            total_distance += dist * weights["hu_moments"]
-            total_weight += weights["hu_moments"]
+            if len(hu1) == len(hu2):
+                dist = euclidean_distance(hu1, hu2)
+                # Normaliser
+                dist = dist / 10.0
+                
+                total_distance += dist * weights["hu_moments"]
+                total_weight += weights["hu_moments"]
         except Exception as e:
             print(f"Erreur comparaison Hu moments: {str(e)}")
     
@@ -181,14 +173,9 @@ def compare_descriptors(desc1: Dict[str, Any], desc2: Dict[str, Any],
             hog1 = np.array(desc1["hog"]).flatten()  # Aplatir en 1D
             hog2 = np.array(desc2["hog"]).flatten()  # Aplatir en 1D
             
-            # Gérer les différences de taille (HOG dépend de la taille de l'image)
-            if len(hog1) != len(hog2):
-                # Utiliser la taille minimale (tronquer)
-                min_size = min(len(hog1), len(hog2))
-                hog1 = hog1[:min_size]
-                hog2 = hog2[:min_size]
-            
-            if len(hog1) > 0 and len(hog2) > 0:
+            # Tailles différentes : HOG d'une image indexée avant la fenêtre canonique
+            # (longueur dépendant de la résolution), ignoré plutôt que tronqué
+            if len(hog1) == len(hog2) and len(hog1) > 0:
                 dist = cosine_similarity(hog1, hog2)
                 total_distance += dist * weights["hog"]
                 total_weight += weights["hog"]
@@ -203,6 +190,368 @@ def compare_descriptors(desc1: Dict[str, Any], desc2: Dict[str, Any],
     return float('inf')
 
 
+# Canaux des histogrammes de couleurs, dans l'ordre de compare_descriptors
+HISTOGRAM_CHANNELS = (
+    ("color_histogram_rgb", "r"),
+    ("color_histogram_rgb", "g"),
+    ("color_histogram_rgb", "b"),
+    ("color_histogram_hsv", "h"),
+    ("color_histogram_hsv", "s"),
+    ("color_histogram_hsv", "v"),
+)
+
+TAMURA_KEYS = ("roughness", "contrast", "directionality")
+
+# Familles vectorielles : (clé, métrique)
+VECTOR_FAMILIES = (
+    ("gabor", "cosine"),
+    ("hu_moments", "euclidean"),
+    ("hog", "cosine"),
+)
+
+
+def _as_vector(values: Any) -> np.ndarray:
+    """Convertit une liste (ou un tableau) de descripteurs en vecteur float32 1D."""
+    return np.asarray(values, dtype=np.float32).ravel()
+
+
+def _tamura_vector(tamura: Dict[str, Any]) -> np.ndarray:
+    return np.array([tamura.get(key, 0) for key in TAMURA_KEYS], dtype=np.float32)
+
+
+class GrowableRows:
+    """
+    Tableau dont la capacité double quand il est plein : ajouter n lignes ne
+    recopie pas les lignes existantes (coût amorti proportionnel à n).
+    Les lignes déjà utilisées d'un buffer ne sont jamais réécrites : la vue d'un
+    index plus ancien reste valide pendant que le suivant ajoute les siennes.
+    """
+
+    def __init__(self, array: np.ndarray, buffer: Optional[np.ndarray] = None,
+                 filled: Optional[List[int]] = None):
+        self.view = array
+        self._buffer = array if buffer is None else buffer
+        # Nombre de lignes utilisées du buffer, partagé par toutes ses vues
+        self._filled = [len(array)] if filled is None else filled
+
+    def appended(self, rows: np.ndarray) -> "GrowableRows":
+        """Retourne la vue étendue des lignes données (nouveau buffer si la capacité est atteinte)."""
+        size = len(self.view)
+        end = size + len(rows)
+        buffer, filled = self._buffer, self._filled
+        if end > len(buffer) or filled[0] != size:
+            # Capacité atteinte, ou lignes suivantes déjà prises par une autre extension
+            buffer = np.empty((max(end, 2 * size),) + self.view.shape[1:], dtype=self.view.dtype)
+            buffer[:size] = self.view
+            filled = [size]
+        buffer[size:end] = rows
+        filled[0] = end
+        return GrowableRows(buffer[:end], buffer, filled)
+
+
+def append_rows(buffers: Dict[Any, GrowableRows], name: Any, own: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """
+    Ajoute les lignes `new` à la suite de `own` sans recopier `own` à chaque appel.
+
+    Args:
+        buffers: Buffers du propriétaire de `own`, par nom (mis à jour)
+        name: Nom du tableau dans buffers
+        own: Tableau courant (vue retournée par un appel précédent, ou tableau initial)
+        new: Lignes à ajouter
+
+    Returns:
+        Vue sur les lignes de own suivies de celles de new
+    """
+    growable = buffers.get(name)
+    if growable is None or growable.view is not own:
+        growable = GrowableRows(own)
+    growable = growable.appended(new)
+    buffers[name] = growable
+    return growable.view
+
+
+class DescriptorMatrix:
+    """
+    Descripteurs de N candidats empilés en matrices, une par famille.
+
+    Chaque famille est accompagnée d'un masque de présence : une famille absente
+    d'un candidat ne contribue ni à la distance ni au poids total, exactement
+    comme les tests `if key in desc` de compare_descriptors.
+    """
+
+    def __init__(self, descriptors_list: List[Dict[str, Any]], labels: Optional[List[str]] = None):
+        """
+        Args:
+            descriptors_list: Descripteurs des candidats
+            labels: Noms des candidats pour les messages d'erreur (optionnel)
+        """
+        self.size = len(descriptors_list)
+        # Buffers à croissance géométrique des tableaux étendus par extend()
+        self._buffers: Dict[Any, GrowableRows] = {}
+
+        # Un document mal formé est ignoré (comme l'ancienne boucle de comparaison) :
+        # sa ligne reste dans la matrice, sans aucune famille, et valid[i] vaut False
+        self.valid = np.ones(self.size, dtype=bool)
+        decoded = []
+        for i, desc in enumerate(descriptors_list):
+            try:
+                decoded.append(self._decode(desc))
+            except Exception as e:
+                label = labels[i] if labels is not None else f"candidat {i}"
+                print(f"Descripteurs ignorés ({label}): {str(e)}")
+                decoded.append({})
+                self.valid[i] = False
+
+        # Histogrammes : (famille, canal) -> (matrice (N, bins), masque (N,))
+        self.histograms = {}
+        for family, channel in HISTOGRAM_CHANNELS:
+            rows = [(i, desc[(family, channel)]) for i, desc in enumerate(decoded) if (family, channel) in desc]
+            if not rows:
+                continue
+            bins = len(rows[0][1])
+            matrix = np.zeros((self.size, bins), dtype=np.float32)
+            mask = np.zeros(self.size, dtype=bool)
+            for i, hist in rows:
+                # Un histogramme de taille différente n'est pas comparable
+                if len(hist) == bins:
+                    matrix[i] = hist
+                    mask[i] = True
+            self.histograms[(family, channel)] = (matrix, mask)
+
+        # Couleurs dominantes : (N, K, 3) avec un masque par couleur
+        max_colors = max((len(desc.get("dominant_colors", ())) for desc in decoded), default=0)
+        self.colors = np.zeros((self.size, max_colors, 3), dtype=np.float32)
+        self.colors_mask = np.zeros((self.size, max_colors), dtype=bool)
+        for i, desc in enumerate(decoded):
+            palette = desc.get("dominant_colors")
+            if palette is not None and len(palette):
+                self.colors[i, :len(palette)] = palette
+                self.colors_mask[i, :len(palette)] = True
+
+        # Tamura : (N, 3)
+        self.tamura = np.zeros((self.size, len(TAMURA_KEYS)), dtype=np.float32)
+        self.tamura_mask = np.zeros(self.size, dtype=bool)
+        for i, desc in enumerate(decoded):
+            if "tamura" in desc:
+                self.tamura[i] = desc["tamura"]
+                self.tamura_mask[i] = True
+
+        # Familles vectorielles : regroupées par longueur (HOG d'images indexées avant la
+        # fenêtre canonique : longueur dépendant de la résolution)
+        # clé -> {longueur: (indices des lignes, matrice (n, longueur), normes)}
+        self.vectors = {}
+        for key, _ in VECTOR_FAMILIES:
+            groups: Dict[int, List[Tuple[int, np.ndarray]]] = {}
+            for i, desc in enumerate(decoded):
+                if key in desc:
+                    groups.setdefault(len(desc[key]), []).append((i, desc[key]))
+            self.vectors[key] = {
+                length: self._make_bucket([i for i, _ in rows], [v for _, v in rows], length)
+                for length, rows in groups.items()
+            }
+
+    @staticmethod
+    def _decode(desc: Dict[str, Any]) -> Dict[Any, np.ndarray]:
+        """
+        Convertit les familles présentes d'un document en tableaux float32.
+
+        Raises:
+            Exception: document mal formé (type inattendu, vecteur irrégulier...)
+        """
+        decoded: Dict[Any, np.ndarray] = {}
+        for family, channel in HISTOGRAM_CHANNELS:
+            if channel in desc.get(family, {}):
+                decoded[(family, channel)] = _as_vector(desc[family][channel])
+        palette = [c["rgb"] for c in desc.get("dominant_colors") or []]
+        if palette:
+            decoded["dominant_colors"] = np.asarray(palette, dtype=np.float32).reshape(len(palette), 3)
+        if "tamura" in desc:
+            decoded["tamura"] = _tamura_vector(desc["tamura"])
+        for key, _ in VECTOR_FAMILIES:
+            if key in desc:
+                decoded[key] = _as_vector(desc[key])
+        return decoded
+
+    @staticmethod
+    def _make_bucket(rows: List[int], vectors: List[np.ndarray], length: int):
+        matrix = np.ascontiguousarray(np.vstack(vectors)) if length else np.zeros((len(rows), 0), np.float32)
+        return np.asarray(rows, dtype=np.int64), matrix, np.linalg.norm(matrix, axis=1)
+
+    def extend(self, other: "DescriptorMatrix") -> None:
+        """
+        Ajoute les lignes d'une autre matrice à la suite de celle-ci.
+        Les tableaux grandissent par doublement de capacité (voir GrowableRows) : une
+        extension ne recopie pas l'index, et les lignes existantes ne sont jamais
+        modifiées en place, si bien qu'une copie superficielle peut être étendue
+        pendant que l'originale sert encore des recherches.
+        """
+        self._buffers = buffers = dict(self._buffers)
+        offset = self.size
+        size = self.size + other.size
+
+        histograms = {}
+        for key in set(self.histograms) | set(other.histograms):
+            own = self.histograms.get(key)
+            new = other.histograms.get(key)
+            bins = (own or new)[0].shape[1]
+            if own is None:
+                own = (np.zeros((offset, bins), dtype=np.float32), np.zeros(offset, dtype=bool))
+            if new is None or new[0].shape[1] != bins:
+                # Un histogramme de taille différente n'est pas comparable
+                new = (np.zeros((other.size, bins), dtype=np.float32), np.zeros(other.size, dtype=bool))
+            histograms[key] = (append_rows(buffers, ("histogram", key), own[0], new[0]),
+                               append_rows(buffers, ("histogram_mask", key), own[1], new[1]))
+        self.histograms = histograms
+
+        colors, colors_mask = self.colors, self.colors_mask
+        other_colors, other_mask = other.colors, other.colors_mask
+        max_colors = max(colors.shape[1], other_colors.shape[1])
+        # Palettes de tailles différentes : complétées par des couleurs masquées
+        if colors.shape[1] < max_colors:
+            colors = np.pad(colors, ((0, 0), (0, max_colors - colors.shape[1]), (0, 0)))
+            colors_mask = np.pad(colors_mask, ((0, 0), (0, max_colors - colors_mask.shape[1])))
+        if other_colors.shape[1] < max_colors:
+            other_colors = np.pad(other_colors, ((0, 0), (0, max_colors - other_colors.shape[1]), (0, 0)))
+            other_mask = np.pad(other_mask, ((0, 0), (0, max_colors - other_mask.shape[1])))
+        self.colors = append_rows(buffers, "colors", colors, other_colors)
+        self.colors_mask = append_rows(buffers, "colors_mask", colors_mask, other_mask)
+
+        self.valid = append_rows(buffers, "valid", self.valid, other.valid)
+        self.tamura = append_rows(buffers, "tamura", self.tamura, other.tamura)
+        self.tamura_mask = append_rows(buffers, "tamura_mask", self.tamura_mask, other.tamura_mask)
+
+        vectors = {}
+        for key, _ in VECTOR_FAMILIES:
+            buckets = dict(self.vectors[key])
+            for length, (rows, matrix, norms) in other.vectors[key].items():
+                rows = rows + offset
+                if length in buckets:
+                    own_rows, own_matrix, own_norms = buckets[length]
+                    rows = append_rows(buffers, (key, length, "rows"), own_rows, rows)
+                    matrix = append_rows(buffers, (key, length, "matrix"), own_matrix, matrix)
+                    norms = append_rows(buffers, (key, length, "norms"), own_norms, norms)
+                buckets[length] = (rows, matrix, norms)
+            vectors[key] = buckets
+        self.vectors = vectors
+
+        self.size = size
+
+    def distances(self, query: Dict[str, Any], weights: Optional[Dict[str, float]] = None,
+                  rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Calcule la distance pondérée entre la requête et chaque candidat.
+
+        Args:
+            query: Descripteurs de la requête (même format que compare_descriptors)
+            weights: Poids par famille (DEFAULT_WEIGHTS si None)
+            rows: Sous-ensemble optionnel de lignes à évaluer
+
+        Returns:
+            Tableau de distances (0 = identique), inf si aucune famille commune
+        """
+        if weights is None:
+            weights = DEFAULT_WEIGHTS
+
+        selected = np.zeros(self.size, dtype=bool)
+        if rows is None:
+            selected[:] = True
+        else:
+            selected[rows] = True
+        total_distance = np.zeros(self.size, dtype=np.float64)
+        total_weight = np.zeros(self.size, dtype=np.float64)
+
+        def accumulate(present, dist, weight):
+            total_distance[present] += dist * weight
+            total_weight[present] += weight
+
+        # Histogrammes : distance Chi-square
+        channel_weight = weights["color_histogram"] / 3
+        for (family, channel), (matrix, mask) in self.histograms.items():
+            if channel not in query.get(family, {}):
+                continue
+            hist = _as_vector(query[family][channel])
+            if len(hist) != matrix.shape[1]:
+                continue
+            present = mask & selected
+            block = _take(matrix, present)
+            chi_sq = np.sum((block - hist) ** 2 / (block + hist + 1e-10), axis=1)
+            accumulate(present, chi_sq, channel_weight)
+
+        # Couleurs dominantes : moyenne des distances minimales, normalisée
+        if query.get("dominant_colors") and self.colors.shape[1]:
+            query_colors = np.array([c["rgb"] for c in query["dominant_colors"]], dtype=np.float32)
+            present = self.colors_mask.any(axis=1) & selected
+            block = _take(self.colors, present)
+            # (n, Q, K) : distance de chaque couleur requête à chaque couleur candidate
+            pairwise = np.linalg.norm(block[:, None, :, :] - query_colors[None, :, None, :], axis=3)
+            valid = _take(self.colors_mask, present)[:, None, :]
+            pairwise = np.where(valid, pairwise, np.inf)
+            min_dist = pairwise.min(axis=2).mean(axis=1) / (255 * np.sqrt(3))
+            accumulate(present, min_dist, weights["dominant_colors"])
+
+        # Tamura : distance euclidienne normalisée
+        if "tamura" in query:
+            present = self.tamura_mask & selected
+            block = _take(self.tamura, present)
+            dist = np.linalg.norm(block - _tamura_vector(query["tamura"]), axis=1) / 10.0
+            accumulate(present, dist, weights["tamura"])
+
+        # Gabor, Hu, HOG : seuls les vecteurs de même longueur que la requête sont
+        # comparés (les autres, ex. HOG d'avant la fenêtre canonique, sont ignorés)
+        for key, metric in VECTOR_FAMILIES:
+            if key not in query:
+                continue
+            vec = _as_vector(query[key])
+            bucket = self.vectors[key].get(len(vec))
+            if bucket is None or (metric == "cosine" and len(vec) == 0):
+                continue
+            bucket_rows, matrix, norms = bucket
+            in_bucket = selected[bucket_rows]
+            if in_bucket.any():
+                present = bucket_rows[in_bucket]
+                block = _take(matrix, in_bucket)
+                if metric == "cosine":
+                    denom = _take(norms, in_bucket) * np.linalg.norm(vec)
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        dist = np.where(denom > 0, 1.0 - (block @ vec) / denom, 1.0)
+                else:
+                    dist = np.linalg.norm(block - vec, axis=1) / 10.0
+                accumulate(present, dist, weights[key])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = np.where(total_weight > 0, total_distance / total_weight, np.inf)
+        return result if rows is None else result[rows]
+
+
+def _take(array: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Sélectionne les lignes du masque, sans copie si toutes sont retenues."""
+    return array if mask.all() else array[mask]
+
+
+def compare_descriptors_batch(query: Dict[str, Any],
+                              candidates: Union[DescriptorMatrix, List[Dict[str, Any]]],
+                              weights: Dict[str, float] = None,
+                              rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Compare une requête à N candidats en une seule passe vectorisée.
+    Version par lot de compare_descriptors : mêmes distances (Chi-square, cosinus,
+    euclidienne), même normalisation par le poids total. Les familles absentes
+    d'un candidat sont gérées par des masques.
+    
+    Args:
+        query: Descripteurs de la requête
+        candidates: Descripteurs des candidats, déjà empilés (DescriptorMatrix) ou en liste
+        weights: Poids pour chaque type de descripteur (optionnel)
+        rows: Sous-ensemble optionnel des candidats à évaluer
+    
+    Returns:
+        Tableau de N distances (0 = identique, inf si aucun descripteur commun)
+    """
+    if not isinstance(candidates, DescriptorMatrix):
+        candidates = DescriptorMatrix(candidates)
+    return candidates.distances(query, weights, rows=rows)
+
+
 def search_similar_images(query_descriptors: Dict[str, Any], 
                          all_images: List[Dict[str, Any]], 
                          top_k: int = 10,
@@ -222,57 +571,41 @@ def search_similar_images(query_descriptors: Dict[str, Any],
     """
     similarities = []
     
-    for image in all_images:
-        image_id = str(image["_id"])
-        detected_objects = image.get("detected_objects", [])
+    if search_by_objects:
+        # Aplatir tous les objets pour les comparer en une seule passe
+        entries = []
+        for image in all_images:
+            for obj_idx, obj in enumerate(image.get("detected_objects", [])):
+                if obj.get("descriptors"):
+                    entries.append((str(image["_id"]), obj_idx, obj))
         
-        if search_by_objects:
-            # Comparer avec les descripteurs de chaque objet dans l'image
-            best_distance = float('inf')
-            best_object_info = None
-            
-            for obj_idx, obj in enumerate(detected_objects):
-                obj_descriptors = obj.get("descriptors", {})
-                
-                if not obj_descriptors:
-                    continue
-                
-                try:
-                    # Calculer la distance avec cet objet
-                    distance = compare_descriptors(query_descriptors, obj_descriptors)
-                    
-                    if distance < best_distance:
-                        best_distance = distance
-                        best_object_info = {
-                            "object_index": obj_idx,
-                            "object_class": obj.get("class"),
-                            "confidence": obj.get("confidence")
-                        }
-                except Exception as e:
-                    # Ignorer les erreurs de comparaison pour cet objet
-                    print(f"Erreur comparaison avec objet {obj_idx} de l'image {image_id}: {str(e)}")
-                    continue
-            
-            if best_object_info is not None:
-                similarities.append((image_id, best_distance, best_object_info))
-        else:
-            # Comparer avec les descripteurs de l'image complète
-            image_descriptors = image.get("descriptors", {})
-            
-            if not image_descriptors:
-                continue
-            
-            try:
-                # Calculer la distance de similarité
-                distance = compare_descriptors(query_descriptors, image_descriptors)
-                similarities.append((image_id, distance, None))
-            except Exception as e:
-                print(f"Erreur comparaison avec image {image_id}: {str(e)}")
-                continue
+        # Un objet mal formé obtient une distance infinie : il n'est jamais retenu
+        matrix = DescriptorMatrix([obj["descriptors"] for _, _, obj in entries],
+                                  labels=[f"objet {obj_idx} de l'image {image_id}" for image_id, obj_idx, _ in entries])
+        distances = compare_descriptors_batch(query_descriptors, matrix)
+        
+        # Garder l'objet le plus similaire de chaque image
+        best_by_image = {}
+        for (image_id, obj_idx, obj), distance in zip(entries, distances):
+            best_distance = best_by_image[image_id][0] if image_id in best_by_image else float('inf')
+            if distance < best_distance:
+                best_by_image[image_id] = (float(distance), {
+                    "object_index": obj_idx,
+                    "object_class": obj.get("class"),
+                    "confidence": obj.get("confidence")
+                })
+        similarities = [(image_id, distance, info) for image_id, (distance, info) in best_by_image.items()]
+    else:
+        # Comparer avec les descripteurs de l'image complète (documents mal formés ignorés)
+        images = [image for image in all_images if image.get("descriptors")]
+        matrix = DescriptorMatrix([image["descriptors"] for image in images],
+                                  labels=[f"image {image['_id']}" for image in images])
+        distances = compare_descriptors_batch(query_descriptors, matrix)
+        similarities = [(str(image["_id"]), float(distance), None)
+                        for image, distance, valid in zip(images, distances, matrix.valid) if valid]
     
     # Trier par distance (plus petit = plus similaire)
     similarities.sort(key=lambda x: x[1])
     
     # Retourner les top_k
     return similarities[:top_k]
-
@@ -0,0 +1,87 @@
+"""
+Préchargement au démarrage de l'application.
+Le détecteur YOLO est chargé puis préchauffé (une inférence par taille
+d'entrée configurée) et l'index de recherche est construit, en arrière-plan,
+pour que les premières requêtes ne paient pas ces coûts. L'état est exposé
+par /ready : l'API n'est prête qu'une fois toutes les étapes terminées.
+Avec PRELOAD_ON_STARTUP=false, le détecteur et l'index sont chargés à la
+première requête qui en a besoin : l'API est alors prête dès le démarrage.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import PRELOAD_ON_STARTUP, SEARCH_ENGINE
+
+
+def _warm_up_detector() -> None:
+    from utils.yolo_detection import warm_up
+    warm_up()
+
+
+def _preload_search_index() -> None:
+    from utils.search_index import get_search_index
+    get_search_index()
+
+
+def startup_steps() -> List[Tuple[str, Callable[[], None]]]:
+    """Étapes du préchargement, dans l'ordre."""
+    steps = [("detector", _warm_up_detector)]
+    if SEARCH_ENGINE == "index":
+        steps.append(("search_index", _preload_search_index))
+    return steps
+
+
+_state: Dict[str, Any] = {"status": "not_started", "steps": {}}
+_state_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+
+
+def _run_steps() -> None:
+    for name, step in startup_steps():
+        with _state_lock:
+            _state["steps"][name] = {"status": "running"}
+        start = time.perf_counter()
+        try:
+            step()
+            result = {"status": "done"}
+        except Exception as e:
+            print(f"Erreur au préchargement ({name}): {str(e)}")
+            result = {"status": "failed", "error": str(e)}
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        with _state_lock:
+            _state["steps"][name] = result
+
+    with _state_lock:
+        failed = any(step["status"] == "failed" for step in _state["steps"].values())
+        _state["status"] = "failed" if failed else "ready"
+
+
+def start_preloading() -> None:
+    """Lance le préchargement dans un thread d'arrière-plan (une seule fois par processus)."""
+    global _thread
+    with _state_lock:
+        if _thread is not None:
+            return
+        _state["status"] = "starting"
+        _state["steps"] = {name: {"status": "pending"} for name, _ in startup_steps()}
+        _thread = threading.Thread(target=_run_steps, name="startup-preload", daemon=True)
+    _thread.start()
+
+
+def readiness() -> Dict[str, Any]:
+    """
+    État du préchargement : status vaut "ready" quand toutes les étapes sont
+    terminées (ou quand le préchargement est désactivé, "lazy" valant alors True),
+    "starting" pendant le préchargement, "failed" si une étape a échoué et
+    "not_started" avant son lancement.
+    """
+    with _state_lock:
+        if _state["status"] == "not_started" and not PRELOAD_ON_STARTUP:
+            # Chargement à la demande : rien à attendre
+            return {"status": "ready", "lazy": True, "steps": {}}
+        return {
+            "status": _state["status"],
+            "steps": {name: dict(step) for name, step in _state["steps"].items()}
+        }
@@ -1,55 +1,448 @@
 """
 Wrapper pour la détection d'objets via YOLO.
-Utilise ultralytics pour charger et exécuter le modèle YOLO personnalisé (best.pt).
+Utilise ultralytics pour charger et exécuter le modèle YOLO personnalisé (best.pt),
+via PyTorch ou exporté pour ONNX Runtime / OpenVINO (DETECTOR_BACKEND).
 """
 
 import os
-from typing import Any, Dict, List
+import shutil
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+import numpy as np
 from ultralytics import YOLO
 
+from config import (
+    DETECTION_BASE_CONF,
+    DETECTION_BATCH_SIZE,
+    DETECTION_CACHE_SIZE,
+    DETECTOR_BACKEND,
+    DETECTOR_CALIBRATION_DATA,
+    DETECTOR_IMGSZ,
+    DETECTOR_INT8,
+    DETECTOR_THREADS,
+    DETECTOR_WARMUP_SIZES,
+)
+from utils.feature_cache import get_feature_cache
+from utils.image_io import ImageSource, content_hash, describe_source, load_image
+
 _model = None
+# Noms des classes indexés par identifiant (construit au chargement du modèle)
+_class_lookup = None
+# Un seul chargement même si plusieurs requêtes arrivent en même temps
+_model_lock = threading.Lock()
+# Le prédicteur Ultralytics garde l'état de l'appel en cours (source, lot,
+# résultats) sur l'instance du modèle : une seule inférence à la fois sur le
+# modèle partagé (ingestion, recherche, /transform)
+_inference_lock = threading.Lock()
 
 
-def load_model():
-    """
-    Charge le modèle YOLO personnalisé best.pt (lazy loading, chargé une seule fois).
-    Le modèle est chargé depuis le dossier fine_tuned_model/.
-    """
-    global _model
-    if _model is None:
-        # Chemin vers le modèle personnalisé
-        model_path = os.path.join(
-            os.path.dirname(__file__), 
-            "..", 
-            "fine_tuned_model", 
-            "best.pt"
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "fine_tuned_model")
+DETECTOR_BACKENDS = ("torch", "onnx", "openvino")
+
+
+def _weights_path() -> str:
+    """Chemin vers le modèle personnalisé best.pt (vérifie qu'il existe)."""
+    model_path = os.path.join(MODEL_DIR, "best.pt")
+    
+    # Vérifier si le fichier existe
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(
+            f"Modèle personnalisé non trouvé : {model_path}\n"
+            "Assurez-vous que le fichier best.pt existe dans backend/fine_tuned_model/"
         )
+    return model_path
+
+
+def exported_model_path(backend: str, imgsz: int = DETECTOR_IMGSZ, int8: bool = DETECTOR_INT8) -> str:
+    """Chemin du modèle exporté pour un backend, une taille d'entrée et une quantification donnés."""
+    suffix = f"{imgsz}_int8" if int8 else str(imgsz)
+    if backend == "onnx":
+        return os.path.join(MODEL_DIR, f"best_{suffix}.onnx")
+    if backend == "openvino":
+        # Ultralytics reconnaît un modèle OpenVINO à son dossier *_openvino_model
+        return os.path.join(MODEL_DIR, f"best_{suffix}_openvino_model")
+    raise ValueError(f"Backend de détection inconnu : {backend}")
+
+
+def export_model(backend: str = DETECTOR_BACKEND, imgsz: int = DETECTOR_IMGSZ, int8: bool = DETECTOR_INT8) -> str:
+    """
+    Exporte best.pt vers ONNX ou OpenVINO (une seule fois : le modèle exporté est
+    réutilisé s'il existe déjà dans fine_tuned_model/).
+    
+    Args:
+        backend: "onnx" ou "openvino"
+        imgsz: Taille d'entrée du réseau
+        int8: Quantification int8 (ONNX : quantification dynamique des poids via
+            onnxruntime ; OpenVINO : quantification de l'export Ultralytics, avec
+            DETECTOR_CALIBRATION_DATA comme jeu de calibration)
+    
+    Returns:
+        Chemin du modèle exporté
+    """
+    target = exported_model_path(backend, imgsz, int8)
+    if os.path.exists(target):
+        return target
+    
+    print(f"Export du modèle vers {backend} (imgsz={imgsz}, int8={int8}) : {target}")
+    export_options = {"format": backend, "imgsz": imgsz, "dynamic": True}
+    if backend == "openvino" and int8:
+        export_options["int8"] = True
+        if DETECTOR_CALIBRATION_DATA:
+            export_options["data"] = DETECTOR_CALIBRATION_DATA
+    exported = YOLO(_weights_path()).export(**export_options)
+    
+    if backend == "onnx" and int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(exported, target, weight_type=QuantType.QUInt8)
+        os.remove(exported)
+    else:
+        shutil.move(exported, target)
+    
+    return target
+
+
+def create_model(backend: str = DETECTOR_BACKEND, imgsz: int = DETECTOR_IMGSZ, int8: bool = DETECTOR_INT8):
+    """
+    Crée le détecteur pour un backend : "torch" (best.pt via PyTorch), "onnx"
+    (ONNX Runtime) ou "openvino" (modèle exporté au premier appel).
+    """
+    if backend not in DETECTOR_BACKENDS:
+        raise ValueError(f"Backend de détection inconnu : {backend}")
+    if backend == "torch":
+        return YOLO(_weights_path())
+    return YOLO(export_model(backend, imgsz, int8), task="detect")
+
+
+def set_runtime_threads(model, backend: str = DETECTOR_BACKEND, threads: int = DETECTOR_THREADS,
+                        imgsz: int = DETECTOR_IMGSZ, int8: bool = DETECTOR_INT8) -> None:
+    """
+    Applique un nombre de threads d'inférence au runtime d'un modèle exporté
+    (ONNX Runtime : intra_op_num_threads ; OpenVINO : INFERENCE_NUM_THREADS).
+    Ultralytics crée la session ONNX Runtime / le modèle OpenVINO compilé sans
+    réglage de threads : ils sont recréés avec ce réglage, après une première
+    inférence sur une petite image neutre (qui instancie le backend).
+    En cas d'échec, le runtime garde son nombre de threads par défaut.
+    """
+    if threads <= 0 or backend == "torch":
+        return
+    try:
+        if model.predictor is None:
+            model.predict(np.full((32, 32, 3), 114, dtype=np.uint8), imgsz=imgsz, verbose=False, device="cpu")
+        # AutoBackend (ou, selon la version d'Ultralytics, son backend par format)
+        runtime = model.predictor.model
+        runtime = getattr(runtime, "backend", runtime)
         
-        # Vérifier si le fichier existe
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(
-                f"Modèle personnalisé non trouvé : {model_path}\n"
-                "Assurez-vous que le fichier best.pt existe dans backend/fine_tuned_model/"
+        if backend == "onnx":
+            import onnxruntime
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+            runtime.session = onnxruntime.InferenceSession(
+                exported_model_path("onnx", imgsz, int8), options, providers=runtime.session.get_providers()
             )
+            if hasattr(runtime, "session_options"):
+                runtime.session_options = options
+        else:
+            import openvino as ov
+            # Même mode (LATENCY / THROUGHPUT) que le modèle compilé par Ultralytics
+            config = {"PERFORMANCE_HINT": runtime.ov_compiled_model.get_property("PERFORMANCE_HINT"),
+                      "INFERENCE_NUM_THREADS": threads}
+            core = ov.Core()
+            model_dir = exported_model_path("openvino", imgsz, int8)
+            xml_path = next(os.path.join(model_dir, name) for name in sorted(os.listdir(model_dir)) if name.endswith(".xml"))
+            ov_model = core.read_model(xml_path)
+            if ov_model.get_parameters()[0].get_layout().empty:
+                ov_model.get_parameters()[0].set_layout(ov.Layout("NCHW"))
+            runtime.ov_compiled_model = core.compile_model(ov_model, device_name="CPU", config=config)
+            # Versions récentes : recompilation à la volée (nouvelle forme d'entrée) avec les mêmes options
+            if hasattr(runtime, "compile_model"):
+                runtime.compile_model = partial(core.compile_model, device_name="CPU", config=config)
+        print(f"Threads d'inférence {backend} : {threads}")
+    except Exception as e:
+        print(f"Impossible de régler les threads d'inférence {backend} ({str(e)}) : valeur par défaut du runtime")
+
+
+def load_model():
+    """
+    Charge le détecteur YOLO personnalisé (lazy loading, chargé une seule fois).
+    Le modèle best.pt est chargé depuis le dossier fine_tuned_model/, ou exporté
+    puis chargé selon DETECTOR_BACKEND (voir create_model).
+    """
+    global _model, _class_lookup
+    if _model is not None:
+        return _model
+    
+    with _model_lock:
+        if _model is not None:
+            return _model
+        
+        # Nombre de threads CPU de PyTorch (inférence torch, pré/post-traitements)
+        if DETECTOR_THREADS > 0:
+            import torch
+            torch.set_num_threads(DETECTOR_THREADS)
         
-        print(f"Chargement du modèle depuis : {model_path}")
-        _model = YOLO(model_path)
+        print(f"Chargement du modèle (backend {DETECTOR_BACKEND}, imgsz={DETECTOR_IMGSZ}) depuis : {MODEL_DIR}")
+        model = create_model()
+        # Même nombre de threads pour ONNX Runtime / OpenVINO
+        set_runtime_threads(model)
         
         # Afficher les informations du modèle
         print(f"Modèle chargé avec succès!")
-        print(f"Classes disponibles : {_model.names}")
-        print(f"Nombre de classes : {len(_model.names)}")
+        print(f"Classes disponibles : {model.names}")
+        print(f"Nombre de classes : {len(model.names)}")
         
-    return _model
+        # Publier le modèle en dernier : les autres threads ne le voient que complet
+        _class_lookup = class_name_lookup(model.names)
+        _model = model
+        
+        return _model
 
 
-def detect_objects(image_path: str, conf_threshold: float = 0.25) -> List[Dict[str, Any]]:
+def warm_up(sizes: List[int] = DETECTOR_WARMUP_SIZES) -> None:
+    """
+    Charge le modèle et lance une inférence sur une image neutre à chaque taille
+    d'entrée, pour que la première vraie requête ne paie ni le chargement ni
+    l'initialisation du backend (allocation, compilation). Le cache des
+    détections n'est pas utilisé.
+    """
+    model = load_model()
+    for size in sizes:
+        image = np.full((size, size, 3), 114, dtype=np.uint8)
+        detect_with_model(model, [image], batch_size=1, imgsz=size, lookup=_class_lookup)
+        print(f"Préchauffage du détecteur terminé (imgsz={size})")
+
+
+def class_name_lookup(names: Dict[int, str]) -> np.ndarray:
+    """Tableau des noms de classes indexé par identifiant ("class_<id>" pour les trous)."""
+    size = max(names) + 1 if names else 0
+    return np.array([names.get(i, f"class_{i}") for i in range(size)], dtype=object)
+
+
+def decode_boxes(boxes, lookup: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Convertit les boxes Ultralytics d'une image en détections, en une seule fois :
+    xyxy, conf et cls passent en NumPy et les noms de classes sont lus dans lookup.
+    """
+    # Vérifier si des boxes ont été détectées
+    if boxes is None or len(boxes) == 0:
+        return []
+    
+    xyxy = boxes.xyxy.cpu().numpy()  # (N, 4) : [x1, y1, x2, y2]
+    confidences = boxes.conf.cpu().numpy()
+    cls_ids = boxes.cls.cpu().numpy().astype(np.int64)
+    
+    # Obtenir le nom de la classe (identifiants hors du modèle : "class_<id>")
+    known = (cls_ids >= 0) & (cls_ids < len(lookup))
+    class_names = np.empty(len(cls_ids), dtype=object)
+    class_names[known] = lookup[cls_ids[known]]
+    for i in np.flatnonzero(~known):
+        class_names[i] = f"class_{cls_ids[i]}"
+    
+    return [
+        {"class": class_name, "confidence": confidence, "bbox": bbox}
+        for class_name, confidence, bbox in zip(class_names.tolist(), confidences.tolist(), xyxy.tolist())
+    ]
+
+
+class DetectionResult:
+    """
+    Détections d'une image obtenues en une seule inférence, au seuil de
+    confiance conf_threshold. Les vues à un seuil supérieur s'obtiennent par
+    simple filtrage (at) : la NMS ne supprime une box qu'au profit d'une box
+    plus confiante, donc filtrer après coup équivaut à relancer le modèle.
+    """
+
+    def __init__(self, detections: List[Dict[str, Any]], conf_threshold: float):
+        self.detections = detections
+        self.conf_threshold = conf_threshold
+
+    def at(self, conf_threshold: float) -> List[Dict[str, Any]]:
+        """Détections de confiance >= conf_threshold (copies modifiables)."""
+        if conf_threshold < self.conf_threshold:
+            raise ValueError(
+                f"Seuil {conf_threshold} inférieur au seuil de l'inférence ({self.conf_threshold})"
+            )
+        return [
+            {**det, "bbox": list(det["bbox"])}
+            for det in self.detections if det["confidence"] >= conf_threshold
+        ]
+
+
+# Cache LRU des résultats de détection, par empreinte du contenu de l'image
+_results_cache: "OrderedDict[str, DetectionResult]" = OrderedDict()
+_results_cache_lock = threading.Lock()
+
+
+def _cached_result(key: str, conf_threshold: float) -> Optional[DetectionResult]:
+    with _results_cache_lock:
+        result = _results_cache.get(key)
+        if result is None or result.conf_threshold > conf_threshold:
+            return None
+        _results_cache.move_to_end(key)
+        return result
+
+
+def _cache_result(key: str, result: DetectionResult) -> None:
+    if DETECTION_CACHE_SIZE <= 0:
+        return
+    with _results_cache_lock:
+        _results_cache[key] = result
+        _results_cache.move_to_end(key)
+        while len(_results_cache) > DETECTION_CACHE_SIZE:
+            _results_cache.popitem(last=False)
+
+
+def _cache_params() -> Dict[str, Any]:
+    """Paramètres du détecteur qui influencent les détections (clé du cache persistant)."""
+    try:
+        stat = os.stat(os.path.join(MODEL_DIR, "best.pt"))
+        weights = f"{stat.st_size}-{stat.st_mtime_ns}"
+    except OSError:
+        weights = None
+    return {"backend": DETECTOR_BACKEND, "imgsz": DETECTOR_IMGSZ, "int8": DETECTOR_INT8, "weights": weights}
+
+
+def _stored_result(key: str, params: Dict[str, Any], conf_threshold: float) -> Optional[DetectionResult]:
+    """Résultat du cache persistant, s'il a été obtenu à un seuil inférieur ou égal."""
+    stored = get_feature_cache().get("detections", key, params)
+    if stored is None or stored["conf_threshold"] > conf_threshold:
+        return None
+    return DetectionResult(stored["detections"], stored["conf_threshold"])
+
+
+def clear_detection_cache() -> None:
+    """Vide le cache des résultats de détection."""
+    with _results_cache_lock:
+        _results_cache.clear()
+
+
+def detect_results(images: List[ImageSource], batch_size: int = DETECTION_BATCH_SIZE,
+                   conf_threshold: float = 0.25, store: bool = True,
+                   base_conf: float = DETECTION_BASE_CONF) -> List[DetectionResult]:
+    """
+    Résultats de détection de plusieurs images, servis depuis le cache (en mémoire,
+    puis persistant) quand la même image (même contenu) a déjà été analysée à un
+    seuil inférieur ou égal.
+    Les images manquantes sont analysées par lots en une inférence, au seuil
+    conf_threshold (ou min(conf_threshold, base_conf) avec un plancher), dont le
+    résultat sert ensuite tout seuil supérieur.
+    
+    Args:
+        images: Chemins, octets encodés ou images BGR déjà décodées
+        batch_size: Nombre d'images par appel au modèle
+        conf_threshold: Seuil de confiance minimum demandé
+        store: Stocker les nouveaux résultats dans le cache persistant
+            (False pour une image de requête, qui ne sera pas indexée)
+        base_conf: Seuil plancher de l'inférence (0 = pas de plancher, voir DETECTION_BASE_CONF)
+    
+    Returns:
+        Un DetectionResult par image, dans l'ordre
+    """
+    arrays = [load_image(image) for image in images]
+    keys = [content_hash(image) for image in arrays]
+    results = [_cached_result(key, conf_threshold) for key in keys]
+    
+    cache = get_feature_cache()
+    params = _cache_params() if cache.enabled else None
+    if cache.enabled:
+        for i, key in enumerate(keys):
+            if results[i] is None:
+                results[i] = _stored_result(key, params, conf_threshold)
+                if results[i] is not None:
+                    _cache_result(key, results[i])
+    
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        base_threshold = min(conf_threshold, base_conf) if base_conf > 0 else conf_threshold
+        model = load_model()
+        detections = detect_with_model(model, [arrays[i] for i in missing], batch_size,
+                                       base_threshold, lookup=_class_lookup)
+        for i, detected in zip(missing, detections):
+            results[i] = DetectionResult(detected, base_threshold)
+            _cache_result(keys[i], results[i])
+            if cache.enabled and store:
+                cache.put("detections", keys[i], params, {"detections": detected, "conf_threshold": base_threshold})
+    
+    return results
+
+
+def detect_objects_batch(images: List[ImageSource], batch_size: int = DETECTION_BATCH_SIZE,
+                         conf_threshold: float = 0.25, store: bool = True) -> List[List[Dict[str, Any]]]:
+    """
+    Détecte les objets dans plusieurs images, par lots de batch_size images
+    par appel au modèle (un seul passage du réseau par lot).
+    
+    Args:
+        images: Chemins, octets encodés ou images BGR déjà décodées
+        batch_size: Nombre d'images par appel au modèle
+        conf_threshold: Seuil de confiance minimum (par défaut 0.25)
+        store: Stocker les nouveaux résultats dans le cache persistant
+    
+    Returns:
+        Pour chaque image (dans l'ordre), la liste de ses détections
+        (même format que detect_objects)
+    """
+    if not images:
+        return []
+    
+    detections = []
+    for image, result in zip(images, detect_results(images, batch_size, conf_threshold, store)):
+        detected = result.at(conf_threshold)
+        print(f"Détection terminée : {len(detected)} objet(s) trouvé(s) dans {describe_source(image)}")
+        detections.append(detected)
+    return detections
+
+
+def detect_with_model(model, images: List[ImageSource], batch_size: int = DETECTION_BATCH_SIZE,
+                      conf_threshold: float = 0.25, imgsz: int = DETECTOR_IMGSZ,
+                      lookup: Optional[np.ndarray] = None) -> List[List[Dict[str, Any]]]:
+    """
+    Détection par lots avec un détecteur donné (voir detect_objects_batch) ;
+    permet de comparer plusieurs backends (benchmark_detector.py).
+    Les appels à model.predict sont sérialisés (_inference_lock) : plusieurs
+    threads peuvent appeler cette fonction avec le même modèle ; le décodage
+    des boîtes se fait hors du verrou.
+    """
+    # Ultralytics accepte directement un tableau BGR : pas de passage par le disque
+    sources = [load_image(image) for image in images]
+    if lookup is None:
+        lookup = class_name_lookup(model.names)
+    batch_size = max(1, batch_size)
+    
+    detections = []
+    for start in range(0, len(sources), batch_size):
+        batch = sources[start:start + batch_size]
+        
+        # Lancer la détection avec un seuil de confiance ajustable
+        # verbose=False pour éviter trop de logs
+        with _inference_lock:
+            results = model.predict(
+                source=batch,
+                conf=conf_threshold,
+                iou=0.45,  # Non-Maximum Suppression threshold
+                imgsz=imgsz,
+                verbose=False,
+                device='cpu'  # Nœuds CPU (backends torch, ONNX Runtime et OpenVINO)
+            )
+        
+        # Un résultat par image du lot, dans l'ordre
+        for result in results:
+            detections.append(decode_boxes(result.boxes, lookup))
+    
+    return detections
+
+
+def detect_objects(image: ImageSource, conf_threshold: float = 0.25, store: bool = True) -> List[Dict[str, Any]]:
     """
     Détecte les objets dans une image en utilisant le modèle YOLO personnalisé (best.pt).
     
     Args:
-        image_path: Chemin vers l'image à analyser
+        image: Chemin vers l'image, octets encodés ou image BGR déjà décodée
         conf_threshold: Seuil de confiance minimum (par défaut 0.25)
+        store: Stocker le résultat dans le cache persistant (False pour une image de requête)
     
     Returns:
         Liste de dictionnaires contenant pour chaque objet détecté :
@@ -57,58 +450,7 @@ def detect_objects(image_path: str, conf_threshold: float = 0.25) -> List[Dict[s
         - confidence: score de confiance (0.0 à 1.0)
         - bbox: bounding box [x1, y1, x2, y2] en coordonnées pixel
     """
-    if not os.path.exists(image_path):
-        raise FileNotFoundError(f"Image non trouvée : {image_path}")
-    
-    model = load_model()
-    
-    # Lancer la détection avec un seuil de confiance ajustable
-    # verbose=False pour éviter trop de logs
-    results = model.predict(
-        source=image_path,
-        conf=conf_threshold,
-        iou=0.45,  # Non-Maximum Suppression threshold
-        verbose=False,
-        device='cpu'  # Forcer CPU si problème avec GPU
-    )
-    
-    detected = []
-    
-    # Parcourir les résultats
-    for result in results:
-        # Vérifier si des boxes ont été détectées
-        if result.boxes is None or len(result.boxes) == 0:
-            continue
-        
-        # Parcourir chaque box détectée
-        for box in result.boxes:
-            try:
-                # Extraire la classe
-                cls_id = int(box.cls.cpu().item())
-                
-                # Extraire la confiance
-                confidence = float(box.conf.cpu().item())
-                
-                # Extraire les coordonnées de la bounding box
-                xyxy = box.xyxy.cpu().numpy()[0]  # [x1, y1, x2, y2]
-                bbox = [float(x) for x in xyxy]
-                
-                # Obtenir le nom de la classe
-                class_name = model.names[cls_id] if cls_id in model.names else f"class_{cls_id}"
-                
-                detected.append({
-                    "class": class_name,
-                    "confidence": confidence,
-                    "bbox": bbox
-                })
-                
-            except Exception as e:
-                print(f"Erreur lors du traitement d'une box : {str(e)}")
-                continue
-    
-    print(f"Détection terminée : {len(detected)} objet(s) trouvé(s) dans {image_path}")
-    
-    return detected
+    return detect_objects_batch([image], batch_size=1, conf_threshold=conf_threshold, store=store)[0]
 
 
 def test_detection(image_path: str):
@@ -125,10 +467,12 @@ def test_detection(image_path: str):
     print(f"Image : {image_path}")
     
     try:
-        # Tester avec différents seuils de confiance
-        for conf in [0.01, 0.10, 0.25, 0.50]:
+        # Tester avec différents seuils de confiance (une seule inférence, au plus bas)
+        thresholds = [0.01, 0.10, 0.25, 0.50]
+        result = detect_results([image_path], conf_threshold=min(thresholds))[0]
+        for conf in thresholds:
             print(f"\n--- Seuil de confiance : {conf} ---")
-            detections = detect_objects(image_path, conf_threshold=conf)
+            detections = result.at(conf)
             
             if len(detections) == 0:
                 print("❌ Aucun objet détecté")
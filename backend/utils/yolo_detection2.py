@@ -6,7 +6,11 @@ Utilise ultralytics pour charger et exécuter le modèle YOLOv8n.
 from typing import Any, Dict, List
 from ultralytics import YOLO
 
+from utils.yolo_detection import class_name_lookup, decode_boxes
+
 _model = None
+# Noms des classes indexés par identifiant (construit au chargement du modèle)
+_class_lookup = None
 
 
 def load_model():
@@ -14,9 +18,10 @@ def load_model():
     Charge le modèle YOLOv8n (lazy loading, chargé une seule fois).
     Le modèle sera téléchargé automatiquement au premier appel.
     """
-    global _model
+    global _model, _class_lookup
     if _model is None:
         _model = YOLO("yolov8n.pt")  # Télécharge automatiquement si absent
+        _class_lookup = class_name_lookup(_model.names)
     return _model
 
 
@@ -38,11 +43,7 @@ def detect_objects(image_path: str) -> List[Dict[str, Any]]:
     detected = []
     
     for r in results:
-        for box in r.boxes:
-            detected.append({
-                "class": model.names[int(box.cls)],
-                "confidence": float(box.conf),
-                "bbox": box.xyxy[0].tolist()  # [x1, y1, x2, y2]
-            })
+        # Conversion de toutes les boxes en une fois (NumPy)
+        detected.extend(decode_boxes(r.boxes, _class_lookup))
     
     return detected
\ No newline at end of file
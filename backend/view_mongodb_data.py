@@ -3,7 +3,7 @@ Script pour visualiser les données MongoDB.
 Permet d'afficher les images stockées avec leurs métadonnées, objets détectés et descripteurs.
 """
 
-from models.image_model import ImageModel
+from models.image_model import ImageModel, to_serializable
 from pprint import pprint
 import json
 from bson import json_util
@@ -85,7 +85,7 @@ def show_image_details(image_id: str):
     print("="*80)
     
     # Convertir en JSON pour un affichage propre
-    image_json = json.loads(json_util.dumps(image))
+    image_json = json.loads(json_util.dumps(to_serializable(image)))
     pprint(image_json, width=100, indent=2)
 
 
@@ -137,7 +137,7 @@ def export_to_json(filename: str = "mongodb_export.json"):
         return
     
     # Convertir en JSON
-    images_json = json.loads(json_util.dumps(images))
+    images_json = json.loads(json_util.dumps(to_serializable(images)))
     
     with open(filename, 'w', encoding='utf-8') as f:
         json.dump(images_json, f, indent=2, ensure_ascii=False)
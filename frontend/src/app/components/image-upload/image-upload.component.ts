@@ -59,11 +59,11 @@ export class ImageUploadComponent {
     this.api.uploadImages(this.selectedFiles).subscribe({
       next: (response) => {
         this.uploading = false;
-        const uploadedCount = response.uploaded?.length || 0;
+        const uploadedCount = response.jobs?.length || 0;
         const errorCount = response.errors?.length || 0;
         
         if (uploadedCount > 0) {
-          this.message = `${uploadedCount} image(s) uploadée(s) avec succès.`;
+          this.message = `${uploadedCount} image(s) uploadée(s) avec succès, indexation en cours.`;
           if (errorCount > 0) {
             this.message += ` ${errorCount} erreur(s).`;
             this.messageType = 'error';
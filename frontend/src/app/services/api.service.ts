@@ -18,7 +18,7 @@ export interface Image {
 }
 
 export interface UploadResponse {
-  uploaded: Array<{ id: string; filename: string; objects_detected?: number }>;
+  jobs: Array<{ job_id: string; filename: string; status: string }>;
   count: number;
   errors?: Array<{ filename: string; error: string }>;
 }
@@ -52,6 +52,13 @@ export class ApiService {
     return this.http.post<UploadResponse>(`${API_BASE}/upload`, formData);
   }
 
+  /**
+   * Suivi d'un job d'ingestion créé par l'upload
+   */
+  getJob(jobId: string): Observable<any> {
+    return this.http.get(`${API_BASE}/jobs/${jobId}`);
+  }
+
   /**
    * Liste toutes les images avec pagination et filtres
    */
@@ -98,6 +105,8 @@ export class ApiService {
     if (payload.type === 'upload' && payload.image) {
       formData.append('type', 'upload');
       formData.append('image', payload.image);
+      // Les objets détectés sur l'image requête ne sont pas affichés : pas d'inférence YOLO
+      formData.append('detect', 'false');
       if (payload.top_k) formData.append('top_k', payload.top_k.toString());
     } else if (payload.type === 'existing') {
       formData.append('type', 'existing');